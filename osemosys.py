@@ -198,6 +198,343 @@ model.AnnualEmissionLimit = Param(
 model.ModelPeriodExogenousEmission = Param(model.REGION, model.EMISSION, default=0)
 model.ModelPeriodEmissionLimit = Param(model.REGION, model.EMISSION, default=99999)
 
+#########			Formulation Options			#############
+
+# Set to 1 to impose the total capacity, new capacity and storage rate limits
+# as bounds on the variables they restrict instead of as constraint rows.
+model.UseVariableBounds = Param(within=Binary, default=0)
+
+#####################
+#   Derived Sets    #
+#####################
+
+#########			Activity Ratios				#############
+
+
+def ACTIVITY_OUTPUT_init(model):
+    return (
+        idx for idx, ratio in model.OutputActivityRatio.sparse_items() if ratio != 0
+    )
+
+
+model.ACTIVITY_OUTPUT = Set(dimen=5, initialize=ACTIVITY_OUTPUT_init)
+
+
+def ACTIVITY_INPUT_init(model):
+    return (idx for idx, ratio in model.InputActivityRatio.sparse_items() if ratio != 0)
+
+
+model.ACTIVITY_INPUT = Set(dimen=5, initialize=ACTIVITY_INPUT_init)
+
+
+# A technology produces (uses) a fuel where its activity ratios summed over the
+# modes are nonzero, and a fuel is produced (used) where they are nonzero
+# summed over the technologies too, as in the conditions of osemosys.txt.
+def _ratio_totals(ratio, technology):
+    totals = {}
+    for (r, t, f, m, y), v in ratio.sparse_items():
+        key = (r, t, f, y) if technology else (r, f, y)
+        totals[key] = totals.get(key, 0) + v
+    return (key for key, total in totals.items() if total != 0)
+
+
+def FUEL_PRODUCED_BY_init(model):
+    return _ratio_totals(model.OutputActivityRatio, technology=True)
+
+
+model.FUEL_PRODUCED_BY = Set(dimen=4, initialize=FUEL_PRODUCED_BY_init)
+
+
+def FUEL_USED_BY_init(model):
+    return _ratio_totals(model.InputActivityRatio, technology=True)
+
+
+model.FUEL_USED_BY = Set(dimen=4, initialize=FUEL_USED_BY_init)
+
+
+def FUEL_PRODUCED_init(model):
+    return _ratio_totals(model.OutputActivityRatio, technology=False)
+
+
+model.FUEL_PRODUCED = Set(dimen=3, initialize=FUEL_PRODUCED_init)
+
+
+def FUEL_USED_init(model):
+    return _ratio_totals(model.InputActivityRatio, technology=False)
+
+
+model.FUEL_USED = Set(dimen=3, initialize=FUEL_USED_init)
+
+
+def PRODUCTION_BY_MODE_init(model):
+    return (
+        (r, l, t, m, f, y)
+        for (r, t, f, m, y) in model.ACTIVITY_OUTPUT
+        for l in model.TIMESLICE
+    )
+
+
+model.PRODUCTION_BY_MODE = Set(dimen=6, initialize=PRODUCTION_BY_MODE_init)
+
+
+def USE_BY_MODE_init(model):
+    return (
+        (r, l, t, m, f, y)
+        for (r, t, f, m, y) in model.ACTIVITY_INPUT
+        for l in model.TIMESLICE
+    )
+
+
+model.USE_BY_MODE = Set(dimen=6, initialize=USE_BY_MODE_init)
+
+
+def PRODUCTION_BY_TECHNOLOGY_init(model):
+    return (
+        (r, l, t, f, y)
+        for (r, t, f, y) in model.FUEL_PRODUCED_BY
+        for l in model.TIMESLICE
+    )
+
+
+model.PRODUCTION_BY_TECHNOLOGY = Set(dimen=5, initialize=PRODUCTION_BY_TECHNOLOGY_init)
+
+
+def USE_BY_TECHNOLOGY_init(model):
+    return (
+        (r, l, t, f, y) for (r, t, f, y) in model.FUEL_USED_BY for l in model.TIMESLICE
+    )
+
+
+model.USE_BY_TECHNOLOGY = Set(dimen=5, initialize=USE_BY_TECHNOLOGY_init)
+
+#########			Emissions					#############
+
+
+def EMISSION_ACTIVITY_init(model):
+    return (
+        idx for idx, ratio in model.EmissionActivityRatio.sparse_items() if ratio != 0
+    )
+
+
+model.EMISSION_ACTIVITY = Set(dimen=5, initialize=EMISSION_ACTIVITY_init)
+
+
+def EMITTING_TECHNOLOGY_init(model):
+    return list(
+        dict.fromkeys((r, t, e, y) for (r, t, e, m, y) in model.EMISSION_ACTIVITY)
+    )
+
+
+model.EMITTING_TECHNOLOGY = Set(dimen=4, initialize=EMITTING_TECHNOLOGY_init)
+
+#########			Trade						#############
+
+
+# Both directions of every route with a nonzero TradeRoute in either of them.
+# Trade within a region is zero (EnergyBalanceEachTS4 with rr == r).
+def TRADE_LINK_init(model):
+    links = {
+        (r, rr, f, y)
+        for (r, rr, f, y), route in model.TradeRoute.sparse_items()
+        if route != 0 and r != rr
+    }
+    links |= {(rr, r, f, y) for (r, rr, f, y) in links}
+    return sorted(
+        links,
+        key=lambda k: (
+            model.REGION.ord(k[0]),
+            model.REGION.ord(k[1]),
+            model.FUEL.ord(k[2]),
+            model.YEAR.ord(k[3]),
+        ),
+    )
+
+
+model.TRADE_LINK = Set(dimen=4, initialize=TRADE_LINK_init)
+
+
+def TRADE_BY_TIMESLICE_init(model):
+    return (
+        (r, rr, l, f, y) for (r, rr, f, y) in model.TRADE_LINK for l in model.TIMESLICE
+    )
+
+
+model.TRADE_BY_TIMESLICE = Set(dimen=5, initialize=TRADE_BY_TIMESLICE_init)
+
+#########			Capacity					#############
+
+
+# The vintages still operating in each year, built once per (r, t) or (r, s)
+# by sliding the operational-life window along the sorted years.
+def _vintages(life, years):
+    vintages = {}
+    for key, lifetime in life.items():
+        start = 0
+        for i, y in enumerate(years):
+            while start <= i and y - years[start] >= lifetime:
+                start += 1
+            vintages[key + (y,)] = years[start : i + 1]
+    return vintages
+
+
+def TECHNOLOGY_VINTAGE_init(model):
+    return _vintages(model.OperationalLife, sorted(model.YEAR))
+
+
+model.TECHNOLOGY_VINTAGE = Set(
+    model.REGION, model.TECHNOLOGY, model.YEAR, initialize=TECHNOLOGY_VINTAGE_init
+)
+
+
+def STORAGE_VINTAGE_init(model):
+    return _vintages(model.OperationalLifeStorage, sorted(model.YEAR))
+
+
+model.STORAGE_VINTAGE = Set(
+    model.REGION, model.STORAGE, model.YEAR, initialize=STORAGE_VINTAGE_init
+)
+
+#########			Time Slices					#############
+
+
+def TIMESLICE_OF_BRACKET_init(model, ls, ld, lh):
+    return (
+        l
+        for l in model.TIMESLICE
+        if model.Conversionls[l, ls] > 0
+        and model.Conversionld[l, ld] > 0
+        and model.Conversionlh[l, lh] > 0
+    )
+
+
+model.TIMESLICE_OF_BRACKET = Set(
+    model.SEASON,
+    model.DAYTYPE,
+    model.DAILYTIMEBRACKET,
+    initialize=TIMESLICE_OF_BRACKET_init,
+)
+
+#########           		Storage                 		#############
+
+
+def TECHNOLOGY_TO_STORAGE_init(model, r, s):
+    return (
+        (t, m)
+        for (rr, t, ss, m), ratio in model.TechnologyToStorage.sparse_items()
+        if rr == r and ss == s and ratio > 0
+    )
+
+
+model.TECHNOLOGY_TO_STORAGE = Set(
+    model.REGION, model.STORAGE, dimen=2, initialize=TECHNOLOGY_TO_STORAGE_init
+)
+
+
+def TECHNOLOGY_FROM_STORAGE_init(model, r, s):
+    return (
+        (t, m)
+        for (rr, t, ss, m), ratio in model.TechnologyFromStorage.sparse_items()
+        if rr == r and ss == s and ratio > 0
+    )
+
+
+model.TECHNOLOGY_FROM_STORAGE = Set(
+    model.REGION, model.STORAGE, dimen=2, initialize=TECHNOLOGY_FROM_STORAGE_init
+)
+
+#########################
+#   Derived Parameters  #
+#########################
+
+#########			Discounting					#############
+
+
+def FirstYear_init(model):
+    return min(model.YEAR)
+
+
+model.FirstYear = Param(initialize=FirstYear_init)
+
+
+def LastYear_init(model):
+    return max(model.YEAR)
+
+
+model.LastYear = Param(initialize=LastYear_init)
+
+
+def DiscountFactor_init(model, r, y):
+    return (1 + model.DiscountRate[r]) ** (y - model.FirstYear)
+
+
+model.DiscountFactor = Param(model.REGION, model.YEAR, initialize=DiscountFactor_init)
+
+
+def DiscountFactorMid_init(model, r, y):
+    return (1 + model.DiscountRate[r]) ** (y - model.FirstYear + 0.5)
+
+
+model.DiscountFactorMid = Param(
+    model.REGION, model.YEAR, initialize=DiscountFactorMid_init
+)
+
+
+def DiscountFactorSalvage_init(model, r):
+    return (1 + model.DiscountRate[r]) ** (model.LastYear - model.FirstYear + 1)
+
+
+model.DiscountFactorSalvage = Param(model.REGION, initialize=DiscountFactorSalvage_init)
+
+
+def salvage_fraction(model, r, life, y, last, discount):
+    """Return the fraction of an investment made in y, with the given
+    operational life, that is left after the year last, following
+    DepreciationMethod; discount is (1 + DiscountRate) ** (last - y + 1)."""
+    if y + life - 1 <= last:
+        return 0
+    method = value(model.DepreciationMethod[r])
+    rate = value(model.DiscountRate[r])
+    if method == 1 and rate > 0:
+        return 1 - (discount - 1) / ((1 + rate) ** life - 1)
+    if (method == 1 and rate == 0) or method == 2:
+        return 1 - (last - y + 1) / life
+    return 0
+
+
+def SalvageValueFraction_init(model, r, t, y):
+    return salvage_fraction(
+        model,
+        r,
+        value(model.OperationalLife[r, t]),
+        y,
+        value(model.LastYear),
+        value(model.DiscountFactorSalvage[r] / model.DiscountFactor[r, y]),
+    )
+
+
+model.SalvageValueFraction = Param(
+    model.REGION, model.TECHNOLOGY, model.YEAR, initialize=SalvageValueFraction_init
+)
+
+
+def SalvageValueFractionStorage_init(model, r, s, y):
+    return salvage_fraction(
+        model,
+        r,
+        value(model.OperationalLifeStorage[r, s]),
+        y,
+        value(model.LastYear),
+        value(model.DiscountFactorSalvage[r] / model.DiscountFactor[r, y]),
+    )
+
+
+model.SalvageValueFractionStorage = Param(
+    model.REGION,
+    model.STORAGE,
+    model.YEAR,
+    initialize=SalvageValueFractionStorage_init,
+)
+
 ######################
 #   Model Variables  #
 ######################
@@ -223,6 +560,21 @@ model.Demand = Var(
 
 ########     		Storage                 		#############
 
+
+def RateOfStorageCharge_bounds(model, r, s, ls, ld, lh, y):
+    if model.UseVariableBounds:
+        return (None, model.StorageMaxChargeRate[r, s])
+    else:
+        return (None, None)
+
+
+def RateOfStorageDischarge_bounds(model, r, s, ls, ld, lh, y):
+    if model.UseVariableBounds:
+        return (None, model.StorageMaxDischargeRate[r, s])
+    else:
+        return (None, None)
+
+
 model.RateOfStorageCharge = Var(
     model.REGION,
     model.STORAGE,
@@ -230,6 +582,7 @@ model.RateOfStorageCharge = Var(
     model.DAYTYPE,
     model.DAILYTIMEBRACKET,
     model.YEAR,
+    bounds=RateOfStorageCharge_bounds,
     initialize=0.0,
 )
 model.RateOfStorageDischarge = Var(
@@ -239,6 +592,7 @@ model.RateOfStorageDischarge = Var(
     model.DAYTYPE,
     model.DAILYTIMEBRACKET,
     model.YEAR,
+    bounds=RateOfStorageDischarge_bounds,
     initialize=0.0,
 )
 model.NetChargeWithinYear = Var(
@@ -321,17 +675,58 @@ model.TotalDiscountedStorageCost = Var(
 
 #########		    Capacity Variables 			#############
 
+
+def NewCapacity_bounds(model, r, t, y):
+    if model.UseVariableBounds:
+        upper = model.TotalAnnualMaxCapacityInvestment[r, t, y]
+        return (
+            model.TotalAnnualMinCapacityInvestment[r, t, y],
+            upper if upper != 99999 else None,
+        )
+    else:
+        return (None, None)
+
+
+def TotalCapacityAnnual_bounds(model, r, t, y):
+    if model.UseVariableBounds:
+        upper = model.TotalAnnualMaxCapacity[r, t, y]
+        return (
+            model.TotalAnnualMinCapacity[r, t, y],
+            upper if upper != 99999 else None,
+        )
+    else:
+        return (None, None)
+
+
+def NewCapacity_init(model, r, t, y):
+    return NewCapacity_bounds(model, r, t, y)[0] or 0.0
+
+
+def TotalCapacityAnnual_init(model, r, t, y):
+    return TotalCapacityAnnual_bounds(model, r, t, y)[0] or 0.0
+
+
 model.NumberOfNewTechnologyUnits = Var(
     model.REGION, model.TECHNOLOGY, model.YEAR, domain=NonNegativeIntegers, initialize=0
 )
 model.NewCapacity = Var(
-    model.REGION, model.TECHNOLOGY, model.YEAR, domain=NonNegativeReals, initialize=0.0
+    model.REGION,
+    model.TECHNOLOGY,
+    model.YEAR,
+    domain=NonNegativeReals,
+    bounds=NewCapacity_bounds,
+    initialize=NewCapacity_init,
 )
 model.AccumulatedNewCapacity = Var(
     model.REGION, model.TECHNOLOGY, model.YEAR, domain=NonNegativeReals, initialize=0.0
 )
 model.TotalCapacityAnnual = Var(
-    model.REGION, model.TECHNOLOGY, model.YEAR, domain=NonNegativeReals, initialize=0.0
+    model.REGION,
+    model.TECHNOLOGY,
+    model.YEAR,
+    domain=NonNegativeReals,
+    bounds=TotalCapacityAnnual_bounds,
+    initialize=TotalCapacityAnnual_init,
 )
 
 #########		    Activity Variables 			#############
@@ -364,31 +759,30 @@ model.TotalAnnualTechnologyActivityByMode = Var(
     domain=NonNegativeReals,
     initialize=0.0,
 )
+
+
+# The rates and amounts of a fuel that no technology produces (uses) are not
+# defined by any row, so they are held at zero instead.
+def Production_bounds(model, r, l, f, y):
+    return (0, None if (r, f, y) in model.FUEL_PRODUCED else 0)
+
+
+def Use_bounds(model, r, l, f, y):
+    return (0, None if (r, f, y) in model.FUEL_USED else 0)
+
+
 model.RateOfProductionByTechnologyByMode = Var(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.MODE_OF_OPERATION,
-    model.FUEL,
-    model.YEAR,
+    model.PRODUCTION_BY_MODE,
     domain=NonNegativeReals,
     initialize=0.0,
 )
 model.RateOfProductionByTechnology = Var(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.FUEL,
-    model.YEAR,
+    model.PRODUCTION_BY_TECHNOLOGY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
 model.ProductionByTechnology = Var(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.FUEL,
-    model.YEAR,
+    model.PRODUCTION_BY_TECHNOLOGY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
@@ -406,6 +800,7 @@ model.RateOfProduction = Var(
     model.FUEL,
     model.YEAR,
     domain=NonNegativeReals,
+    bounds=Production_bounds,
     initialize=0.0,
 )
 model.Production = Var(
@@ -414,24 +809,16 @@ model.Production = Var(
     model.FUEL,
     model.YEAR,
     domain=NonNegativeReals,
+    bounds=Production_bounds,
     initialize=0.0,
 )
 model.RateOfUseByTechnologyByMode = Var(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.MODE_OF_OPERATION,
-    model.FUEL,
-    model.YEAR,
+    model.USE_BY_MODE,
     domain=NonNegativeReals,
     initialize=0.0,
 )
 model.RateOfUseByTechnology = Var(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.FUEL,
-    model.YEAR,
+    model.USE_BY_TECHNOLOGY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
@@ -449,14 +836,11 @@ model.RateOfUse = Var(
     model.FUEL,
     model.YEAR,
     domain=NonNegativeReals,
+    bounds=Use_bounds,
     initialize=0.0,
 )
 model.UseByTechnology = Var(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.FUEL,
-    model.YEAR,
+    model.USE_BY_TECHNOLOGY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
@@ -466,14 +850,11 @@ model.Use = Var(
     model.FUEL,
     model.YEAR,
     domain=NonNegativeReals,
+    bounds=Use_bounds,
     initialize=0.0,
 )
-model.Trade = Var(
-    model.REGION, model.REGION, model.TIMESLICE, model.FUEL, model.YEAR, initialize=0.0
-)
-model.TradeAnnual = Var(
-    model.REGION, model.REGION, model.FUEL, model.YEAR, initialize=0.0
-)
+model.Trade = Var(model.TRADE_BY_TIMESLICE, initialize=0.0)
+model.TradeAnnual = Var(model.TRADE_LINK, initialize=0.0)
 
 model.ProductionAnnual = Var(
     model.REGION, model.FUEL, model.YEAR, domain=NonNegativeReals, initialize=0.0
@@ -554,27 +935,17 @@ model.TotalTechnologyModelPeriodActivity = Var(
 #########			Emissions					#############
 
 model.AnnualTechnologyEmissionByMode = Var(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.EMISSION,
-    model.MODE_OF_OPERATION,
-    model.YEAR,
+    model.EMISSION_ACTIVITY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
 model.AnnualTechnologyEmission = Var(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.EMISSION,
-    model.YEAR,
+    model.EMITTING_TECHNOLOGY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
 model.AnnualTechnologyEmissionPenaltyByEmission = Var(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.EMISSION,
-    model.YEAR,
+    model.EMITTING_TECHNOLOGY,
     domain=NonNegativeReals,
     initialize=0.0,
 )
@@ -628,9 +999,7 @@ model.SpecifiedDemand = Constraint(
 
 def TotalNewCapacity_1_rule(model, r, t, y):
     return model.AccumulatedNewCapacity[r, t, y] == sum(
-        model.NewCapacity[r, t, yy]
-        for yy in model.YEAR
-        if ((y - yy < model.OperationalLife[r, t]) and (y - yy >= 0))
+        model.NewCapacity[r, t, yy] for yy in model.TECHNOLOGY_VINTAGE[r, t, y]
     )
 
 
@@ -729,32 +1098,26 @@ model.PlannedMaintenance = Constraint(
 #########	        Energy Balance A    	 	#############
 
 
-def RateOfFuelProduction1_rule(model, r, l, f, t, m, y):
-    if model.OutputActivityRatio[r, t, f, m, y] != 0:
-        return (
-            model.RateOfProductionByTechnologyByMode[r, l, t, m, f, y]
-            == model.RateOfActivity[r, l, t, m, y]
-            * model.OutputActivityRatio[r, t, f, m, y]
-        )
-    else:
-        return model.RateOfProductionByTechnologyByMode[r, l, t, m, f, y] == 0
+def RateOfFuelProduction1_rule(model, r, l, t, m, f, y):
+    return (
+        model.RateOfProductionByTechnologyByMode[r, l, t, m, f, y]
+        == model.RateOfActivity[r, l, t, m, y]
+        * model.OutputActivityRatio[r, t, f, m, y]
+    )
 
 
 model.RateOfFuelProduction1 = Constraint(
-    model.REGION,
-    model.TIMESLICE,
-    model.FUEL,
-    model.TECHNOLOGY,
-    model.MODE_OF_OPERATION,
-    model.YEAR,
-    rule=RateOfFuelProduction1_rule,
+    model.PRODUCTION_BY_MODE, rule=RateOfFuelProduction1_rule
 )
 
 
 def RateOfFuelProduction2_rule(model, r, l, f, t, y):
+    if (r, t, f, y) not in model.FUEL_PRODUCED_BY:
+        return Constraint.Skip
     return model.RateOfProductionByTechnology[r, l, t, f, y] == sum(
         model.RateOfProductionByTechnologyByMode[r, l, t, m, f, y]
         for m in model.MODE_OF_OPERATION
+        if (r, t, f, m, y) in model.ACTIVITY_OUTPUT
     )
 
 
@@ -768,9 +1131,15 @@ model.RateOfFuelProduction2 = Constraint(
 )
 
 
+# RateOfProductionByTechnology only exists for the technologies that produce
+# the fuel (PRODUCTION_BY_TECHNOLOGY), so the sum runs over those.
 def RateOfFuelProduction3_rule(model, r, l, f, y):
+    if (r, f, y) not in model.FUEL_PRODUCED:
+        return Constraint.Skip
     return model.RateOfProduction[r, l, f, y] == sum(
-        model.RateOfProductionByTechnology[r, l, t, f, y] for t in model.TECHNOLOGY
+        model.RateOfProductionByTechnology[r, l, t, f, y]
+        for t in model.TECHNOLOGY
+        if (r, t, f, y) in model.FUEL_PRODUCED_BY
     )
 
 
@@ -783,28 +1152,23 @@ model.RateOfFuelProduction3 = Constraint(
 )
 
 
-def RateOfFuelUse1_rule(model, r, l, f, t, m, y):
+def RateOfFuelUse1_rule(model, r, l, t, m, f, y):
     return (
         model.RateOfActivity[r, l, t, m, y] * model.InputActivityRatio[r, t, f, m, y]
         == model.RateOfUseByTechnologyByMode[r, l, t, m, f, y]
     )
 
 
-model.RateOfFuelUse1 = Constraint(
-    model.REGION,
-    model.TIMESLICE,
-    model.FUEL,
-    model.TECHNOLOGY,
-    model.MODE_OF_OPERATION,
-    model.YEAR,
-    rule=RateOfFuelUse1_rule,
-)
+model.RateOfFuelUse1 = Constraint(model.USE_BY_MODE, rule=RateOfFuelUse1_rule)
 
 
 def RateOfFuelUse2_rule(model, r, l, f, t, y):
+    if (r, t, f, y) not in model.FUEL_USED_BY:
+        return Constraint.Skip
     return model.RateOfUseByTechnology[r, l, t, f, y] == sum(
         model.RateOfUseByTechnologyByMode[r, l, t, m, f, y]
         for m in model.MODE_OF_OPERATION
+        if (r, t, f, m, y) in model.ACTIVITY_INPUT
     )
 
 
@@ -819,8 +1183,14 @@ model.RateOfFuelUse2 = Constraint(
 
 
 def RateOfFuelUse3_rule(model, r, l, f, y):
+    if (r, f, y) not in model.FUEL_USED:
+        return Constraint.Skip
     return (
-        sum(model.RateOfUseByTechnology[r, l, t, f, y] for t in model.TECHNOLOGY)
+        sum(
+            model.RateOfUseByTechnology[r, l, t, f, y]
+            for t in model.TECHNOLOGY
+            if (r, t, f, y) in model.FUEL_USED_BY
+        )
         == model.RateOfUse[r, l, f, y]
     )
 
@@ -831,6 +1201,8 @@ model.RateOfFuelUse3 = Constraint(
 
 
 def EnergyBalanceEachTS1_rule(model, r, l, f, y):
+    if (r, f, y) not in model.FUEL_PRODUCED:
+        return Constraint.Skip
     return (
         model.RateOfProduction[r, l, f, y] * model.YearSplit[l, y]
         == model.Production[r, l, f, y]
@@ -847,6 +1219,8 @@ model.EnergyBalanceEachTS1 = Constraint(
 
 
 def EnergyBalanceEachTS2_rule(model, r, l, f, y):
+    if (r, f, y) not in model.FUEL_USED:
+        return Constraint.Skip
     return model.RateOfUse[r, l, f, y] * model.YearSplit[l, y] == model.Use[r, l, f, y]
 
 
@@ -875,17 +1249,15 @@ model.EnergyBalanceEachTS3 = Constraint(
 )
 
 
+# One row per unordered pair of regions; (rr, r) would repeat it.
 def EnergyBalanceEachTS4_rule(model, r, rr, l, f, y):
+    if model.REGION.ord(r) > model.REGION.ord(rr):
+        return Constraint.Skip
     return model.Trade[r, rr, l, f, y] + model.Trade[rr, r, l, f, y] == 0
 
 
 model.EnergyBalanceEachTS4 = Constraint(
-    model.REGION,
-    model.REGION,
-    model.TIMESLICE,
-    model.FUEL,
-    model.YEAR,
-    rule=EnergyBalanceEachTS4_rule,
+    model.TRADE_BY_TIMESLICE, rule=EnergyBalanceEachTS4_rule
 )
 
 
@@ -895,6 +1267,7 @@ def EnergyBalanceEachTS5_rule(model, r, l, f, y):
     ] + sum(
         model.Trade[r, rr, l, f, y] * model.TradeRoute[r, rr, f, y]
         for rr in model.REGION
+        if (r, rr, f, y) in model.TRADE_LINK
     )
 
 
@@ -941,7 +1314,7 @@ def EnergyBalanceEachYear3_rule(model, r, rr, f, y):
 
 
 model.EnergyBalanceEachYear3 = Constraint(
-    model.REGION, model.REGION, model.FUEL, model.YEAR, rule=EnergyBalanceEachYear3_rule
+    model.TRADE_LINK, rule=EnergyBalanceEachYear3_rule
 )
 
 
@@ -952,6 +1325,7 @@ def EnergyBalanceEachYear4_rule(model, r, f, y):
         + sum(
             model.TradeAnnual[r, rr, f, y] * model.TradeRoute[r, rr, f, y]
             for rr in model.REGION
+            if (r, rr, f, y) in model.TRADE_LINK
         )
         + model.AccumulatedAnnualDemand[r, f, y]
     )
@@ -973,12 +1347,7 @@ def FuelProductionByTechnology_rule(model, r, l, t, f, y):
 
 
 model.FuelProductionByTechnology = Constraint(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.FUEL,
-    model.YEAR,
-    rule=FuelProductionByTechnology_rule,
+    model.PRODUCTION_BY_TECHNOLOGY, rule=FuelProductionByTechnology_rule
 )
 
 
@@ -990,12 +1359,7 @@ def FuelUseByTechnology_rule(model, r, l, t, f, y):
 
 
 model.FuelUseByTechnology = Constraint(
-    model.REGION,
-    model.TIMESLICE,
-    model.TECHNOLOGY,
-    model.FUEL,
-    model.YEAR,
-    rule=FuelUseByTechnology_rule,
+    model.USE_BY_TECHNOLOGY, rule=FuelUseByTechnology_rule
 )
 
 
@@ -1032,23 +1396,15 @@ model.ModelPeriodCostByRegion_constraint = Constraint(
 #########			Storage equations	(15)		#############
 
 
-def RateOfStorageCharge_rule(model, r, s, ls, ld, lh, y, t, m):
-    if model.TechnologyToStorage[r, t, s, m] > 0:
-        return (
-            sum(
-                model.RateOfActivity[r, l, t, m, y]
-                * model.TechnologyToStorage[r, t, s, m]
-                * model.Conversionls[l, ls]
-                * model.Conversionld[l, ld]
-                * model.Conversionlh[l, lh]
-                for m in model.MODE_OF_OPERATION
-                for l in model.TIMESLICE
-                for t in model.TECHNOLOGY
-            )
-            == model.RateOfStorageCharge[r, s, ls, ld, lh, y]
+def RateOfStorageCharge_rule(model, r, s, ls, ld, lh, y):
+    return (
+        sum(
+            model.RateOfActivity[r, l, t, m, y] * model.TechnologyToStorage[r, t, s, m]
+            for (t, m) in model.TECHNOLOGY_TO_STORAGE[r, s]
+            for l in model.TIMESLICE_OF_BRACKET[ls, ld, lh]
         )
-    else:
-        return Constraint.Skip
+        == model.RateOfStorageCharge[r, s, ls, ld, lh, y]
+    )
 
 
 model.RateOfStorageCharge_constraint = Constraint(
@@ -1058,29 +1414,20 @@ model.RateOfStorageCharge_constraint = Constraint(
     model.DAYTYPE,
     model.DAILYTIMEBRACKET,
     model.YEAR,
-    model.TECHNOLOGY,
-    model.MODE_OF_OPERATION,
     rule=RateOfStorageCharge_rule,
 )
 
 
-def RateOfStorageDischarge_rule(model, r, s, ls, ld, lh, y, t, m):
-    if model.TechnologyFromStorage[r, t, s, m] > 0:
-        return (
-            sum(
-                model.RateOfActivity[r, l, t, m, y]
-                * model.TechnologyFromStorage[r, t, s, m]
-                * model.Conversionls[l, ls]
-                * model.Conversionld[l, ld]
-                * model.Conversionlh[l, lh]
-                for m in model.MODE_OF_OPERATION
-                for l in model.TIMESLICE
-                for t in model.TECHNOLOGY
-            )
-            == model.RateOfStorageDischarge[r, s, ls, ld, lh, y]
+def RateOfStorageDischarge_rule(model, r, s, ls, ld, lh, y):
+    return (
+        sum(
+            model.RateOfActivity[r, l, t, m, y]
+            * model.TechnologyFromStorage[r, t, s, m]
+            for (t, m) in model.TECHNOLOGY_FROM_STORAGE[r, s]
+            for l in model.TIMESLICE_OF_BRACKET[ls, ld, lh]
         )
-    else:
-        return Constraint.Skip
+        == model.RateOfStorageDischarge[r, s, ls, ld, lh, y]
+    )
 
 
 model.RateOfStorageDischarge_constraint = Constraint(
@@ -1090,24 +1437,16 @@ model.RateOfStorageDischarge_constraint = Constraint(
     model.DAYTYPE,
     model.DAILYTIMEBRACKET,
     model.YEAR,
-    model.TECHNOLOGY,
-    model.MODE_OF_OPERATION,
     rule=RateOfStorageDischarge_rule,
 )
 
 
 def NetChargeWithinYear_rule(model, r, s, ls, ld, lh, y):
     return (
-        sum(
-            (
-                model.RateOfStorageCharge[r, s, ls, ld, lh, y]
-                - model.RateOfStorageDischarge[r, s, ls, ld, lh, y]
-            )
-            * model.YearSplit[l, y]
-            * model.Conversionls[l, ls]
-            * model.Conversionld[l, ld]
-            * model.Conversionlh[l, lh]
-            for l in model.TIMESLICE
+        sum(model.YearSplit[l, y] for l in model.TIMESLICE_OF_BRACKET[ls, ld, lh])
+        * (
+            model.RateOfStorageCharge[r, s, ls, ld, lh, y]
+            - model.RateOfStorageDischarge[r, s, ls, ld, lh, y]
         )
         == model.NetChargeWithinYear[r, s, ls, ld, lh, y]
     )
@@ -1143,7 +1482,7 @@ model.NetChargeWithinDay_constraint = Constraint(
 
 
 def StorageLevelYearStart_rule(model, r, s, y):
-    if y == min(model.YEAR):
+    if y == model.FirstYear:
         return model.StorageLevelStart[r, s] == model.StorageLevelYearStart[r, s, y]
     else:
         return (
@@ -1164,7 +1503,7 @@ model.StorageLevelYearStart_constraint = Constraint(
 
 
 def StorageLevelYearFinish_rule(model, r, s, y):
-    if y < max(model.YEAR):
+    if y < model.LastYear:
         return (
             model.StorageLevelYearStart[r, s, y + 1]
             == model.StorageLevelYearFinish[r, s, y]
@@ -1495,10 +1834,13 @@ model.UpperLimit_1TimeBracket1InstanceOfDayTypeLastweek_constraint = Constraint(
 
 
 def MaxChargeConstraint_rule(model, r, s, ls, ld, lh, y):
-    return (
-        model.RateOfStorageCharge[r, s, ls, ld, lh, y]
-        <= model.StorageMaxChargeRate[r, s]
-    )
+    if not model.UseVariableBounds:
+        return (
+            model.RateOfStorageCharge[r, s, ls, ld, lh, y]
+            <= model.StorageMaxChargeRate[r, s]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.MaxChargeConstraint_constraint = Constraint(
@@ -1513,10 +1855,13 @@ model.MaxChargeConstraint_constraint = Constraint(
 
 
 def MaxDischargeConstraint_rule(model, r, s, ls, ld, lh, y):
-    return (
-        model.RateOfStorageDischarge[r, s, ls, ld, lh, y]
-        <= model.StorageMaxDischargeRate[r, s]
-    )
+    if not model.UseVariableBounds:
+        return (
+            model.RateOfStorageDischarge[r, s, ls, ld, lh, y]
+            <= model.StorageMaxDischargeRate[r, s]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.MaxDischargeConstraint_constraint = Constraint(
@@ -1560,11 +1905,7 @@ model.StorageLowerLimit_constraint = Constraint(
 
 def TotalNewStorage_rule(model, r, s, y):
     return (
-        sum(
-            model.NewStorageCapacity[r, s, yy]
-            for yy in model.YEAR
-            if ((y - yy < model.OperationalLifeStorage[r, s]) and (y - yy >= 0))
-        )
+        sum(model.NewStorageCapacity[r, s, yy] for yy in model.STORAGE_VINTAGE[r, s, y])
         == model.AccumulatedNewStorageCapacity[r, s, y]
     )
 
@@ -1591,8 +1932,7 @@ model.UndiscountedCapitalInvestmentStorage_constraint = Constraint(
 
 def DiscountingCapitalInvestmentStorage_rule(model, r, s, y):
     return (
-        model.CapitalInvestmentStorage[r, s, y]
-        / ((1 + model.DiscountRate[r]) ** (y - min(model.YEAR)))
+        model.CapitalInvestmentStorage[r, s, y] / model.DiscountFactor[r, y]
         == model.DiscountedCapitalInvestmentStorage[r, s, y]
     )
 
@@ -1606,36 +1946,11 @@ model.DiscountingCapitalInvestmentStorage_constraint = Constraint(
 
 
 def SalvageValueStorageAtEndOfPeriod_rule(model, r, s, y):
-    if (
-        model.DepreciationMethod[r] == 1
-        and ((y + model.OperationalLifeStorage[r, s] - 1) > max(model.YEAR))
-        and model.DiscountRate[r] > 0
-    ):
-        return model.SalvageValueStorage[r, s, y] == model.CapitalInvestmentStorage[
-            r, s, y
-        ] * (
-            1
-            - (
-                ((1 + model.DiscountRate[r]) ** (max(model.YEAR) - y + 1) - 1)
-                / (
-                    (1 + model.DiscountRate[r]) ** model.OperationalLifeStorage[r, s]
-                    - 1
-                )
-            )
-        )
-    elif (
-        model.DepreciationMethod[r] == 1
-        and ((y + model.OperationalLifeStorage[r, s] - 1) > max(model.YEAR))
-        and model.DiscountRate[r] == 0
-    ) or (
-        model.DepreciationMethod[r] == 2
-        and (y + model.OperationalLifeStorage[r, s] - 1) > (max(model.YEAR))
-    ):
-        return model.SalvageValueStorage[r, s, y] == model.CapitalInvestmentStorage[
-            r, s, y
-        ] * (1 - (max(model.YEAR) - y + 1) / model.OperationalLifeStorage[r, s])
-    else:
-        return model.SalvageValueStorage[r, s, y] == 0
+    return (
+        model.SalvageValueStorage[r, s, y]
+        == model.CapitalInvestmentStorage[r, s, y]
+        * model.SalvageValueFractionStorage[r, s, y]
+    )
 
 
 model.SalvageValueStorageAtEndOfPeriod_constraint = Constraint(
@@ -1645,8 +1960,7 @@ model.SalvageValueStorageAtEndOfPeriod_constraint = Constraint(
 
 def SalvageValueStorageDiscountedToStartYear_rule(model, r, s, y):
     return (
-        model.SalvageValueStorage[r, s, y]
-        / ((1 + model.DiscountRate[r]) ** (max(model.YEAR) - min(model.YEAR) + 1))
+        model.SalvageValueStorage[r, s, y] / model.DiscountFactorSalvage[r]
         == model.DiscountedSalvageValueStorage[r, s, y]
     )
 
@@ -1689,8 +2003,7 @@ model.UndiscountedCapitalInvestment = Constraint(
 
 def DiscountedCapitalInvestment_rule(model, r, t, y):
     return (
-        model.CapitalInvestment[r, t, y]
-        / ((1 + model.DiscountRate[r]) ** (y - min(model.YEAR)))
+        model.CapitalInvestment[r, t, y] / model.DiscountFactor[r, y]
         == model.DiscountedCapitalInvestment[r, t, y]
     )
 
@@ -1703,7 +2016,7 @@ model.DiscountedCapitalInvestment_constraint = Constraint(
 #########        	Operating Costs 		 	#############
 
 
-def OperatingCostsVariable_rule(model, r, t, l, y):
+def OperatingCostsVariable_rule(model, r, t, y):
     return (
         sum(
             model.TotalAnnualTechnologyActivityByMode[r, t, m, y]
@@ -1715,11 +2028,7 @@ def OperatingCostsVariable_rule(model, r, t, l, y):
 
 
 model.OperatingCostsVariable = Constraint(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.TIMESLICE,
-    model.YEAR,
-    rule=OperatingCostsVariable_rule,
+    model.REGION, model.TECHNOLOGY, model.YEAR, rule=OperatingCostsVariable_rule
 )
 
 
@@ -1750,8 +2059,7 @@ model.OperatingCostsTotalAnnual = Constraint(
 
 def DiscountedOperatingCostsTotalAnnual_rule(model, r, t, y):
     return (
-        model.OperatingCost[r, t, y]
-        / ((1 + model.DiscountRate[r]) ** (y - min(model.YEAR) + 0.5))
+        model.OperatingCost[r, t, y] / model.DiscountFactorMid[r, y]
         == model.DiscountedOperatingCost[r, t, y]
     )
 
@@ -1801,7 +2109,12 @@ model.TotalDiscountedCost_constraint = Constraint(
 
 
 def TotalAnnualMaxCapacityConstraint_rule(model, r, t, y):
-    return model.TotalCapacityAnnual[r, t, y] <= model.TotalAnnualMaxCapacity[r, t, y]
+    if model.TotalAnnualMaxCapacity[r, t, y] != 99999 and not model.UseVariableBounds:
+        return (
+            model.TotalCapacityAnnual[r, t, y] <= model.TotalAnnualMaxCapacity[r, t, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalAnnualMaxCapacityConstraint = Constraint(
@@ -1813,7 +2126,12 @@ model.TotalAnnualMaxCapacityConstraint = Constraint(
 
 
 def TotalAnnualMinCapacityConstraint_rule(model, r, t, y):
-    return model.TotalCapacityAnnual[r, t, y] >= model.TotalAnnualMinCapacity[r, t, y]
+    if model.TotalAnnualMinCapacity[r, t, y] > 0 and not model.UseVariableBounds:
+        return (
+            model.TotalCapacityAnnual[r, t, y] >= model.TotalAnnualMinCapacity[r, t, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalAnnualMinCapacityConstraint = Constraint(
@@ -1827,35 +2145,12 @@ model.TotalAnnualMinCapacityConstraint = Constraint(
 
 
 def SalvageValueAtEndOfPeriod1_rule(model, r, t, y):
-    if (
-        model.DepreciationMethod[r] == 1
-        and ((y + model.OperationalLife[r, t] - 1) > max(model.YEAR))
-        and model.DiscountRate[r] > 0
-    ):
-        return model.SalvageValue[r, t, y] == model.CapitalCost[
-            r, t, y
-        ] * model.NewCapacity[r, t, y] * (
-            1
-            - (
-                ((1 + model.DiscountRate[r]) ** (max(model.YEAR) - y + 1) - 1)
-                / ((1 + model.DiscountRate[r]) ** model.OperationalLife[r, t] - 1)
-            )
-        )
-    elif (
-        model.DepreciationMethod[r] == 1
-        and ((y + model.OperationalLife[r, t] - 1) > max(model.YEAR))
-        and model.DiscountRate[r] == 0
-    ) or (
-        model.DepreciationMethod[r] == 2
-        and (y + model.OperationalLife[r, t] - 1) > (max(model.YEAR))
-    ):
-        return model.SalvageValue[r, t, y] == model.CapitalCost[
-            r, t, y
-        ] * model.NewCapacity[r, t, y] * (
-            1 - (max(model.YEAR) - y + 1) / model.OperationalLife[r, t]
-        )
-    else:
-        return model.SalvageValue[r, t, y] == 0
+    return (
+        model.SalvageValue[r, t, y]
+        == model.CapitalCost[r, t, y]
+        * model.NewCapacity[r, t, y]
+        * model.SalvageValueFraction[r, t, y]
+    )
 
 
 model.SalvageValueAtEndOfPeriod1 = Constraint(
@@ -1864,8 +2159,9 @@ model.SalvageValueAtEndOfPeriod1 = Constraint(
 
 
 def SalvageValueDiscountedToStartYear_rule(model, r, t, y):
-    return model.DiscountedSalvageValue[r, t, y] == model.SalvageValue[r, t, y] / (
-        (1 + model.DiscountRate[r]) ** (1 + max(model.YEAR) - min(model.YEAR))
+    return (
+        model.DiscountedSalvageValue[r, t, y]
+        == model.SalvageValue[r, t, y] / model.DiscountFactorSalvage[r]
     )
 
 
@@ -1880,7 +2176,16 @@ model.SalvageValueDiscountedToStartYear = Constraint(
 
 
 def TotalAnnualMaxNewCapacityConstraint_rule(model, r, t, y):
-    return model.NewCapacity[r, t, y] <= model.TotalAnnualMaxCapacityInvestment[r, t, y]
+    if (
+        model.TotalAnnualMaxCapacityInvestment[r, t, y] != 99999
+        and not model.UseVariableBounds
+    ):
+        return (
+            model.NewCapacity[r, t, y]
+            <= model.TotalAnnualMaxCapacityInvestment[r, t, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalAnnualMaxNewCapacityConstraint = Constraint(
@@ -1892,7 +2197,16 @@ model.TotalAnnualMaxNewCapacityConstraint = Constraint(
 
 
 def TotalAnnualMinNewCapacityConstraint_rule(model, r, t, y):
-    return model.NewCapacity[r, t, y] >= model.TotalAnnualMinCapacityInvestment[r, t, y]
+    if (
+        model.TotalAnnualMinCapacityInvestment[r, t, y] > 0
+        and not model.UseVariableBounds
+    ):
+        return (
+            model.NewCapacity[r, t, y]
+            >= model.TotalAnnualMinCapacityInvestment[r, t, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalAnnualMinNewCapacityConstraint = Constraint(
@@ -1921,10 +2235,13 @@ model.TotalAnnualTechnologyActivity = Constraint(
 
 
 def TotalAnnualTechnologyActivityUpperLimit_rule(model, r, t, y):
-    return (
-        model.TotalTechnologyAnnualActivity[r, t, y]
-        <= model.TotalTechnologyAnnualActivityUpperLimit[r, t, y]
-    )
+    if model.TotalTechnologyAnnualActivityUpperLimit[r, t, y] != 99999:
+        return (
+            model.TotalTechnologyAnnualActivity[r, t, y]
+            <= model.TotalTechnologyAnnualActivityUpperLimit[r, t, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalAnnualTechnologyActivityUpperlimit = Constraint(
@@ -1936,10 +2253,13 @@ model.TotalAnnualTechnologyActivityUpperlimit = Constraint(
 
 
 def TotalAnnualTechnologyActivityLowerLimit_rule(model, r, t, y):
-    return (
-        model.TotalTechnologyAnnualActivity[r, t, y]
-        >= model.TotalTechnologyAnnualActivityLowerLimit[r, t, y]
-    )
+    if model.TotalTechnologyAnnualActivityLowerLimit[r, t, y] > 0:
+        return (
+            model.TotalTechnologyAnnualActivity[r, t, y]
+            >= model.TotalTechnologyAnnualActivityLowerLimit[r, t, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalAnnualTechnologyActivityLowerlimit = Constraint(
@@ -1966,10 +2286,13 @@ model.TotalModelHorizonTechnologyActivity = Constraint(
 
 
 def TotalModelHorizonTechnologyActivityUpperLimit_rule(model, r, t):
-    return (
-        model.TotalTechnologyModelPeriodActivity[r, t]
-        <= model.TotalTechnologyModelPeriodActivityUpperLimit[r, t]
-    )
+    if model.TotalTechnologyModelPeriodActivityUpperLimit[r, t] != 99999:
+        return (
+            model.TotalTechnologyModelPeriodActivity[r, t]
+            <= model.TotalTechnologyModelPeriodActivityUpperLimit[r, t]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalModelHorizonTechnologyActivityUpperLimit = Constraint(
@@ -1980,10 +2303,13 @@ model.TotalModelHorizonTechnologyActivityUpperLimit = Constraint(
 
 
 def TotalModelHorizonTechnologyActivityLowerLimit_rule(model, r, t):
-    return (
-        model.TotalTechnologyModelPeriodActivity[r, t]
-        >= model.TotalTechnologyModelPeriodActivityLowerLimit[r, t]
-    )
+    if model.TotalTechnologyModelPeriodActivityLowerLimit[r, t] > 0:
+        return (
+            model.TotalTechnologyModelPeriodActivity[r, t]
+            >= model.TotalTechnologyModelPeriodActivityLowerLimit[r, t]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.TotalModelHorizonTechnologyActivityLowerLimit = Constraint(
@@ -1997,23 +2323,15 @@ model.TotalModelHorizonTechnologyActivityLowerLimit = Constraint(
 
 
 def AnnualEmissionProductionByMode_rule(model, r, t, e, m, y):
-    if model.EmissionActivityRatio[r, t, e, m, y] != 0:
-        return (
-            model.EmissionActivityRatio[r, t, e, m, y]
-            * model.TotalAnnualTechnologyActivityByMode[r, t, m, y]
-            == model.AnnualTechnologyEmissionByMode[r, t, e, m, y]
-        )
-    else:
-        return model.AnnualTechnologyEmissionByMode[r, t, e, m, y] == 0
+    return (
+        model.EmissionActivityRatio[r, t, e, m, y]
+        * model.TotalAnnualTechnologyActivityByMode[r, t, m, y]
+        == model.AnnualTechnologyEmissionByMode[r, t, e, m, y]
+    )
 
 
 model.AnnualEmissionProductionByMode = Constraint(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.EMISSION,
-    model.MODE_OF_OPERATION,
-    model.YEAR,
-    rule=AnnualEmissionProductionByMode_rule,
+    model.EMISSION_ACTIVITY, rule=AnnualEmissionProductionByMode_rule
 )
 
 
@@ -2022,17 +2340,14 @@ def AnnualEmissionProduction_rule(model, r, t, e, y):
         sum(
             model.AnnualTechnologyEmissionByMode[r, t, e, m, y]
             for m in model.MODE_OF_OPERATION
+            if (r, t, e, m, y) in model.EMISSION_ACTIVITY
         )
         == model.AnnualTechnologyEmission[r, t, e, y]
     )
 
 
 model.AnnualEmissionProduction = Constraint(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.EMISSION,
-    model.YEAR,
-    rule=AnnualEmissionProduction_rule,
+    model.EMITTING_TECHNOLOGY, rule=AnnualEmissionProduction_rule
 )
 
 
@@ -2044,10 +2359,7 @@ def EmissionPenaltyByTechAndEmission_rule(model, r, t, e, y):
 
 
 model.EmissionPenaltyByTechAndEmission = Constraint(
-    model.REGION,
-    model.TECHNOLOGY,
-    model.EMISSION,
-    model.YEAR,
+    model.EMITTING_TECHNOLOGY,
     rule=EmissionPenaltyByTechAndEmission_rule,
 )
 
@@ -2057,6 +2369,7 @@ def EmissionsPenaltyByTechnology_rule(model, r, t, y):
         sum(
             model.AnnualTechnologyEmissionPenaltyByEmission[r, t, e, y]
             for e in model.EMISSION
+            if (r, t, e, y) in model.EMITTING_TECHNOLOGY
         )
         == model.AnnualTechnologyEmissionsPenalty[r, t, y]
     )
@@ -2069,8 +2382,7 @@ model.EmissionsPenaltyByTechnology = Constraint(
 
 def DiscountedEmissionsPenaltyByTechnology_rule(model, r, t, y):
     return (
-        model.AnnualTechnologyEmissionsPenalty[r, t, y]
-        / ((1 + model.DiscountRate[r]) ** (y - min(model.YEAR) + 0.5))
+        model.AnnualTechnologyEmissionsPenalty[r, t, y] / model.DiscountFactorMid[r, y]
         == model.DiscountedTechnologyEmissionsPenalty[r, t, y]
     )
 
@@ -2085,7 +2397,11 @@ model.DiscountedEmissionsPenaltyByTechnology = Constraint(
 
 def EmissionsAccounting1_rule(model, r, e, y):
     return (
-        sum(model.AnnualTechnologyEmission[r, t, e, y] for t in model.TECHNOLOGY)
+        sum(
+            model.AnnualTechnologyEmission[r, t, e, y]
+            for t in model.TECHNOLOGY
+            if (r, t, e, y) in model.EMITTING_TECHNOLOGY
+        )
         == model.AnnualEmissions[r, e, y]
     )
 
@@ -2108,10 +2424,14 @@ model.EmissionsAccounting2 = Constraint(
 
 
 def AnnualEmissionsLimit_rule(model, r, e, y):
-    return (
-        model.AnnualEmissions[r, e, y] + model.AnnualExogenousEmission[r, e, y]
-        <= model.AnnualEmissionLimit[r, e, y]
-    )
+    # A mutable limit keeps every row, so that a scenario can tighten it later.
+    if model.AnnualEmissionLimit.mutable or model.AnnualEmissionLimit[r, e, y] != 99999:
+        return (
+            model.AnnualEmissions[r, e, y] + model.AnnualExogenousEmission[r, e, y]
+            <= model.AnnualEmissionLimit[r, e, y]
+        )
+    else:
+        return Constraint.Skip
 
 
 model.AnnualEmissionsLimit = Constraint(
@@ -2120,7 +2440,13 @@ model.AnnualEmissionsLimit = Constraint(
 
 
 def ModelPeriodEmissionsLimit_rule(model, r, e):
-    return model.ModelPeriodEmissions[r, e] <= model.ModelPeriodEmissionLimit[r, e]
+    if (
+        model.ModelPeriodEmissionLimit.mutable
+        or model.ModelPeriodEmissionLimit[r, e] != 99999
+    ):
+        return model.ModelPeriodEmissions[r, e] <= model.ModelPeriodEmissionLimit[r, e]
+    else:
+        return Constraint.Skip
 
 
 model.ModelPeriodEmissionsLimit = Constraint(
@@ -2131,7 +2457,7 @@ model.ModelPeriodEmissionsLimit = Constraint(
 #########   		Reserve Margin Constraint	############## NTS: Should change demand for production
 
 
-def ReserveMargin_TechnologiesIncluded_rule(model, r, l, y):
+def ReserveMargin_TechnologiesIncluded_rule(model, r, y):
     return (
         sum(
             (
@@ -2146,10 +2472,7 @@ def ReserveMargin_TechnologiesIncluded_rule(model, r, l, y):
 
 
 model.ReserveMargin_TechnologiesIncluded = Constraint(
-    model.REGION,
-    model.TIMESLICE,
-    model.YEAR,
-    rule=ReserveMargin_TechnologiesIncluded_rule,
+    model.REGION, model.YEAR, rule=ReserveMargin_TechnologiesIncluded_rule
 )
 
 
@@ -0,0 +1,243 @@
+"""
+Structural audit of the OSeMOSYS model.
+
+Builds an instance from a data set and reports, by constraint or variable
+family, the parts of the LP that add size without adding anything:
+- duplicate rows: the same variables with the same coefficients and bounds as
+  an earlier row, found by hashing every row;
+- empty rows: no variable is left with a nonzero coefficient;
+- dead rows: a single variable that appears in no other row nor in the
+  objective, so the row only fixes or bounds a value nothing reads;
+- unused dimensions: a family whose rows are the same along one of its index
+  dimensions, for every combination of its other indices;
+- unused variables: variables that appear in no row and not in the objective.
+
+  python osemosys_audit.py datafile.dat
+  python osemosys_audit.py datafile.dat --model osemosys_compact
+  python osemosys_audit.py datafile.dat --save audit.json
+  python osemosys_audit.py datafile.dat --baseline audit.json
+
+exits with a non-zero status if there are any findings or, given a baseline
+saved earlier with --save, if any count is above it, so it can be run on
+every change of the model to keep new structural waste out.
+"""
+
+import argparse
+import importlib
+import json
+import sys
+from collections import Counter
+
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.environ import *
+from pyomo.repn import generate_standard_repn
+
+import osemosys_data
+
+CHECKS = (
+    "duplicate rows",
+    "empty rows",
+    "dead rows",
+    "unused dimensions",
+    "unused variables",
+)
+
+
+def row_key(data):
+    """Return a hashable form of a constraint row: its terms (variable,
+    coefficient) in a fixed order and its bounds with the constant moved to
+    them."""
+    repn = generate_standard_repn(data.body, quadratic=False)
+    terms = tuple(
+        sorted(
+            (id(var), coef)
+            for var, coef in zip(repn.linear_vars, repn.linear_coefs)
+            if coef != 0
+        )
+    )
+    constant = value(repn.constant)
+    lower = None if data.lower is None else value(data.lower) - constant
+    upper = None if data.upper is None else value(data.upper) - constant
+    return terms, lower, upper
+
+
+def index_labels(component):
+    """Return the name of every position of the index of component, as the
+    set it ranges over (with the position within multi-dimensional sets)."""
+    labels = []
+    for s in component.index_set().subsets():
+        if s.dimen == 1:
+            labels.append(s.local_name)
+        else:
+            labels.extend(f"{s.local_name}[{i}]" for i in range(s.dimen))
+    return labels
+
+
+def unused_dimensions(component, keys=None):
+    """Return [(position, repeated rows)] for every index position of the
+    constraint family along which all its rows are the same; keys maps the
+    indices of its rows to their row_key."""
+    if keys is None:
+        keys = {index: row_key(data) for index, data in component.items()}
+    keys = {
+        (index if isinstance(index, tuple) else (index,)): key
+        for index, key in keys.items()
+    }
+    dimen = len(next(iter(keys), ()))
+    found = []
+    for position in range(dimen):
+        first = {}
+        repeated = 0
+        for index, key in keys.items():
+            rest = index[:position] + index[position + 1 :]
+            if rest not in first:
+                first[rest] = key
+            elif first[rest] == key:
+                repeated += 1
+            else:
+                break
+        else:
+            if repeated:
+                found.append((position, repeated))
+    return found
+
+
+def _label(name, index):
+    if index is None:
+        return name
+    index = index if isinstance(index, tuple) else (index,)
+    return f"{name}[{','.join(str(i) for i in index)}]"
+
+
+def audit(instance):
+    """Return {family: {check: (count, example)}} of the findings on the
+    active constraints and the variables of instance."""
+    keys = {}
+    for component in instance.component_objects(Constraint, active=True):
+        keys[component] = {index: row_key(data) for index, data in component.items()}
+    uses = Counter()
+    for family in keys.values():
+        for terms, _, _ in family.values():
+            uses.update(var for var, _ in terms)
+    for objective in instance.component_objects(Objective, active=True):
+        for data in objective.values():
+            uses.update(id(var) for var in identify_variables(data.expr))
+
+    findings = {}
+
+    def add(family, check, count, example):
+        if count:
+            findings.setdefault(family, {})[check] = (count, example)
+
+    first = {}
+    for component, family in keys.items():
+        name = component.local_name
+        found = {check: [0, None] for check in CHECKS}
+        for index, key in family.items():
+            terms, lower, upper = key
+            if not terms:
+                check = "empty rows"
+                feasible = (lower is None or lower <= 0) and (
+                    upper is None or upper >= 0
+                )
+                example = _label(name, index) + ("" if feasible else " (infeasible)")
+            elif key in first:
+                check = "duplicate rows"
+                example = f"{_label(name, index)} repeats {first[key]}"
+            elif len(terms) == 1 and uses[terms[0][0]] == 1:
+                check = "dead rows"
+                example = _label(name, index)
+            else:
+                first[key] = _label(name, index)
+                continue
+            found[check][0] += 1
+            found[check][1] = found[check][1] or example
+        for check, (count, example) in found.items():
+            add(name, check, count, example)
+        if component.is_indexed() and family:
+            labels = index_labels(component)
+            dimensions = unused_dimensions(component, family)
+            add(
+                name,
+                "unused dimensions",
+                sum(repeated for _, repeated in dimensions),
+                ", ".join(labels[position] for position, _ in dimensions),
+            )
+
+    for component in instance.component_objects(Var):
+        unused = [index for index, data in component.items() if not uses[id(data)]]
+        add(
+            component.local_name,
+            "unused variables",
+            len(unused),
+            _label(component.local_name, unused[0]) if unused else None,
+        )
+    return findings
+
+
+def counts(findings):
+    """Return {family: {check: count}} of the findings, as saved by --save."""
+    return {
+        family: {check: count for check, (count, _) in checks.items()}
+        for family, checks in findings.items()
+    }
+
+
+def regressions(findings, baseline):
+    """Return (family, check, count, baseline count) for every count of the
+    findings above that of the baseline."""
+    return [
+        (family, check, count, baseline.get(family, {}).get(check, 0))
+        for family, checks in counts(findings).items()
+        for check, count in checks.items()
+        if count > baseline.get(family, {}).get(check, 0)
+    ]
+
+
+def report(findings):
+    """Return the findings as text, grouped by family."""
+    lines = []
+    for family in sorted(findings):
+        lines.append(family)
+        for check in CHECKS:
+            if check in findings[family]:
+                count, example = findings[family][check]
+                lines.append(f"  {count:>8} {check:<18} e.g. {example}")
+    totals = Counter()
+    for checks in findings.values():
+        for check, (count, _) in checks.items():
+            totals[check] += count
+    lines.append(", ".join(f"{totals[check]} {check}" for check in CHECKS))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("--model", default="osemosys", help="module defining model")
+    parser.add_argument("--save", metavar="FILE", help="write the counts as JSON")
+    parser.add_argument(
+        "--baseline", metavar="FILE", help="fail only on counts above these"
+    )
+    args = parser.parse_args(argv)
+
+    model = importlib.import_module(args.model).model
+    instance = osemosys_data.create_instance(model, args.datafile)
+    findings = audit(instance)
+    print(report(findings))
+    if args.save:
+        with open(args.save, "w") as json_file:
+            json.dump(counts(findings), json_file, indent=1, sort_keys=True)
+        return 0
+    if args.baseline:
+        with open(args.baseline) as json_file:
+            baseline = json.load(json_file)
+        found = regressions(findings, baseline)
+        for family, check, count, allowed in found:
+            print(f"{family}: {count} {check}, {allowed} in the baseline")
+        return 1 if found else 0
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Batch runs of independent OSeMOSYS scenarios.
+
+Reads a manifest naming a base data set (a .dat file or a columnar data
+directory) and the parameter overrides of each scenario, in the format of
+osemosys_scenario.py:
+
+  data: utopia.dat
+  options:
+    UseVariableBounds: 1
+  scenarios:
+    carbon_50:
+      EmissionsPenalty: 50
+    cap_2030:
+      AnnualEmissionLimit:
+        - [UTOPIA, CO2, 2030, 10.0]
+
+and builds, solves and extracts every scenario in a pool of worker
+processes:
+
+  python osemosys_batch.py manifest.yaml results/ --workers=8 --threads=1
+
+The base data is parsed once, before the pool starts; on platforms that fork
+the workers share it copy-on-write and each scenario only copies the
+parameters it overrides. The nonzero results of each finished scenario are
+written straight away to results/<scenario>/ by osemosys_results.py, and a
+line is appended to results/summary.csv. Failed scenarios are retried up to
+--retries times before being reported as failed there.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import yaml
+from pyomo.environ import *
+
+import osemosys
+import osemosys_data
+import osemosys_results
+from osemosys_scenario import scenario_rows
+
+# Solver name -> option limiting the threads it uses
+THREAD_OPTIONS = {
+    "appsi_highs": "threads",
+    "highs": "threads",
+    "cbc": "threads",
+    "cplex": "threads",
+    "gurobi": "Threads",
+}
+
+# Environment variables read by the BLAS and OpenMP runtimes of the solvers
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+# Set in the parent before the pool starts, and inherited by forked workers:
+# (model, base DataPortal, data-only instance used to expand overrides)
+_BASE = None
+
+
+def load_manifest(path):
+    with open(path) as manifest_file:
+        manifest = yaml.safe_load(manifest_file)
+    data = os.path.join(os.path.dirname(os.path.abspath(path)), manifest["data"])
+    return data, manifest.get("options") or {}, manifest["scenarios"]
+
+
+def load_base(source, options=None, model=None):
+    model = model or osemosys.model
+    data = osemosys_data.read_data(model, source, options)
+    reference = osemosys_data.data_model(model).create_instance(data)
+    return model, data, reference
+
+
+def _init_worker(source, options, threads):
+    global _BASE
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    if _BASE is None:
+        _BASE = load_base(source, options)
+
+
+def _create_instance(overrides):
+    """Create an instance of the base data with overrides applied, restoring
+    the shared DataPortal afterwards."""
+    model, data, reference = _BASE
+    saved = {}
+    try:
+        for name, rows in overrides.items():
+            param = reference.component(name)
+            if not isinstance(param, Param):
+                raise ValueError(f"{name} is not a parameter of the model")
+            saved[name] = data.data().get(name)
+            values = dict(saved[name] or {})
+            values.update(scenario_rows(rows, param.index_set()))
+            data[name] = values
+        return model.create_instance(data)
+    finally:
+        for name, values in saved.items():
+            if values is None:
+                del data.data()[name]
+            else:
+                data[name] = values
+
+
+def run_scenario(name, overrides, solver, threads, directory, file_format):
+    """Build, solve and write one scenario; returns (objective, seconds)."""
+    start = time.perf_counter()
+    instance = _create_instance(overrides)
+    options = {}
+    if solver in THREAD_OPTIONS:
+        options[THREAD_OPTIONS[solver]] = threads
+    results = SolverFactory(solver).solve(instance, options=options)
+    condition = results.solver.termination_condition
+    if condition != TerminationCondition.optimal:
+        raise RuntimeError(f"solver finished with termination condition {condition}")
+    osemosys_results.write_results(instance, os.path.join(directory, name), file_format)
+    return value(instance.OBJ), time.perf_counter() - start
+
+
+def run_batch(
+    source,
+    scenarios,
+    directory,
+    options=None,
+    solver="glpk",
+    workers=None,
+    threads=1,
+    retries=1,
+    file_format="csv",
+):
+    """Run {name: overrides} in a process pool, writing results to directory.
+    Returns {name: objective, or the exception of the last failed attempt}."""
+    global _BASE
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        _BASE = load_base(source, options)
+    else:
+        context = None
+
+    outcomes = {}
+    summary_path = os.path.join(directory, "summary.csv")
+    with open(summary_path, "w", newline="") as summary_file, ProcessPoolExecutor(
+        workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(source, options, threads),
+    ) as pool:
+        summary = csv.writer(summary_file)
+        summary.writerow(("SCENARIO", "STATUS", "OBJECTIVE", "ATTEMPTS", "SECONDS"))
+        summary_file.flush()
+
+        def submit(name):
+            future = pool.submit(
+                run_scenario,
+                name,
+                scenarios[name],
+                solver,
+                threads,
+                directory,
+                file_format,
+            )
+            pending[future] = name
+
+        pending = {}
+        attempts = dict.fromkeys(scenarios, 1)
+        for name in scenarios:
+            submit(name)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    objective, seconds = future.result()
+                except Exception as error:
+                    if attempts[name] <= retries:
+                        attempts[name] += 1
+                        submit(name)
+                        continue
+                    outcomes[name] = error
+                    row = (name, f"failed: {error}", "", attempts[name], "")
+                else:
+                    outcomes[name] = objective
+                    row = (name, "ok", objective, attempts[name], f"{seconds:.2f}")
+                summary.writerow(row)
+                summary_file.flush()
+    return outcomes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("manifest")
+    parser.add_argument("directory")
+    parser.add_argument("--solver", default="glpk")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument(
+        "--format", choices=list(osemosys_results.EXTENSIONS), default="csv"
+    )
+    args = parser.parse_args(argv)
+
+    source, options, scenarios = load_manifest(args.manifest)
+    outcomes = run_batch(
+        source,
+        scenarios,
+        args.directory,
+        options,
+        args.solver,
+        args.workers,
+        args.threads,
+        args.retries,
+        args.format,
+    )
+    failed = [
+        name for name, outcome in outcomes.items() if isinstance(outcome, Exception)
+    ]
+    for name in failed:
+        print(f"{name}: {outcomes[name]}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Scaling benchmark of the OSeMOSYS model.
+
+Generates synthetic data sets (see osemosys_synthetic.py) at a series of sizes
+and, for each of them, times building the instance, writing the LP file,
+solving and extracting the results, and measures the peak resident memory.
+Every size point runs in a fresh process, so the memory of one does not carry
+over to the next:
+
+  python osemosys_benchmark.py --scale technologies=10,20,40,80
+  python osemosys_benchmark.py --scale years=10,20,40 --scale regions=1,2,4 \
+      --solver=appsi_highs --history benchmarks.csv
+
+Repeated --scale options are varied together. Each measurement is appended to
+the history file together with the git commit it was taken on, so runs on
+successive commits can be compared; the table printed at the end gives, for
+each stage, the exponent of its time against the number of variables and the
+change against the last run of the same point on another commit.
+"""
+
+import argparse
+import csv
+import importlib
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pyomo.environ import *
+
+import osemosys_results
+import osemosys_synthetic
+
+STAGES = ("build", "write", "solve", "extract")
+
+KEY = ("model", "solver", "seed") + tuple(osemosys_synthetic.SIZES)
+
+FIELDS = (
+    ("commit", "timestamp")
+    + KEY
+    + ("rows", "columns", "objective")
+    + STAGES
+    + ("peak_mib",)
+)
+
+
+def git_commit():
+    """Return the commit of the working tree, marked -dirty if it has local
+    changes, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(sizes, model="osemosys", solver="glpk", seed=0):
+    """Generate data of the given sizes and return the timings of one run.
+    Meant to run in a process of its own: the peak memory is that of the
+    whole process."""
+    data = osemosys_synthetic.generate(seed, **sizes)
+    abstract = importlib.import_module(model).model
+    times = {}
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        instance = abstract.create_instance(data=data)
+        times["build"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        instance.write(os.path.join(directory, "model.lp"))
+        times["write"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = SolverFactory(solver).solve(instance)
+        times["solve"] = time.perf_counter() - start
+        condition = results.solver.termination_condition
+        if condition != TerminationCondition.optimal:
+            raise RuntimeError(
+                f"solver finished with termination condition {condition}"
+            )
+
+        start = time.perf_counter()
+        osemosys_results.write_results(
+            instance, os.path.join(directory, "results"), "csv"
+        )
+        times["extract"] = time.perf_counter() - start
+
+    return {
+        "rows": sum(
+            len(c) for c in instance.component_objects(Constraint, active=True)
+        ),
+        "columns": sum(len(v) for v in instance.component_objects(Var)),
+        "objective": value(instance.OBJ),
+        **times,
+        # ru_maxrss is in KiB on Linux
+        "peak_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_point(sizes, model="osemosys", solver="glpk", seed=0):
+    """Run measure in a fresh process and return its history row."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        measured = executor.submit(measure, sizes, model, solver, seed).result()
+    point = {**osemosys_synthetic.SIZES, **sizes}
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": model,
+        "solver": solver,
+        "seed": seed,
+        **point,
+        **measured,
+    }
+
+
+def read_history(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, newline="") as history_file:
+        return list(csv.DictReader(history_file))
+
+
+def append_history(path, row):
+    new = not os.path.exists(path)
+    with open(path, "a", newline="") as history_file:
+        writer = csv.DictWriter(history_file, FIELDS)
+        if new:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def previous(history, row):
+    """Return the last history row of the same point taken on another commit."""
+    for old in reversed(history):
+        if old["commit"] != row["commit"] and all(
+            old[key] == str(row[key]) for key in KEY
+        ):
+            return old
+    return None
+
+
+def scaling_exponents(rows):
+    """Return {stage: slope of log time against log variables}, the exponent
+    of a power law fitted to the points."""
+    columns = np.log([row["columns"] for row in rows])
+    exponents = {}
+    for stage in STAGES + ("peak_mib",):
+        times = np.log([max(row[stage], 1e-6) for row in rows])
+        exponents[stage] = np.polyfit(columns, times, 1)[0]
+    return exponents
+
+
+def parse_scale(text):
+    """Parse SIZE=V1,V2,... into (size, [values])."""
+    size, _, values = text.partition("=")
+    if size not in osemosys_synthetic.SIZES or not values:
+        raise argparse.ArgumentTypeError(f"expected SIZE=V1,V2,... and got {text}")
+    return size, [int(v) for v in values.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scale", type=parse_scale, action="append", metavar="SIZE=V1,V2,..."
+    )
+    for size in osemosys_synthetic.SIZES:
+        parser.add_argument(f"--{size}", type=int)
+    parser.add_argument("--model", default="osemosys", help="module defining model")
+    parser.add_argument("--solver", default="glpk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", help="CSV file to append the measurements to")
+    args = parser.parse_args(argv)
+
+    base = {
+        size: getattr(args, size)
+        for size in osemosys_synthetic.SIZES
+        if getattr(args, size) is not None
+    }
+    scales = dict(args.scale or [])
+    lengths = {len(values) for values in scales.values()}
+    if len(lengths) > 1:
+        parser.error("every --scale needs the same number of values")
+    points = [
+        {**base, **{size: values[i] for size, values in scales.items()}}
+        for i in range(lengths.pop() if lengths else 1)
+    ]
+
+    history = read_history(args.history)
+    print(
+        f"{'point':<32} {'rows':>9} {'columns':>9} "
+        + " ".join(f"{stage:>8}" for stage in STAGES)
+        + f" {'peak MiB':>9} {'change':>7}"
+    )
+    rows = []
+    for sizes in points:
+        row = run_point(sizes, args.model, args.solver, args.seed)
+        rows.append(row)
+        if args.history:
+            append_history(args.history, row)
+        label = " ".join(f"{size}={row[size]}" for size in scales) or "base"
+        old = previous(history, row)
+        change = ""
+        if old:
+            total = sum(row[stage] for stage in STAGES)
+            change = f"{total / sum(float(old[stage]) for stage in STAGES) - 1:+.0%}"
+        print(
+            f"{label:<32} {row['rows']:>9} {row['columns']:>9} "
+            + " ".join(f"{row[stage]:>8.2f}" for stage in STAGES)
+            + f" {row['peak_mib']:>9.1f} {change:>7}"
+        )
+    if len(rows) > 1:
+        exponents = scaling_exponents(rows)
+        print(
+            f"{'exponent':<32} {'':>9} {'':>9} "
+            + " ".join(f"{exponents[stage]:>8.2f}" for stage in STAGES)
+            + f" {exponents['peak_mib']:>9.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+On-disk cache of built OSeMOSYS problems.
+
+Stores the sparse-matrix form of the model (see osemosys_matrix.py) under a
+key hashed from the model and loader sources and the input data, so a run on
+unchanged data skips reading the data and building the problem and goes
+straight to the solver. The stored LinearProgram keeps the row and column
+layout, from which the LP-writer names (the symbol map) and per-variable
+values are recovered; a free MPS file can be kept next to it for external
+solvers. The least recently used entries are evicted once the cache grows
+beyond its size limit.
+
+  python osemosys_cache.py solve datafile.dat [--mps]
+  python osemosys_cache.py list
+  python osemosys_cache.py clear [KEY ...]
+
+The cache lives in $OSEMOSYS_CACHE, or ~/.cache/osemosys by default.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import osemosys
+import osemosys_data
+import osemosys_matrix
+
+DEFAULT_ROOT = os.environ.get(
+    "OSEMOSYS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "osemosys")
+)
+DEFAULT_MAX_SIZE = 2 * 1024**3
+
+# Files whose contents decide what the cached problems look like
+SOURCES = (
+    osemosys.__file__,
+    osemosys_data.__file__,
+    osemosys_matrix.__file__,
+    osemosys_data.CONFIG,
+)
+
+PROBLEM = "problem.pickle"
+MPS = "model.mps"
+META = "meta.json"
+
+
+def _hash_file(digest, path):
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+
+
+def _size(path):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def parse_size(text):
+    """Parse a size such as 500M or 2G into bytes."""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    if text[-1:].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+class Cache:
+    def __init__(self, root=DEFAULT_ROOT, max_size=DEFAULT_MAX_SIZE):
+        self.root = root
+        self.max_size = max_size
+
+    def key(self, source, options=None):
+        """Hash the model sources, the data in source (a .dat file or a data
+        directory) and options."""
+        digest = hashlib.sha256()
+        for path in SOURCES:
+            _hash_file(digest, path)
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                path = os.path.join(source, name)
+                if os.path.isfile(path):
+                    digest.update(name.encode() + b"\0")
+                    _hash_file(digest, path)
+        else:
+            _hash_file(digest, source)
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Return the cached LinearProgram for key, or None."""
+        path = self.path(key)
+        try:
+            with open(os.path.join(path, PROBLEM), "rb") as problem_file:
+                lp = pickle.load(problem_file)
+        except FileNotFoundError:
+            return None
+        # The modification time of the metadata records the last use.
+        os.utime(os.path.join(path, META))
+        return lp
+
+    def put(self, key, lp, source, mps=False):
+        """Store lp under key, then evict entries beyond the size limit."""
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            with open(os.path.join(staging, PROBLEM), "wb") as problem_file:
+                pickle.dump(lp, problem_file, protocol=pickle.HIGHEST_PROTOCOL)
+            if mps:
+                lp.write_mps(os.path.join(staging, MPS))
+            meta = {"source": os.path.abspath(source), "created": time.time()}
+            with open(os.path.join(staging, META), "w") as meta_file:
+                json.dump(meta, meta_file)
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            os.replace(staging, self.path(key))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.evict(keep=key)
+
+    def load(self, source, options=None, mps=False):
+        """Return (LinearProgram, key, hit) for source, building and storing
+        the problem on a miss."""
+        key = self.key(source, options)
+        lp = self.get(key)
+        if lp is not None:
+            if mps and not os.path.exists(os.path.join(self.path(key), MPS)):
+                lp.write_mps(os.path.join(self.path(key), MPS))
+            return lp, key, True
+        lp = osemosys_matrix.build(osemosys_matrix.load_data(source, options))
+        self.put(key, lp, source, mps)
+        return lp, key, False
+
+    def entries(self):
+        """Return (key, size in bytes, last use, source) of every entry, most
+        recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for key in os.listdir(self.root):
+            meta_path = os.path.join(self.root, key, META)
+            if key.startswith(".") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as meta_file:
+                source = json.load(meta_file)["source"]
+            size = _size(self.path(key))
+            entries.append((key, size, os.path.getmtime(meta_path), source))
+        return sorted(entries, key=lambda entry: entry[2], reverse=True)
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the cache fits."""
+        total = 0
+        for key, size, _, _ in self.entries():
+            total += size
+            if total > self.max_size and key != keep:
+                shutil.rmtree(self.path(key), ignore_errors=True)
+                total -= size
+
+    def clear(self, keys=None):
+        if keys is None:
+            keys = [entry[0] for entry in self.entries()]
+        for key in keys:
+            shutil.rmtree(self.path(key), ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    parser.add_argument("--max-size", type=parse_size, default=DEFAULT_MAX_SIZE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    solve = commands.add_parser("solve", help="build through the cache and solve")
+    solve.add_argument("datafile")
+    solve.add_argument("--mps", action="store_true", help="also keep a MPS file")
+    commands.add_parser("list", help="list the cached problems")
+    clear = commands.add_parser("clear", help="remove cached problems")
+    clear.add_argument("keys", nargs="*")
+    args = parser.parse_args(argv)
+
+    cache = Cache(args.root, args.max_size)
+    if args.command == "list":
+        total = 0
+        for key, size, used, source in cache.entries():
+            total += size
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(used))
+            print(f"{key[:16]}  {size / 1024**2:>9.1f} MiB  {used}  {source}")
+        print(f"{total / 1024**2:.1f} MiB of {cache.max_size / 1024**2:.1f} MiB")
+    elif args.command == "clear":
+        matched = [
+            entry[0]
+            for entry in cache.entries()
+            if not args.keys or any(entry[0].startswith(k) for k in args.keys)
+        ]
+        cache.clear(matched)
+        print(f"removed {len(matched)} entries")
+    else:
+        start = time.perf_counter()
+        lp, key, hit = cache.load(args.datafile, mps=args.mps)
+        loaded = time.perf_counter()
+        print(
+            f"{'hit' if hit else 'miss'} {key[:16]}: {lp.shape[0]} rows, "
+            f"{lp.shape[1]} columns ({loaded - start:.2f}s)"
+        )
+        if args.mps:
+            print(os.path.join(cache.path(key), MPS))
+        result = lp.solve()
+        print(result.message)
+        if result.x is None:
+            return 1
+        print(f"objective {result.fun:.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Objective parity checks for the OSeMOSYS formulation variants.
+
+Builds one data set (a .dat file or a columnar data directory) with each
+variant of the model, solves them and compares their objective values against
+the full model, so that a formulation change can be confirmed not to alter
+the optimum:
+
+  python osemosys_check.py datafile.dat --solver=glpk
+
+The matrix variant is always solved with HiGHS through SciPy, whatever
+solver is given. Exits with a non-zero status if any variant differs from the
+full model by more than the given relative tolerance.
+"""
+
+import argparse
+import sys
+
+from pyomo.environ import *
+
+import osemosys
+import osemosys_compact
+import osemosys_data
+import osemosys_matrix
+
+
+def solve_objective(instance, solver="glpk"):
+    results = SolverFactory(solver).solve(instance)
+    condition = results.solver.termination_condition
+    if condition != TerminationCondition.optimal:
+        raise RuntimeError(f"solver finished with termination condition {condition}")
+    return value(instance.OBJ)
+
+
+def full_objective(datafile, solver="glpk"):
+    instance = osemosys_data.create_instance(osemosys.model, datafile)
+    return solve_objective(instance, solver)
+
+
+def bounds_objective(datafile, solver="glpk"):
+    instance = osemosys_data.create_instance(
+        osemosys.model, datafile, {"UseVariableBounds": 1}
+    )
+    return solve_objective(instance, solver)
+
+
+def compact_objective(datafile, solver="glpk"):
+    instance = osemosys_data.create_instance(osemosys_compact.model, datafile)
+    return solve_objective(instance, solver)
+
+
+def matrix_objective(datafile, solver=None):
+    lp = osemosys_matrix.build(osemosys_matrix.load_data(datafile))
+    result = lp.solve()
+    if result.x is None:
+        raise RuntimeError(result.message)
+    return result.fun
+
+
+# Variant name -> function solving a data file and returning the objective.
+# The first entry is the reference the others are compared against.
+VARIANTS = {
+    "full": full_objective,
+    "bounds": bounds_objective,
+    "compact": compact_objective,
+    "matrix": matrix_objective,
+}
+
+
+def compare_objectives(datafile, variants=None, solver="glpk"):
+    """Return {variant: (objective, relative difference to the full model)}."""
+    names = list(variants or VARIANTS)
+    if "full" not in names:
+        names.insert(0, "full")
+    objectives = {name: VARIANTS[name](datafile, solver) for name in names}
+    reference = objectives["full"]
+    scale = max(abs(reference), 1.0)
+    return {
+        name: (objective, abs(objective - reference) / scale)
+        for name, objective in objectives.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("--solver", default="glpk")
+    parser.add_argument(
+        "--variant", action="append", choices=list(VARIANTS), dest="variants"
+    )
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    args = parser.parse_args(argv)
+
+    comparison = compare_objectives(args.datafile, args.variants, args.solver)
+    failed = False
+    for name, (objective, difference) in comparison.items():
+        status = "ok" if difference <= args.tolerance else "MISMATCH"
+        failed = failed or status != "ok"
+        print(f"{name:<10} {objective:>20.6f} {difference:>12.3e}  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+Compact OSeMOSYS formulation.
+
+Starts from the model in osemosys.py and substitutes the purely definitional
+accounting chains into the objective and the binding constraints instead of
+generating a variable and an equality row for every link:
+
+  - Production, Use and Demand per timeslice (rate times YearSplit)
+  - ProductionByTechnology and UseByTechnology, which nothing else reads
+  - the technology cost chain from CapitalInvestment/OperatingCost down to
+    ModelPeriodCostByRegion
+  - the emission penalty chain from AnnualTechnologyEmissionPenaltyByEmission
+    down to DiscountedTechnologyEmissionsPenalty
+  - the discounted storage costs
+
+The eliminated variables are kept as sparse components and are filled in by
+pyomo_postprocess once a solution is loaded, so result tables match those of
+the full model. Run it the same way as the full model:
+
+  pyomo solve --solver=glpk osemosys_compact.py datafile.dat
+"""
+
+from pyomo.environ import *
+
+import osemosys
+
+model = osemosys.model.clone()
+
+
+#########################
+#   Accounting Terms    #
+#########################
+
+########			Demands and Balances		#############
+
+
+def Production_expr(model, r, l, f, y):
+    return model.RateOfProduction[r, l, f, y] * model.YearSplit[l, y]
+
+
+def Use_expr(model, r, l, f, y):
+    return model.RateOfUse[r, l, f, y] * model.YearSplit[l, y]
+
+
+def Demand_expr(model, r, l, f, y):
+    return model.RateOfDemand[r, l, f, y] * model.YearSplit[l, y]
+
+
+def ProductionByTechnology_expr(model, r, l, t, f, y):
+    return model.RateOfProductionByTechnology[r, l, t, f, y] * model.YearSplit[l, y]
+
+
+def UseByTechnology_expr(model, r, l, t, f, y):
+    return model.RateOfUseByTechnology[r, l, t, f, y] * model.YearSplit[l, y]
+
+
+########			Technology Costs			#############
+
+
+def CapitalInvestment_expr(model, r, t, y):
+    return model.CapitalCost[r, t, y] * model.NewCapacity[r, t, y]
+
+
+def DiscountedCapitalInvestment_expr(model, r, t, y):
+    return CapitalInvestment_expr(model, r, t, y) / model.DiscountFactor[r, y]
+
+
+def AnnualVariableOperatingCost_expr(model, r, t, y):
+    return sum(
+        model.TotalAnnualTechnologyActivityByMode[r, t, m, y]
+        * model.VariableCost[r, t, m, y]
+        for m in model.MODE_OF_OPERATION
+    )
+
+
+def AnnualFixedOperatingCost_expr(model, r, t, y):
+    return model.TotalCapacityAnnual[r, t, y] * model.FixedCost[r, t, y]
+
+
+def OperatingCost_expr(model, r, t, y):
+    return AnnualFixedOperatingCost_expr(
+        model, r, t, y
+    ) + AnnualVariableOperatingCost_expr(model, r, t, y)
+
+
+def DiscountedOperatingCost_expr(model, r, t, y):
+    return OperatingCost_expr(model, r, t, y) / model.DiscountFactorMid[r, y]
+
+
+def AnnualTechnologyEmissionPenaltyByEmission_expr(model, r, t, e, y):
+    return model.AnnualTechnologyEmission[r, t, e, y] * model.EmissionsPenalty[r, e, y]
+
+
+def AnnualTechnologyEmissionsPenalty_expr(model, r, t, y):
+    return sum(
+        AnnualTechnologyEmissionPenaltyByEmission_expr(model, r, t, e, y)
+        for e in model.EMISSION
+        if (r, t, e, y) in model.EMITTING_TECHNOLOGY
+    )
+
+
+def DiscountedTechnologyEmissionsPenalty_expr(model, r, t, y):
+    return (
+        AnnualTechnologyEmissionsPenalty_expr(model, r, t, y)
+        / model.DiscountFactorMid[r, y]
+    )
+
+
+def DiscountedSalvageValue_expr(model, r, t, y):
+    return model.SalvageValue[r, t, y] / model.DiscountFactorSalvage[r]
+
+
+def TotalDiscountedCostByTechnology_expr(model, r, t, y):
+    return (
+        DiscountedOperatingCost_expr(model, r, t, y)
+        + DiscountedCapitalInvestment_expr(model, r, t, y)
+        + DiscountedTechnologyEmissionsPenalty_expr(model, r, t, y)
+        - DiscountedSalvageValue_expr(model, r, t, y)
+    )
+
+
+########			Storage Costs				#############
+
+
+def DiscountedCapitalInvestmentStorage_expr(model, r, s, y):
+    return model.CapitalInvestmentStorage[r, s, y] / model.DiscountFactor[r, y]
+
+
+def DiscountedSalvageValueStorage_expr(model, r, s, y):
+    return model.SalvageValueStorage[r, s, y] / model.DiscountFactorSalvage[r]
+
+
+def TotalDiscountedStorageCost_expr(model, r, s, y):
+    return DiscountedCapitalInvestmentStorage_expr(
+        model, r, s, y
+    ) - DiscountedSalvageValueStorage_expr(model, r, s, y)
+
+
+########			Total Costs					#############
+
+
+def TotalDiscountedCost_expr(model, r, y):
+    return sum(
+        TotalDiscountedCostByTechnology_expr(model, r, t, y) for t in model.TECHNOLOGY
+    ) + sum(TotalDiscountedStorageCost_expr(model, r, s, y) for s in model.STORAGE)
+
+
+def ModelPeriodCostByRegion_expr(model, r):
+    return sum(TotalDiscountedCost_expr(model, r, y) for y in model.YEAR)
+
+
+# Variable name -> (index sets, defining expression). Each of these is
+# removed from the LP together with the rows that defined it.
+ACCOUNTING = {
+    "Production": (
+        (model.REGION, model.TIMESLICE, model.FUEL, model.YEAR),
+        Production_expr,
+    ),
+    "Use": ((model.REGION, model.TIMESLICE, model.FUEL, model.YEAR), Use_expr),
+    "Demand": ((model.REGION, model.TIMESLICE, model.FUEL, model.YEAR), Demand_expr),
+    "ProductionByTechnology": (
+        (model.PRODUCTION_BY_TECHNOLOGY,),
+        ProductionByTechnology_expr,
+    ),
+    "UseByTechnology": ((model.USE_BY_TECHNOLOGY,), UseByTechnology_expr),
+    "CapitalInvestment": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        CapitalInvestment_expr,
+    ),
+    "DiscountedCapitalInvestment": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        DiscountedCapitalInvestment_expr,
+    ),
+    "AnnualVariableOperatingCost": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        AnnualVariableOperatingCost_expr,
+    ),
+    "AnnualFixedOperatingCost": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        AnnualFixedOperatingCost_expr,
+    ),
+    "OperatingCost": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        OperatingCost_expr,
+    ),
+    "DiscountedOperatingCost": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        DiscountedOperatingCost_expr,
+    ),
+    "AnnualTechnologyEmissionPenaltyByEmission": (
+        (model.EMITTING_TECHNOLOGY,),
+        AnnualTechnologyEmissionPenaltyByEmission_expr,
+    ),
+    "AnnualTechnologyEmissionsPenalty": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        AnnualTechnologyEmissionsPenalty_expr,
+    ),
+    "DiscountedTechnologyEmissionsPenalty": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        DiscountedTechnologyEmissionsPenalty_expr,
+    ),
+    "DiscountedSalvageValue": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        DiscountedSalvageValue_expr,
+    ),
+    "TotalDiscountedCostByTechnology": (
+        (model.REGION, model.TECHNOLOGY, model.YEAR),
+        TotalDiscountedCostByTechnology_expr,
+    ),
+    "DiscountedCapitalInvestmentStorage": (
+        (model.REGION, model.STORAGE, model.YEAR),
+        DiscountedCapitalInvestmentStorage_expr,
+    ),
+    "DiscountedSalvageValueStorage": (
+        (model.REGION, model.STORAGE, model.YEAR),
+        DiscountedSalvageValueStorage_expr,
+    ),
+    "TotalDiscountedStorageCost": (
+        (model.REGION, model.STORAGE, model.YEAR),
+        TotalDiscountedStorageCost_expr,
+    ),
+    "TotalDiscountedCost": ((model.REGION, model.YEAR), TotalDiscountedCost_expr),
+    "ModelPeriodCostByRegion": ((model.REGION,), ModelPeriodCostByRegion_expr),
+}
+
+for name in (
+    "EnergyBalanceEachTS1",
+    "EnergyBalanceEachTS2",
+    "EnergyBalanceEachTS3",
+    "EnergyBalanceEachTS5",
+    "EnergyBalanceEachYear1",
+    "EnergyBalanceEachYear2",
+    "FuelProductionByTechnology",
+    "FuelUseByTechnology",
+    "ModelPeriodCostByRegion_constraint",
+    "DiscountingCapitalInvestmentStorage_constraint",
+    "SalvageValueDiscountedToStartYear_constraint",
+    "TotalDiscountedCostByStorage_constraint",
+    "UndiscountedCapitalInvestment",
+    "DiscountedCapitalInvestment_constraint",
+    "OperatingCostsVariable",
+    "OperatingCostsFixedAnnual",
+    "OperatingCostsTotalAnnual",
+    "DiscountedOperatingCostsTotalAnnual",
+    "TotalDiscountedCostByTechnology_constraint",
+    "TotalDiscountedCost_constraint",
+    "SalvageValueDiscountedToStartYear",
+    "EmissionPenaltyByTechAndEmission",
+    "EmissionsPenaltyByTechnology",
+    "DiscountedEmissionsPenaltyByTechnology",
+    "OBJ",
+):
+    model.del_component(name)
+
+for name, (index, _) in ACCOUNTING.items():
+    model.del_component(name)
+    model.add_component(name, Var(*index, domain=NonNegativeReals, dense=False))
+
+
+######################
+# Objective Function #
+######################
+
+
+def ObjectiveFunction_rule(model):
+    return sum(ModelPeriodCostByRegion_expr(model, r) for r in model.REGION)
+
+
+model.OBJ = Objective(rule=ObjectiveFunction_rule, sense=minimize)
+
+
+#####################
+# Constraints       #
+#####################
+
+
+def EnergyBalanceEachTS5_rule(model, r, l, f, y):
+    return Production_expr(model, r, l, f, y) >= Demand_expr(
+        model, r, l, f, y
+    ) + Use_expr(model, r, l, f, y) + sum(
+        model.Trade[r, rr, l, f, y] * model.TradeRoute[r, rr, f, y]
+        for rr in model.REGION
+        if (r, rr, f, y) in model.TRADE_LINK
+    )
+
+
+model.EnergyBalanceEachTS5 = Constraint(
+    model.REGION,
+    model.TIMESLICE,
+    model.FUEL,
+    model.YEAR,
+    rule=EnergyBalanceEachTS5_rule,
+)
+
+
+def EnergyBalanceEachYear1_rule(model, r, f, y):
+    return (
+        sum(Production_expr(model, r, l, f, y) for l in model.TIMESLICE)
+        == model.ProductionAnnual[r, f, y]
+    )
+
+
+model.EnergyBalanceEachYear1 = Constraint(
+    model.REGION, model.FUEL, model.YEAR, rule=EnergyBalanceEachYear1_rule
+)
+
+
+def EnergyBalanceEachYear2_rule(model, r, f, y):
+    return (
+        sum(Use_expr(model, r, l, f, y) for l in model.TIMESLICE)
+        == model.UseAnnual[r, f, y]
+    )
+
+
+model.EnergyBalanceEachYear2 = Constraint(
+    model.REGION, model.FUEL, model.YEAR, rule=EnergyBalanceEachYear2_rule
+)
+
+
+#####################
+#  Post-processing  #
+#####################
+
+
+def pyomo_postprocess(options=None, instance=None, results=None):
+    """Recompute the eliminated accounting variables from the loaded solution.
+    Only the entries with a nonzero value are created; the variables are
+    sparse and the result tables leave out zeros anyway."""
+    for name, (_, expr) in ACCOUNTING.items():
+        var = getattr(instance, name)
+        for idx in var.index_set():
+            args = idx if isinstance(idx, tuple) else (idx,)
+            # None where the expression reads variables the solver left out.
+            v = value(expr(instance, *args), exception=False)
+            if v is not None and v != 0:
+                var[idx].set_value(v, skip_validation=True)
@@ -0,0 +1,221 @@
+"""
+Comparison of OSeMOSYS result sets, such as the Pyomo model against the GMPL
+model in osemosys.txt.
+
+Each side is either a directory of per-variable result files (as written by
+osemosys_results.py, or otoole CSV results) or a GLPK solution, written by
+
+  glpsol -m osemosys.txt -d datafile.dat --wglp model.glp --write model.sol
+
+whose column names are taken from the matching model.glp. Every result of
+config.yaml is loaded into a frame keyed on its index columns, the two sides
+are outer-joined with missing rows read as zero, and absolute and relative
+differences are computed column-wise:
+
+  python osemosys_compare.py results/ model.sol --top=20
+
+prints the differences per variable and the largest deviations overall, and
+exits with a non-zero status if any value differs by more than both
+tolerances.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import osemosys_data
+
+READERS = {
+    ".parquet": pd.read_parquet,
+    ".arrow": pd.read_feather,
+    ".feather": pd.read_feather,
+    ".csv": pd.read_csv,
+}
+
+DTYPES = {"int": "int64", "float": "float64", "str": "str"}
+
+
+def result_config(config=osemosys_data.CONFIG):
+    """Return ({result: index columns}, {index column: dtype})."""
+    entries = osemosys_data.load_config(config, ("set", "result"))
+    results = {
+        name: list(entry["indices"])
+        for name, entry in entries.items()
+        if entry["type"] == "result"
+    }
+    dtypes = {
+        index: DTYPES[entries[osemosys_data.set_of(index, entries)]["dtype"]]
+        for indices in results.values()
+        for index in indices
+    }
+    return results, dtypes
+
+
+def _typed(frame, indices, dtypes):
+    frame = frame.astype({index: dtypes[index] for index in indices})
+    return frame.astype({"VALUE": "float64"})[indices + ["VALUE"]]
+
+
+def read_directory(directory, config=osemosys_data.CONFIG):
+    """Return {result: frame of index columns and VALUE} for the result files
+    in directory."""
+    results, dtypes = result_config(config)
+    frames = {}
+    for name, indices in results.items():
+        for extension, reader in READERS.items():
+            path = os.path.join(directory, name + extension)
+            if os.path.exists(path):
+                frames[name] = _typed(reader(path), indices, dtypes)
+                break
+    return frames
+
+
+def _lines(path):
+    """Read every line of a text file as one string column."""
+    return pd.read_csv(
+        path, header=None, names=["line"], sep="\x1f", dtype="str", quoting=3
+    )["line"]
+
+
+def read_glpk(solution, model, config=osemosys_data.CONFIG):
+    """Return {result: frame} from a GLPK plain-text solution (--write) and
+    the GLPK-format model written with it (--wglp), which names the columns."""
+    results, dtypes = result_config(config)
+
+    lines = _lines(model)
+    names = lines[lines.str.startswith("n j ")].str.split(" ", n=3, expand=True)
+    names = pd.Series(names[3].str.replace("'", "").values, index=names[2].astype(int))
+
+    lines = _lines(solution)
+    # The status line gives the kind of solution, which decides where the
+    # primal value sits on a column line: "j col status primal dual" for a
+    # basic solution, "j col primal dual" or "j col value" otherwise.
+    kind = lines[lines.str.startswith("s ")].iloc[0].split()[1]
+    columns = lines[lines.str.startswith("j ")].str.split(" ", expand=True)
+    values = pd.Series(
+        columns[3 if kind == "bas" else 2].astype(float).values,
+        index=columns[1].astype(int),
+    )
+
+    parts = names.str.extract(r"^(\w+)\[(.*)\]$")
+    frame = pd.DataFrame(
+        {"name": parts[0], "index": parts[1], "VALUE": values.reindex(names.index)}
+    )
+    frames = {}
+    for name, group in frame.groupby("name", sort=False):
+        if name not in results:
+            continue
+        indices = results[name]
+        keys = group["index"].str.split(",", expand=True)
+        keys.columns = indices
+        keys["VALUE"] = group["VALUE"].values
+        frames[name] = _typed(keys, indices, dtypes)
+    return frames
+
+
+def read_results(source, model=None, config=osemosys_data.CONFIG):
+    """Read a result directory, or a GLPK solution with its model file (by
+    default the solution path with a .glp extension)."""
+    if os.path.isdir(source):
+        return read_directory(source, config)
+    model = model or os.path.splitext(source)[0] + ".glp"
+    return read_glpk(source, model, config)
+
+
+def compare(left, right, config=osemosys_data.CONFIG):
+    """Align two {result: frame} sets and return {result: frame} with the
+    index columns, LEFT, RIGHT, ABS and REL for every row on either side."""
+    results, dtypes = result_config(config)
+    aligned = {}
+    for name, indices in results.items():
+        if name not in left and name not in right:
+            continue
+        empty = _typed(pd.DataFrame(columns=indices + ["VALUE"]), indices, dtypes)
+        merged = pd.merge(
+            left.get(name, empty).rename(columns={"VALUE": "LEFT"}),
+            right.get(name, empty).rename(columns={"VALUE": "RIGHT"}),
+            on=indices,
+            how="outer",
+        )
+        a = merged["LEFT"].to_numpy(dtype=float, na_value=0.0)
+        b = merged["RIGHT"].to_numpy(dtype=float, na_value=0.0)
+        difference = np.abs(a - b)
+        scale = np.maximum(np.abs(a), np.abs(b))
+        merged["LEFT"] = a
+        merged["RIGHT"] = b
+        merged["ABS"] = difference
+        merged["REL"] = np.divide(
+            difference, scale, out=np.zeros_like(difference), where=scale > 0
+        )
+        aligned[name] = merged
+    return aligned
+
+
+def summarize(aligned, atol=1e-6, rtol=1e-6):
+    """Return one row per result: rows compared, rows beyond both tolerances
+    and the largest absolute and relative differences."""
+    rows = []
+    for name, frame in aligned.items():
+        beyond = (frame["ABS"] > atol) & (frame["REL"] > rtol)
+        rows.append(
+            (
+                name,
+                len(frame),
+                int(beyond.sum()),
+                frame["ABS"].max() if len(frame) else 0.0,
+                frame["REL"].max() if len(frame) else 0.0,
+            )
+        )
+    return pd.DataFrame(rows, columns=["VARIABLE", "ROWS", "BEYOND", "ABS", "REL"])
+
+
+def top_deviations(aligned, n=20, by="ABS"):
+    """Return the n rows with the largest difference across all results, with
+    the index members joined into an INDEX column."""
+    tops = []
+    for name, frame in aligned.items():
+        top = frame.nlargest(n, by)
+        if top.empty:
+            continue
+        indices = [c for c in top.columns if c not in ("LEFT", "RIGHT", "ABS", "REL")]
+        index = top[indices].astype(str).agg(",".join, axis=1)
+        tops.append(
+            pd.DataFrame({"VARIABLE": name, "INDEX": index}).join(
+                top[["LEFT", "RIGHT", "ABS", "REL"]]
+            )
+        )
+    if not tops:
+        return pd.DataFrame(
+            columns=["VARIABLE", "INDEX", "LEFT", "RIGHT", "ABS", "REL"]
+        )
+    return pd.concat(tops, ignore_index=True).nlargest(n, by).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("left")
+    parser.add_argument("right")
+    parser.add_argument("--glp", help="GLPK model file of a solution argument")
+    parser.add_argument("--config", default=osemosys_data.CONFIG)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--by", choices=("ABS", "REL"), default="ABS")
+    parser.add_argument("--atol", type=float, default=1e-6)
+    parser.add_argument("--rtol", type=float, default=1e-6)
+    args = parser.parse_args(argv)
+
+    left = read_results(args.left, args.glp, args.config)
+    right = read_results(args.right, args.glp, args.config)
+    aligned = compare(left, right, args.config)
+    summary = summarize(aligned, args.atol, args.rtol)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summary.to_string(index=False))
+        print()
+        print(top_deviations(aligned, args.top, args.by).to_string(index=False))
+    return 1 if summary["BEYOND"].any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
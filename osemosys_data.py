@@ -0,0 +1,270 @@
+"""
+Columnar data input for the OSeMOSYS model.
+
+Reads a directory holding one Parquet (.parquet) or Arrow IPC (.arrow,
+.feather) file per set and parameter, laid out as config.yaml describes them:
+a set file has a single VALUE column, a parameter file has one column per
+entry of its `indices` plus a VALUE column. Every file is checked against
+config.yaml, rows equal to the parameter default are dropped, and the rest is
+handed to create_instance as a data dictionary, so the .dat parser is never
+involved:
+
+  instance = osemosys_data.create_instance(osemosys.model, "data/")
+
+Files missing from the directory leave the set empty or the parameter at its
+default. An existing .dat file is converted once with
+
+  python osemosys_data.py datafile.dat data/ [--format arrow]
+
+Reading and writing the files needs pyarrow.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import yaml
+from pyomo.environ import Constraint, DataPortal, Objective, Param, Var
+
+import osemosys
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+
+# File extension -> format
+FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+DTYPES = {"int": np.int64, "float": np.float64, "str": object}
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("reading and writing columnar data needs pyarrow") from None
+    return pyarrow
+
+
+def load_config(path=CONFIG, types=("set", "param")):
+    """Return the entries of a config.yaml file of the given types."""
+    with open(path) as config_file:
+        config = yaml.safe_load(config_file)
+    return {name: entry for name, entry in config.items() if entry.get("type") in types}
+
+
+def set_of(index, config):
+    """Resolve an index name to its set; REGION_ is an alias of REGION."""
+    if index.endswith("_") and index[:-1] in config:
+        return index[:-1]
+    return index
+
+
+def data_model(model=None):
+    """Return a copy of model (osemosys.model by default) holding only its sets
+    and parameters, for reading data without building the LP."""
+    model = (model or osemosys.model).clone()
+    for component in list(model.component_objects((Var, Constraint, Objective))):
+        model.del_component(component)
+    return model
+
+
+def read_table(path):
+    pyarrow = import_pyarrow()
+    if FORMATS[os.path.splitext(path)[1]] == "parquet":
+        return pyarrow.parquet.read_table(path)
+    return pyarrow.feather.read_table(path)
+
+
+def _find(directory, name):
+    for extension in FORMATS:
+        path = os.path.join(directory, name + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _column(table, name, dtype, errors, where):
+    column = table.column(name)
+    if column.null_count:
+        errors.append(f"{where}: {column.null_count} missing values in {name}")
+    array = column.to_numpy(zero_copy_only=False)
+    try:
+        converted = array.astype(DTYPES[dtype])
+    except (TypeError, ValueError):
+        errors.append(f"{where}: {name} does not hold {dtype} values")
+        return None
+    if dtype == "int" and not np.array_equal(converted, array):
+        errors.append(f"{where}: {name} does not hold int values")
+        return None
+    if dtype == "str":
+        converted = np.array([str(v) for v in array], dtype=object)
+    return converted
+
+
+def load_directory(directory, model=None, config=CONFIG):
+    """Read and validate the files in directory and return the Pyomo data
+    dictionary for model. Raises ValueError listing every problem found."""
+    model = model or osemosys.model
+    config = load_config(config)
+    errors = []
+    members = {}
+    data = {}
+
+    for name, entry in config.items():
+        if entry["type"] != "set" or set_of(name, config) != name:
+            continue
+        path = _find(directory, name)
+        if path is None:
+            members[name] = np.array([], dtype=DTYPES[entry["dtype"]])
+        else:
+            table = read_table(path)
+            if table.column_names != ["VALUE"]:
+                errors.append(
+                    f"{name}: expected a single VALUE column, found "
+                    f"{table.column_names}"
+                )
+                continue
+            values = _column(table, "VALUE", entry["dtype"], errors, name)
+            if values is None:
+                continue
+            if len(set(values.tolist())) != len(values):
+                errors.append(f"{name}: repeated members")
+            members[name] = values
+        if model.component(name) is not None:
+            data[name] = {None: members[name].tolist()}
+
+    for name, entry in config.items():
+        component = model.component(name)
+        if entry["type"] != "param" or component is None:
+            continue
+        path = _find(directory, name)
+        if path is None:
+            continue
+        table = read_table(path)
+        indices = list(entry["indices"])
+        if sorted(table.column_names) != sorted(indices + ["VALUE"]):
+            errors.append(
+                f"{name}: expected columns {indices + ['VALUE']}, found "
+                f"{table.column_names}"
+            )
+            continue
+        columns = []
+        for index in indices:
+            set_name = set_of(index, config)
+            column = _column(table, index, config[set_name]["dtype"], errors, name)
+            if column is None or set_name not in members:
+                continue
+            unknown = ~np.isin(column, members[set_name])
+            if unknown.any():
+                errors.append(
+                    f"{name}: {unknown.sum()} rows with {index} not in "
+                    f"{set_name}, e.g. {column[unknown][0]!r}"
+                )
+            columns.append(column)
+        values = _column(table, "VALUE", entry["dtype"], errors, name)
+        if values is None or len(columns) != len(indices):
+            continue
+        if np.isnan(values).any():
+            errors.append(f"{name}: VALUE holds NaN")
+
+        keys = [column.tolist() for column in columns]
+        keys = list(zip(*keys)) if len(keys) > 1 else keys[0]
+        if len(set(keys)) != len(keys):
+            errors.append(f"{name}: repeated index rows")
+
+        # Rows at the default are only dropped when the model falls back to
+        # the same default for missing indices.
+        default = component.default()
+        if default is not Param.NoValue and float(default) == float(entry["default"]):
+            keep = values != entry["default"]
+            keys = [key for key, kept in zip(keys, keep) if kept]
+            values = values[keep]
+        data[name] = dict(zip(keys, values.tolist()))
+
+    if errors:
+        raise ValueError(f"invalid data in {directory}:\n  " + "\n  ".join(errors))
+    return {None: data}
+
+
+def read_data(model, source, options=None, config=CONFIG):
+    """Read a .dat file or a directory of columnar files into a DataPortal for
+    model. options maps scalar parameters (e.g. UseVariableBounds) to values
+    that override the data."""
+    if os.path.isdir(source):
+        data = DataPortal(model=model, data_dict=load_directory(source, model, config))
+    else:
+        data = DataPortal(model=model)
+        data.load(filename=source)
+    for name, option in (options or {}).items():
+        data[name] = {None: option}
+    return data
+
+
+def create_instance(model, source, options=None, config=CONFIG):
+    """Create an instance of model from a .dat file or a columnar directory."""
+    return model.create_instance(read_data(model, source, options, config))
+
+
+def write_directory(instance, directory, file_format="parquet", config=CONFIG):
+    """Write the sets and parameters of instance as one file each, leaving out
+    the values that osemosys.model falls back to anyway."""
+    pyarrow = import_pyarrow()
+    config = load_config(config)
+    extension = {"parquet": ".parquet", "arrow": ".arrow"}[file_format]
+    os.makedirs(directory, exist_ok=True)
+
+    def write(name, columns):
+        table = pyarrow.table(columns)
+        path = os.path.join(directory, name + extension)
+        if file_format == "parquet":
+            pyarrow.parquet.write_table(table, path)
+        else:
+            pyarrow.feather.write_feather(table, path)
+
+    def cast(values, dtype):
+        return [str(v) for v in values] if dtype == "str" else list(values)
+
+    for name, entry in config.items():
+        component = instance.component(name)
+        if component is None:
+            continue
+        if entry["type"] == "set":
+            write(name, {"VALUE": cast(component, entry["dtype"])})
+            continue
+        # A data file may change the default of a parameter; its values are
+        # then written out in full, as the reader only knows the model's.
+        default = osemosys.model.component(name).default()
+        items = component.sparse_items()
+        if component.default() != default:
+            items = component.items()
+        rows = [
+            (index if isinstance(index, tuple) else (index,), v)
+            for index, v in items
+            if v != default
+        ]
+        columns = {}
+        for i, index in enumerate(entry["indices"]):
+            dtype = config[set_of(index, config)]["dtype"]
+            columns[index] = cast((key[i] for key, _ in rows), dtype)
+        columns["VALUE"] = [float(v) for _, v in rows]
+        write(name, columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a .dat file to one columnar file per set and parameter."
+    )
+    parser.add_argument("datafile")
+    parser.add_argument("directory")
+    parser.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    parser.add_argument("--config", default=CONFIG)
+    args = parser.parse_args(argv)
+    instance = data_model().create_instance(args.datafile)
+    write_directory(instance, args.directory, args.format, args.config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
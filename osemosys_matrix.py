@@ -0,0 +1,1431 @@
+"""
+Sparse-matrix build of the OSeMOSYS model.
+
+Assembles the formulation of osemosys.py straight into coordinate (COO)
+arrays instead of going through Pyomo rules and expression trees: each
+constraint family is generated by a few NumPy operations over its whole index
+space rather than by one Python call per row. Sets and parameters are read
+from the same .dat file or columnar data directory (see osemosys_data.py) as
+the Pyomo model, and the result can be written as free MPS or solved directly
+with HiGHS through SciPy:
+
+  python osemosys_matrix.py datafile.dat --write model.mps
+  python osemosys_matrix.py datafile.dat --solve
+
+Rows and columns are named the way the Pyomo LP writer names them. Variables
+that appear in no constraint (ProductionByTechnologyAnnual,
+UseByTechnologyAnnual, VariableOperatingCost and the RE target variables) are
+left out, as they are by the Pyomo writers.
+"""
+
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+from pyomo.environ import Param, value
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+import osemosys_data
+
+# Axis label -> set the axis runs over. Terms are lined up by label, so the
+# second label of a set is used for sums over it and for lagged indices.
+AXES = {
+    "r": "REGION",
+    "rr": "REGION",
+    "l": "TIMESLICE",
+    "t": "TECHNOLOGY",
+    "m": "MODE_OF_OPERATION",
+    "f": "FUEL",
+    "e": "EMISSION",
+    "s": "STORAGE",
+    "y": "YEAR",
+    "yy": "YEAR",
+    "ls": "SEASON",
+    "lss": "SEASON",
+    "ld": "DAYTYPE",
+    "ldd": "DAYTYPE",
+    "lh": "DAILYTIMEBRACKET",
+    "lhh": "DAILYTIMEBRACKET",
+}
+
+# Sets whose members are compared and shifted (y - 1, ls + 1, ...) by the
+# model; they are sorted so that positions follow values.
+ORDERED_SETS = ("YEAR", "SEASON", "DAYTYPE", "DAILYTIMEBRACKET")
+
+INFINITY = np.inf
+
+
+def load_data(source, options=None):
+    """Construct the sets and parameters of osemosys.py from a .dat file or a
+    columnar data directory."""
+    return osemosys_data.create_instance(osemosys_data.data_model(), source, options)
+
+
+def _align(array, axes, target):
+    """Transpose array (labelled by axes) to the order of target, adding
+    length-one axes for the labels it does not have."""
+    array = np.asarray(array, dtype=float)
+    order = sorted(range(len(axes)), key=lambda i: target.index(axes[i]))
+    array = array.transpose(order)
+    present = [axes[i] for i in order]
+    shape = [array.shape[present.index(a)] if a in present else 1 for a in target]
+    return array.reshape(shape)
+
+
+def _axes(labels):
+    return tuple(labels.split()) if isinstance(labels, str) else tuple(labels)
+
+
+def _keys(coords, axes, shape, size):
+    """Return one integer per entry of coords (size of them) identifying its
+    positions along axes (of the given lengths)."""
+    if not axes:
+        return np.zeros(size, dtype=np.int64)
+    return np.ravel_multi_index([coords[a] for a in axes], shape)
+
+
+class Table:
+    """The nonzero values of a factor indexed by some axes, with the position
+    of each value along every axis (coordinate form)."""
+
+    def __init__(self, axes, shape, coords, values):
+        self.axes = tuple(axes)
+        self.shape = tuple(shape)
+        self.coords = {a: np.asarray(coords[a], dtype=np.int64) for a in self.axes}
+        self.values = np.asarray(values, dtype=float)
+
+    @classmethod
+    def from_dense(cls, array, axes):
+        array = np.asarray(array, dtype=float)
+        if not axes:
+            return cls((), (), {}, array.reshape(1)[array.reshape(1) != 0])
+        positions = np.nonzero(array)
+        return cls(axes, array.shape, dict(zip(axes, positions)), array[positions])
+
+    def dense(self):
+        """Return (dense array, axes), for right-hand sides, bounds and masks
+        over the axes of a block."""
+        array = np.zeros(self.shape)
+        array[tuple(self.coords[a] for a in self.axes)] = self.values
+        return array, self.axes
+
+    def select(self, mask):
+        return Table(
+            self.axes,
+            self.shape,
+            {a: p[mask] for a, p in self.coords.items()},
+            self.values[mask],
+        )
+
+    def ones(self):
+        """Return the 0/1 indicator of the entries."""
+        return Table(self.axes, self.shape, self.coords, np.ones(self.values.size))
+
+    def sum(self, labels):
+        """Sum over the axes that are not in labels."""
+        axes = _axes(labels)
+        shape = [self.shape[self.axes.index(a)] for a in axes]
+        keys, inverse = np.unique(
+            _keys(self.coords, axes, shape, self.values.size), return_inverse=True
+        )
+        values = np.bincount(inverse.ravel(), self.values, minlength=keys.size)
+        coords = dict(zip(axes, np.unravel_index(keys, shape))) if axes else {}
+        return Table(axes, shape, coords, values).select(values != 0)
+
+    def __mul__(self, other):
+        """Multiply by a scalar, or by another table joining on the axes the
+        two have in common."""
+        if not isinstance(other, Table):
+            return Table(self.axes, self.shape, self.coords, self.values * other)
+        shared = [a for a in self.axes if a in other.axes]
+        shape = [self.shape[self.axes.index(a)] for a in shared]
+        left = _keys(self.coords, shared, shape, self.values.size)
+        right = _keys(other.coords, shared, shape, other.values.size)
+        order = np.argsort(right, kind="stable")
+        right = right[order]
+        start = np.searchsorted(right, left, "left")
+        count = np.searchsorted(right, left, "right") - start
+        i = np.repeat(np.arange(left.size), count)
+        j = order[
+            np.arange(count.sum()) + np.repeat(start - np.cumsum(count) + count, count)
+        ]
+        axes = self.axes + tuple(a for a in other.axes if a not in self.axes)
+        shape = self.shape + tuple(
+            n for a, n in zip(other.axes, other.shape) if a not in self.axes
+        )
+        coords = {a: p[i] for a, p in self.coords.items()}
+        coords.update((a, p[j]) for a, p in other.coords.items() if a not in coords)
+        return Table(axes, shape, coords, self.values[i] * other.values[j])
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return self * -1
+
+
+class Block:
+    """A variable or constraint family laid out over the product of its axes,
+    occupying the consecutive positions offset .. offset + size - 1. Sparse
+    families list the position of each member along each axis instead."""
+
+    def __init__(self, name, axes, shape, offset, coords=None):
+        self.name = name
+        self.axes = axes
+        self.shape = shape
+        self.offset = offset
+        self.coords = coords
+        if coords is None:
+            self.size = int(np.prod(shape, dtype=np.int64))
+        else:
+            self.size = len(next(iter(coords.values())))
+            keys = _keys(coords, axes, shape, self.size)
+            self._order = np.argsort(keys, kind="stable")
+            self._keys = keys[self._order]
+
+    def relabel(self, labels):
+        axes = _axes(labels)
+        if self.coords is None:
+            return Block(self.name, axes, self.shape, self.offset)
+        coords = {new: self.coords[old] for old, new in zip(self.axes, axes)}
+        return Block(self.name, axes, self.shape, self.offset, coords)
+
+    def index(self, coords):
+        """Return the positions of the members at coords; -1 for the coords
+        that are not members of a sparse family."""
+        if self.coords is None:
+            return self.offset + np.ravel_multi_index(
+                [coords[a] for a in self.axes], self.shape
+            )
+        keys = _keys(coords, self.axes, self.shape, None)
+        if not self.size:
+            return np.full(keys.shape, -1)
+        found = np.searchsorted(self._keys, keys).clip(max=self.size - 1)
+        member = self._keys[found] == keys
+        return np.where(member, self.offset + self._order[found], -1)
+
+    def members(self, values):
+        """Yield the index of every member, in order."""
+        if self.coords is None:
+            return itertools.product(*(values[a] for a in self.axes))
+        return zip(
+            *(np.asarray(values[a], dtype=object)[self.coords[a]] for a in self.axes)
+        )
+
+    def labels(self, values):
+        """Yield the Pyomo LP-writer label of every member, in order."""
+        for member in self.members(values):
+            yield f"{self.name}({'_'.join(str(i) for i in member)})"
+
+
+def _names(blocks, values, ids):
+    """Return the labels of the (sorted) positions ids of the given blocks."""
+    names = np.empty(ids.size, dtype=object)
+    for block in blocks:
+        start = np.searchsorted(ids, block.offset)
+        stop = np.searchsorted(ids, block.offset + block.size)
+        if start == stop:
+            continue
+        labels = np.array(list(block.labels(values)), dtype=object)
+        names[start:stop] = labels[ids[start:stop] - block.offset]
+    return names
+
+
+class LinearProgram:
+    """Minimise c @ x subject to A @ x (sense) b and lower <= x <= upper.
+
+    sense holds "E", "L" or "G" per row; integer flags the columns that must
+    take integer values. Only rows and columns that carry coefficients are
+    kept; row_ids and col_ids give their position in the full layout.
+    """
+
+    def __init__(self, builder, A, b, sense, c, lower, upper, integer, rows, cols):
+        self.A = A
+        self.b = b
+        self.sense = sense
+        self.c = c
+        self.lower = lower
+        self.upper = upper
+        self.integer = integer
+        self.row_ids = rows
+        self.col_ids = cols
+        self._values = builder.values
+        self._row_blocks = builder.row_blocks
+        self._col_blocks = builder.col_blocks
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    def row_names(self):
+        return _names(self._row_blocks, self._values, self.row_ids)
+
+    def col_names(self):
+        return _names(self._col_blocks, self._values, self.col_ids)
+
+    def values(self, x, name):
+        """Return {index: value} of variable name from a solution vector.
+        Members that were left out of the problem are reported as 0."""
+        block = next(b for b in self._col_blocks if b.name == name)
+        start = np.searchsorted(self.col_ids, block.offset)
+        stop = np.searchsorted(self.col_ids, block.offset + block.size)
+        full = np.zeros(block.size)
+        full[self.col_ids[start:stop] - block.offset] = x[start:stop]
+        return dict(zip(block.members(self._values), full.tolist()))
+
+    def row_bounds(self):
+        row_lower = np.where(self.sense == "L", -INFINITY, self.b)
+        row_upper = np.where(self.sense == "G", INFINITY, self.b)
+        return row_lower, row_upper
+
+    def solve(self, **options):
+        """Solve with HiGHS through scipy.optimize.milp."""
+        row_lower, row_upper = self.row_bounds()
+        return milp(
+            self.c,
+            integrality=self.integer.astype(int),
+            bounds=Bounds(self.lower, self.upper),
+            constraints=LinearConstraint(self.A, row_lower, row_upper),
+            options=options,
+        )
+
+    def write_mps(self, filename):
+        """Write the problem in free MPS format."""
+        rows = self.row_names()
+        cols = self.col_names()
+        A = self.A.tocsc()
+        with open(filename, "w") as out:
+            out.write("NAME osemosys\nROWS\n N OBJ\n")
+            out.writelines(f" {s} {n}\n" for s, n in zip(self.sense, rows))
+            out.write("COLUMNS\n")
+            in_integer_block = False
+            for j, name in enumerate(cols):
+                if self.integer[j] != in_integer_block:
+                    marker = "INTORG" if self.integer[j] else "INTEND"
+                    out.write(f" MARKER 'MARKER' '{marker}'\n")
+                    in_integer_block = self.integer[j]
+                if self.c[j]:
+                    out.write(f" {name} OBJ {self.c[j]:.17g}\n")
+                entries = slice(A.indptr[j], A.indptr[j + 1])
+                out.writelines(
+                    f" {name} {rows[i]} {v:.17g}\n"
+                    for i, v in zip(A.indices[entries], A.data[entries])
+                )
+            if in_integer_block:
+                out.write(" MARKER 'MARKER' 'INTEND'\n")
+            out.write("RHS\n")
+            out.writelines(
+                f" RHS {rows[i]} {self.b[i]:.17g}\n" for i in np.flatnonzero(self.b)
+            )
+            out.write("BOUNDS\n")
+            for j, name in enumerate(cols):
+                lower, upper = self.lower[j], self.upper[j]
+                if lower == -INFINITY and upper == INFINITY:
+                    out.write(f" FR BND {name}\n")
+                    continue
+                if lower == -INFINITY:
+                    out.write(f" MI BND {name}\n")
+                elif lower != 0:
+                    out.write(f" LO BND {name} {lower:.17g}\n")
+                if upper != INFINITY:
+                    out.write(f" UP BND {name} {upper:.17g}\n")
+                elif self.integer[j]:
+                    out.write(f" PL BND {name}\n")
+            out.write("ENDATA\n")
+
+
+class Builder:
+    """Collects variable blocks, constraint blocks and COO triplets."""
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.values = {}
+        for axis, set_name in AXES.items():
+            members = list(getattr(instance, set_name))
+            if set_name in ORDERED_SETS:
+                members.sort()
+            self.values[axis] = members
+        self.sizes = {axis: len(members) for axis, members in self.values.items()}
+        self.col_blocks = []
+        self.row_blocks = []
+        self.vars = {}
+        self._lower, self._upper, self._integer = [], [], []
+        self._b, self._sense, self._keep = [], [], []
+        self._rows, self._cols, self._coefs = [], [], []
+        self._ncols = 0
+        self._nrows = 0
+
+    #########			Data						#############
+
+    def param(self, name, labels=None):
+        """Return the Table of the nonzero values of an indexed parameter.
+        Only a parameter with a nonzero default has an entry for every index."""
+        component = getattr(self.instance, name)
+        index_sets = [s.local_name for s in component.index_set().subsets()]
+        if labels is None:
+            axes = []
+            for set_name in index_sets:
+                axis = next(
+                    a for a, s in AXES.items() if s == set_name and a not in axes
+                )
+                axes.append(axis)
+            axes = tuple(axes)
+        else:
+            axes = _axes(labels)
+        positions = [
+            {member: i for i, member in enumerate(self.values[a])} for a in axes
+        ]
+        shape = [self.sizes[a] for a in axes]
+        entries = [
+            (index if isinstance(index, tuple) else (index,), v)
+            for index, v in component.sparse_items()
+        ]
+        default = component.default()
+        if default is Param.NoValue and len(entries) < np.prod(shape):
+            raise ValueError(f"parameter {name} has no value for some indices")
+        if default not in (0, Param.NoValue):
+            array = np.full(shape, default, dtype=float)
+            for index, v in entries:
+                array[tuple(p[i] for p, i in zip(positions, index))] = v
+            return Table.from_dense(array, axes)
+        coords = np.array(
+            [[p[i] for p, i in zip(positions, index)] for index, _ in entries],
+            dtype=np.int64,
+        ).reshape(len(entries), len(axes))
+        table = Table(axes, shape, dict(zip(axes, coords.T)), [v for _, v in entries])
+        order = np.argsort(
+            _keys(table.coords, axes, shape, len(entries)), kind="stable"
+        )
+        return table.select(order[table.values[order] != 0])
+
+    def scalar(self, name):
+        return value(getattr(self.instance, name))
+
+    def years(self, labels="y"):
+        return np.array(self.values["y"], dtype=float), _axes(labels)
+
+    def lag(self, labels, shift):
+        """Return the 0/1 matrix selecting member i + shift of the second axis
+        for member i of the first, e.g. lag("y yy", -1) picks y - 1."""
+        axes = _axes(labels)
+        members = np.array(self.values[axes[0]], dtype=float)
+        return (members[None, :] == members[:, None] + shift).astype(float), axes
+
+    def first(self, label):
+        members = self.values[label]
+        return np.array([m == min(members) for m in members], dtype=float), (label,)
+
+    def last(self, label):
+        members = self.values[label]
+        return np.array([m == max(members) for m in members], dtype=float), (label,)
+
+    def grid(self, labels):
+        """Return the Table of ones over every combination of the axes."""
+        axes = _axes(labels)
+        shape = [self.sizes[a] for a in axes]
+        return Table.from_dense(np.ones(shape), axes)
+
+    def full(self, factor, axes):
+        """Broadcast a scalar, an (array, axes) factor or a Table to the given
+        axes."""
+        shape = [self.sizes[a] for a in axes]
+        if isinstance(factor, Table):
+            factor = factor.dense()
+        if isinstance(factor, tuple):
+            return np.broadcast_to(_align(factor[0], factor[1], axes), shape)
+        return np.full(shape, factor, dtype=float)
+
+    #########			Layout						#############
+
+    def var(self, name, labels, lower=0.0, upper=INFINITY, integer=False):
+        axes = _axes(labels)
+        block = Block(name, axes, [self.sizes[a] for a in axes], self._ncols)
+        self._ncols += block.size
+        self._lower.append(self.full(lower, axes).ravel())
+        self._upper.append(self.full(upper, axes).ravel())
+        self._integer.append(np.full(block.size, integer))
+        self.col_blocks.append(block)
+        self.vars[name] = block
+        return block
+
+    def sparse_var(self, name, labels, coords, lower=0.0):
+        axes = _axes(labels)
+        block = Block(name, axes, [self.sizes[a] for a in axes], self._ncols, coords)
+        size = block.size
+        self._ncols += size
+        self._lower.append(np.full(size, lower))
+        self._upper.append(np.full(size, INFINITY))
+        self._integer.append(np.zeros(size, dtype=bool))
+        self.col_blocks.append(block)
+        self.vars[name] = block
+        return block
+
+    def constraint(self, name, labels, sense, rhs=0.0, where=True):
+        """Declare a dense constraint family; where masks the rows that the
+        Pyomo rule would skip."""
+        axes = _axes(labels)
+        block = Block(name, axes, [self.sizes[a] for a in axes], self._nrows)
+        self._nrows += block.size
+        self._b.append(self.full(rhs, axes).ravel())
+        self._sense.append(np.full(block.size, sense))
+        self._keep.append(self.full(where, axes).ravel() != 0)
+        self.row_blocks.append(block)
+        return block
+
+    def sparse_constraint(self, name, labels, coords, sense, rhs=0.0):
+        axes = _axes(labels)
+        block = Block(name, axes, [self.sizes[a] for a in axes], self._nrows, coords)
+        size = block.size
+        self._nrows += size
+        self._b.append(np.full(size, rhs, dtype=float))
+        self._sense.append(np.full(size, sense))
+        self._keep.append(np.ones(size, dtype=bool))
+        self.row_blocks.append(block)
+        return block
+
+    #########			Coefficients				#############
+
+    def add(self, rows, cols, coefs):
+        rows, cols, coefs = np.broadcast_arrays(rows, cols, coefs)
+        nonzero = (coefs != 0) & (rows >= 0) & (cols >= 0)
+        self._rows.append(rows[nonzero].ravel())
+        self._cols.append(cols[nonzero].ravel())
+        self._coefs.append(coefs[nonzero].ravel())
+
+    def term(self, rows, cols, *factors):
+        """Add cols * product(factors) to rows, for every combination of their
+        axes. Axes of cols (or of the factors) that rows lacks are summed
+        over; factors are scalars, (array, axes) pairs or Tables, and are
+        joined on their nonzero entries only."""
+        coef = Table((), (), {}, [1.0])
+        for factor in factors:
+            if isinstance(factor, tuple):
+                factor = Table.from_dense(*factor)
+            coef = coef * factor
+        free = []
+        for a in rows.axes + cols.axes:
+            if a not in coef.axes and a not in free:
+                free.append(a)
+        coef = coef.select(coef.values != 0) * self.grid(free)
+        self.add(rows.index(coef.coords), cols.index(coef.coords), coef.values)
+
+    def finish(self, objective):
+        """Assemble the LinearProgram minimising sum(objective)."""
+        ncols = self._ncols
+        A = sparse.coo_matrix(
+            (
+                np.concatenate(self._coefs),
+                (np.concatenate(self._rows), np.concatenate(self._cols)),
+            ),
+            shape=(self._nrows, ncols),
+        ).tocsr()
+        A.sum_duplicates()
+        A.eliminate_zeros()
+        b = np.concatenate(self._b)
+        sense = np.concatenate(self._sense)
+        keep = np.concatenate(self._keep)
+        c = np.zeros(ncols)
+        c[objective.offset : objective.offset + objective.size] = 1.0
+
+        empty = keep & (np.diff(A.indptr) == 0)
+        violated = empty & (
+            ((sense == "E") & (b != 0))
+            | ((sense == "L") & (b < 0))
+            | ((sense == "G") & (b > 0))
+        )
+        if violated.any():
+            name = _names(self.row_blocks, self.values, np.flatnonzero(violated))[0]
+            raise ValueError(f"constraint {name} has no variables and is infeasible")
+        rows = np.flatnonzero(keep & ~empty)
+        A = A[rows]
+        cols = np.flatnonzero((np.bincount(A.indices, minlength=ncols) > 0) | (c != 0))
+        return LinearProgram(
+            self,
+            A[:, cols].tocsr(),
+            b[rows],
+            sense[rows],
+            c[cols],
+            np.concatenate(self._lower)[cols],
+            np.concatenate(self._upper)[cols],
+            np.concatenate(self._integer)[cols],
+            rows,
+            cols,
+        )
+
+
+######################
+#   Model Variables  #
+######################
+
+
+def _variables(m):
+    bounds = m.scalar("UseVariableBounds")
+
+    ########			Demands 					#############
+
+    m.var("RateOfDemand", "r l f y")
+    m.var("Demand", "r l f y")
+
+    ########     		Storage                 		#############
+
+    charge = m.param("StorageMaxChargeRate") if bounds else INFINITY
+    discharge = m.param("StorageMaxDischargeRate") if bounds else INFINITY
+    m.var("RateOfStorageCharge", "r s ls ld lh y", -INFINITY, charge)
+    m.var("RateOfStorageDischarge", "r s ls ld lh y", -INFINITY, discharge)
+    m.var("NetChargeWithinYear", "r s ls ld lh y", -INFINITY)
+    m.var("NetChargeWithinDay", "r s ls ld lh y", -INFINITY)
+    m.var("StorageLevelYearStart", "r s y")
+    m.var("StorageLevelYearFinish", "r s y")
+    m.var("StorageLevelSeasonStart", "r s ls y")
+    m.var("StorageLevelDayTypeStart", "r s ls ld y")
+    m.var("StorageLevelDayTypeFinish", "r s ls ld y")
+    for name in (
+        "StorageLowerLimit",
+        "StorageUpperLimit",
+        "AccumulatedNewStorageCapacity",
+        "NewStorageCapacity",
+        "CapitalInvestmentStorage",
+        "DiscountedCapitalInvestmentStorage",
+        "SalvageValueStorage",
+        "DiscountedSalvageValueStorage",
+        "TotalDiscountedStorageCost",
+    ):
+        m.var(name, "r s y")
+
+    #########		    Capacity Variables 			#############
+
+    if bounds:
+        upper = m.param("TotalAnnualMaxCapacityInvestment").dense()
+        new_capacity = (
+            m.param("TotalAnnualMinCapacityInvestment"),
+            (np.where(upper[0] != 99999, upper[0], INFINITY), upper[1]),
+        )
+        upper = m.param("TotalAnnualMaxCapacity").dense()
+        total_capacity = (
+            m.param("TotalAnnualMinCapacity"),
+            (np.where(upper[0] != 99999, upper[0], INFINITY), upper[1]),
+        )
+    else:
+        new_capacity = total_capacity = (0.0, INFINITY)
+    m.var("NumberOfNewTechnologyUnits", "r t y", integer=True)
+    m.var("NewCapacity", "r t y", *new_capacity)
+    m.var("AccumulatedNewCapacity", "r t y")
+    m.var("TotalCapacityAnnual", "r t y", *total_capacity)
+
+    #########		    Activity Variables 			#############
+
+    m.var("RateOfActivity", "r l t m y")
+    m.var("RateOfTotalActivity", "r t l y")
+    m.var("TotalTechnologyAnnualActivity", "r t y")
+    m.var("TotalAnnualTechnologyActivityByMode", "r t m y")
+    for name, ratio in (
+        ("RateOfProductionByTechnologyByMode", "OutputActivityRatio"),
+        ("RateOfUseByTechnologyByMode", "InputActivityRatio"),
+    ):
+        m.sparse_var(name, "r l t m f y", _by_mode(m, ratio).coords)
+    # PRODUCTION_BY_TECHNOLOGY and USE_BY_TECHNOLOGY; the totals are held at
+    # zero for the fuels no technology produces (uses).
+    produced_by, produced = _fuels(m, "OutputActivityRatio")
+    used_by, used = _fuels(m, "InputActivityRatio")
+    produced_by = (produced_by * m.grid("l")).coords
+    used_by = (used_by * m.grid("l")).coords
+    produced, axes = produced.dense()
+    produced = (np.where(produced != 0, INFINITY, 0.0), axes)
+    used, axes = used.dense()
+    used = (np.where(used != 0, INFINITY, 0.0), axes)
+    m.sparse_var("RateOfProductionByTechnology", "r l t f y", produced_by)
+    m.sparse_var("ProductionByTechnology", "r l t f y", produced_by)
+    m.var("RateOfProduction", "r l f y", 0.0, produced)
+    m.var("Production", "r l f y", 0.0, produced)
+    m.sparse_var("RateOfUseByTechnology", "r l t f y", used_by)
+    m.var("RateOfUse", "r l f y", 0.0, used)
+    m.sparse_var("UseByTechnology", "r l t f y", used_by)
+    m.var("Use", "r l f y", 0.0, used)
+    m.var("Trade", "r rr l f y", -INFINITY)
+    m.var("TradeAnnual", "r rr f y", -INFINITY)
+    m.var("ProductionAnnual", "r f y")
+    m.var("UseAnnual", "r f y")
+
+    #########		    Costing Variables 			#############
+
+    for name in (
+        "CapitalInvestment",
+        "DiscountedCapitalInvestment",
+        "SalvageValue",
+        "DiscountedSalvageValue",
+        "OperatingCost",
+        "DiscountedOperatingCost",
+        "AnnualVariableOperatingCost",
+        "AnnualFixedOperatingCost",
+        "TotalDiscountedCostByTechnology",
+    ):
+        m.var(name, "r t y")
+    m.var("TotalDiscountedCost", "r y")
+    m.var("ModelPeriodCostByRegion", "r")
+
+    #########			Reserve Margin				#############
+
+    m.var("TotalCapacityInReserveMargin", "r y")
+    m.var("DemandNeedingReserveMargin", "r l y")
+    m.var("TotalTechnologyModelPeriodActivity", "r t", -INFINITY)
+
+    #########			Emissions					#############
+
+    m.var("AnnualTechnologyEmissionByMode", "r t e m y")
+    m.var("AnnualTechnologyEmission", "r t e y")
+    m.var("AnnualTechnologyEmissionPenaltyByEmission", "r t e y")
+    m.var("AnnualTechnologyEmissionsPenalty", "r t y")
+    m.var("DiscountedTechnologyEmissionsPenalty", "r t y")
+    m.var("AnnualEmissions", "r e y")
+    m.var("ModelPeriodEmissions", "r e")
+
+
+#########################
+#   Derived Parameters  #
+#########################
+
+
+def _by_mode(m, ratio_name):
+    """Return the activity ratio over the members (r, t, f, m, y, l) of
+    PRODUCTION_BY_MODE (USE_BY_MODE)."""
+    return m.param(ratio_name) * m.grid("l")
+
+
+def _fuels(m, ratio_name):
+    """Return the 0/1 Tables of FUEL_PRODUCED_BY (FUEL_USED_BY) over
+    (r, t, f, y) and of FUEL_PRODUCED (FUEL_USED) over (r, f, y) for the
+    activity ratio."""
+    ratio = m.param(ratio_name)
+    return ratio.sum("r t f y").ones(), ratio.sum("r f y").ones()
+
+
+def _discount_factors(m):
+    return tuple(
+        m.param(name).dense()
+        for name in ("DiscountFactor", "DiscountFactorMid", "DiscountFactorSalvage")
+    )
+
+
+def _vintages(m, life, labels):
+    """Return the 0/1 Table over labels (r, x, y, yy) of the vintages yy still
+    operating in y, listing only those."""
+    years = m.years()[0]
+    age = years[:, None] - years[None, :]
+    axes = _axes(labels)
+    parts = []
+    for a in np.unique(age[age >= 0]):
+        operating = Table.from_dense(life > a, axes[:2])
+        pairs = Table.from_dense(age == a, axes[2:])
+        parts.append(operating * pairs)
+    return Table(
+        axes,
+        life.shape + age.shape,
+        {a: np.concatenate([t.coords[a] for t in parts]) for a in axes},
+        np.concatenate([t.values for t in parts]),
+    )
+
+
+#####################
+# Constraints       #
+#####################
+
+
+def _capacity(m):
+    v = m.vars
+
+    row = m.constraint(
+        "SpecifiedDemand",
+        "r f l y",
+        "E",
+        (
+            m.param("SpecifiedAnnualDemand").dense()[0][:, :, None, :]
+            * m.param("SpecifiedDemandProfile").dense()[0]
+            / m.param("YearSplit").dense()[0][None, None, :, :],
+            ("r", "f", "l", "y"),
+        ),
+    )
+    m.term(row, v["RateOfDemand"])
+
+    #########       	Capacity Adequacy A	     	#############
+
+    life = m.param("OperationalLife").dense()[0]
+    row = m.constraint("TotalNewCapacity_1", "r t y", "E")
+    m.term(row, v["AccumulatedNewCapacity"])
+    m.term(row, v["NewCapacity"].relabel("r t yy"), -1, _vintages(m, life, "r t y yy"))
+
+    unit = m.param("CapacityOfOneTechnologyUnit")
+    row = m.constraint("TotalNewCapacity_2", "r t y", "E", where=unit)
+    m.term(row, v["NumberOfNewTechnologyUnits"], unit)
+    m.term(row, v["NewCapacity"], -1)
+
+    residual = m.param("ResidualCapacity")
+    row = m.constraint("TotalAnnualCapacity_constraint", "r t y", "E", -residual)
+    m.term(row, v["AccumulatedNewCapacity"])
+    m.term(row, v["TotalCapacityAnnual"], -1)
+
+    row = m.constraint("TotalActivityOfEachTechnology", "r t l y", "E")
+    m.term(row, v["RateOfActivity"])
+    m.term(row, v["RateOfTotalActivity"], -1)
+
+    row = m.constraint("ConstraintCapacity", "r l t y", "L")
+    m.term(row, v["RateOfTotalActivity"])
+    m.term(
+        row,
+        v["TotalCapacityAnnual"],
+        -1,
+        m.param("CapacityFactor"),
+        m.param("CapacityToActivityUnit"),
+    )
+
+    #########       	Capacity Adequacy B		 	#############
+
+    row = m.constraint("PlannedMaintenance", "r t y", "L")
+    m.term(row, v["RateOfTotalActivity"], m.param("YearSplit"))
+    m.term(
+        row,
+        v["TotalCapacityAnnual"],
+        -1,
+        m.param("CapacityFactor"),
+        m.param("YearSplit"),
+        m.param("AvailabilityFactor"),
+        m.param("CapacityToActivityUnit"),
+    )
+
+
+def _energy_balance(m):
+    v = m.vars
+    year_split = m.param("YearSplit")
+    trade_route = m.param("TradeRoute")
+
+    #########	        Energy Balance A    	 	#############
+
+    fuel_by = {}
+    fuel = {}
+    for (
+        by_mode_name,
+        ratio_name,
+        by_mode_rows,
+        by_technology_rows,
+        total_rows,
+        by_technology,
+        total,
+    ) in (
+        (
+            "RateOfProductionByTechnologyByMode",
+            "OutputActivityRatio",
+            "RateOfFuelProduction1",
+            "RateOfFuelProduction2",
+            "RateOfFuelProduction3",
+            "RateOfProductionByTechnology",
+            "RateOfProduction",
+        ),
+        (
+            "RateOfUseByTechnologyByMode",
+            "InputActivityRatio",
+            "RateOfFuelUse1",
+            "RateOfFuelUse2",
+            "RateOfFuelUse3",
+            "RateOfUseByTechnology",
+            "RateOfUse",
+        ),
+    ):
+        by_mode = v[by_mode_name]
+        coords = by_mode.coords
+        row = m.sparse_constraint(by_mode_rows, by_mode.axes, coords, "E")
+        members = np.arange(by_mode.size)
+        m.add(row.offset + members, by_mode.offset + members, 1.0)
+        m.add(
+            row.offset + members,
+            v["RateOfActivity"].index(coords),
+            -_by_mode(m, ratio_name).values,
+        )
+
+        fuel_by[total], fuel[total] = _fuels(m, ratio_name)
+
+        row = m.constraint(by_technology_rows, "r l f t y", "E", where=fuel_by[total])
+        m.term(row, v[by_technology])
+        m.add(row.index(coords), by_mode.offset + members, -1.0)
+
+        row = m.constraint(total_rows, "r l f y", "E", where=fuel[total])
+        m.term(row, v[total])
+        m.term(row, v[by_technology], -1, fuel_by[total])
+
+    for name, rate, amount in (
+        ("EnergyBalanceEachTS1", "RateOfProduction", "Production"),
+        ("EnergyBalanceEachTS2", "RateOfUse", "Use"),
+        ("EnergyBalanceEachTS3", "RateOfDemand", "Demand"),
+    ):
+        row = m.constraint(name, "r l f y", "E", where=fuel.get(rate, True))
+        m.term(row, v[rate], year_split)
+        m.term(row, v[amount], -1)
+
+    # TRADE_LINK, and the pairs of it in REGION order whose antisymmetry row
+    # is generated; Trade outside the links is never referenced.
+    route, route_axes = trade_route.dense()
+    link = (route != 0) | (np.swapaxes(route, 0, 1) != 0)
+    regions = np.arange(m.sizes["r"])
+    link &= (regions[:, None] != regions)[:, :, None, None]
+    pair = link & (regions[:, None] < regions)[:, :, None, None]
+    link = (link, route_axes)
+
+    row = m.constraint(
+        "EnergyBalanceEachTS4", "r rr l f y", "E", where=(pair, route_axes)
+    )
+    m.term(row, v["Trade"])
+    m.term(row, v["Trade"].relabel("rr r l f y"))
+
+    row = m.constraint("EnergyBalanceEachTS5", "r l f y", "G")
+    m.term(row, v["Production"])
+    m.term(row, v["Demand"], -1)
+    m.term(row, v["Use"], -1)
+    m.term(row, v["Trade"], -1, trade_route)
+
+    #########        	Energy Balance B		 	#############
+
+    for name, amount, annual in (
+        ("EnergyBalanceEachYear1", "Production", "ProductionAnnual"),
+        ("EnergyBalanceEachYear2", "Use", "UseAnnual"),
+    ):
+        row = m.constraint(name, "r f y", "E")
+        m.term(row, v[amount])
+        m.term(row, v[annual], -1)
+
+    row = m.constraint("EnergyBalanceEachYear3", "r rr f y", "E", where=link)
+    m.term(row, v["Trade"])
+    m.term(row, v["TradeAnnual"], -1)
+
+    row = m.constraint(
+        "EnergyBalanceEachYear4", "r f y", "G", m.param("AccumulatedAnnualDemand")
+    )
+    m.term(row, v["ProductionAnnual"])
+    m.term(row, v["UseAnnual"], -1)
+    m.term(row, v["TradeAnnual"], -1, trade_route)
+
+    #########        	Accounting Technology Production/Use	#############
+
+    for name, rate, amount in (
+        (
+            "FuelProductionByTechnology",
+            "RateOfProductionByTechnology",
+            "ProductionByTechnology",
+        ),
+        ("FuelUseByTechnology", "RateOfUseByTechnology", "UseByTechnology"),
+    ):
+        # Both variables are laid out over the same members.
+        coords = v[rate].coords
+        row = m.sparse_constraint(name, "r l t f y", coords, "E")
+        members = np.arange(row.size)
+        split = year_split.dense()[0][coords["l"], coords["y"]]
+        m.add(row.offset + members, v[rate].offset + members, split)
+        m.add(row.offset + members, v[amount].offset + members, -1.0)
+
+    row = m.constraint("AverageAnnualRateOfActivity", "r t m y", "E")
+    m.term(row, v["RateOfActivity"], year_split)
+    m.term(row, v["TotalAnnualTechnologyActivityByMode"], -1)
+
+    row = m.constraint("ModelPeriodCostByRegion_constraint", "r", "E")
+    m.term(row, v["ModelPeriodCostByRegion"])
+    m.term(row, v["TotalDiscountedCost"], -1)
+
+
+def _storage(m):
+    v = m.vars
+    storage = "r s ls ld lh y"
+
+    #########			Storage equations	(15)		#############
+
+    # TIMESLICE_OF_BRACKET, as the 0/1 Table over (l, ls, ld, lh).
+    in_bracket = Table((), (), {}, [1.0])
+    for name in ("Conversionls", "Conversionld", "Conversionlh"):
+        conversion = m.param(name)
+        in_bracket = in_bracket * conversion.select(conversion.values > 0).ones()
+    for name, ratio, rate in (
+        (
+            "RateOfStorageCharge_constraint",
+            "TechnologyToStorage",
+            "RateOfStorageCharge",
+        ),
+        (
+            "RateOfStorageDischarge_constraint",
+            "TechnologyFromStorage",
+            "RateOfStorageDischarge",
+        ),
+    ):
+        ratio = m.param(ratio)
+        row = m.constraint(name, storage, "E")
+        m.term(row, v["RateOfActivity"], ratio.select(ratio.values > 0), in_bracket)
+        m.term(row, v[rate], -1)
+
+    bracket_split = (in_bracket * m.param("YearSplit")).sum("ls ld lh y")
+    row = m.constraint("NetChargeWithinYear_constraint", storage, "E")
+    m.term(row, v["RateOfStorageCharge"], bracket_split)
+    m.term(row, v["RateOfStorageDischarge"], -1, bracket_split)
+    m.term(row, v["NetChargeWithinYear"], -1)
+
+    day_split = m.param("DaySplit")
+    row = m.constraint("NetChargeWithinDay_constraint", storage, "E")
+    m.term(row, v["RateOfStorageCharge"], day_split)
+    m.term(row, v["RateOfStorageDischarge"], -1, day_split)
+    m.term(row, v["NetChargeWithinDay"], -1)
+
+    first_year, last_year = m.first("y"), m.last("y")
+    previous_year, next_year = m.lag("y yy", -1), m.lag("y yy", 1)
+    level_start = m.param("StorageLevelStart")
+    row = m.constraint(
+        "StorageLevelYearStart_constraint",
+        "r s y",
+        "E",
+        (-level_start.dense()[0][:, :, None] * first_year[0], ("r", "s", "y")),
+    )
+    m.term(row, v["StorageLevelYearStart"], -1)
+    m.term(row, v["StorageLevelYearStart"].relabel("r s yy"), previous_year)
+    m.term(row, v["NetChargeWithinYear"].relabel("r s ls ld lh yy"), previous_year)
+
+    row = m.constraint("StorageLevelYearFinish_constraint", "r s y", "E")
+    m.term(row, v["StorageLevelYearFinish"], -1)
+    m.term(
+        row,
+        v["StorageLevelYearStart"].relabel("r s yy"),
+        (next_year[0] + np.diag(last_year[0]), ("y", "yy")),
+    )
+    m.term(
+        row,
+        v["NetChargeWithinYear"].relabel("r s ls ld lh yy"),
+        previous_year,
+        last_year,
+    )
+
+    previous_season = m.lag("ls lss", -1)
+    row = m.constraint("StorageLevelSeasonStart_constraint", "r s ls y", "E")
+    m.term(row, v["StorageLevelSeasonStart"], -1)
+    m.term(row, v["StorageLevelYearStart"], m.first("ls"))
+    m.term(row, v["StorageLevelSeasonStart"].relabel("r s lss y"), previous_season)
+    m.term(row, v["NetChargeWithinYear"].relabel("r s lss ld lh y"), previous_season)
+
+    first_day, last_day = m.first("ld"), m.last("ld")
+    previous_day, next_day = m.lag("ld ldd", -1), m.lag("ld ldd", 1)
+    row = m.constraint("StorageLevelDayTypeStart_constraint", "r s ls ld y", "E")
+    m.term(row, v["StorageLevelDayTypeStart"], -1)
+    m.term(row, v["StorageLevelSeasonStart"], first_day)
+    m.term(row, v["StorageLevelDayTypeStart"].relabel("r s ls ldd y"), previous_day)
+    m.term(row, v["NetChargeWithinDay"].relabel("r s ls ldd lh y"), previous_day)
+
+    row = m.constraint("StorageLevelDayTypeFinish_constraint", "r s ls ld y", "E")
+    m.term(row, v["StorageLevelDayTypeFinish"], -1)
+    m.term(row, v["StorageLevelYearFinish"], last_day, m.last("ls"))
+    m.term(
+        row,
+        v["StorageLevelSeasonStart"].relabel("r s lss y"),
+        last_day,
+        m.lag("ls lss", 1),
+    )
+    m.term(row, v["StorageLevelDayTypeFinish"].relabel("r s ls ldd y"), next_day)
+    m.term(
+        row,
+        v["NetChargeWithinDay"].relabel("r s ls ldd lh y"),
+        -1,
+        next_day,
+        m.param("DaysInDayType", "ls ldd y"),
+    )
+
+    #########			Storage constraints		(6)	#############
+
+    members = np.array(m.values["lh"], dtype=float)
+    earlier = (members[:, None] > members[None, :]).astype(float), ("lh", "lhh")
+    later = (members[:, None] < members[None, :]).astype(float), ("lh", "lhh")
+    not_first_day = (1 - first_day[0], ("ld",))
+    charge_within_day = v["NetChargeWithinDay"].relabel("r s ls ld lhh y")
+    charge_previous_day = v["NetChargeWithinDay"].relabel("r s ls ldd lhh y")
+    for limit, sense, bound in (
+        ("LowerLimit", "G", "StorageLowerLimit"),
+        ("UpperLimit", "L", "StorageUpperLimit"),
+    ):
+        row = m.constraint(
+            f"{limit}_1TimeBracket1InstanceOfDayType1week_constraint", storage, sense
+        )
+        m.term(row, v["StorageLevelDayTypeStart"])
+        m.term(row, charge_within_day, earlier)
+        m.term(row, v[bound], -1)
+
+        row = m.constraint(
+            f"{limit}_EndDaylyTimeBracketLastInstanceOfDayType1Week_constraint",
+            storage,
+            sense,
+            where=not_first_day,
+        )
+        m.term(row, v["StorageLevelDayTypeStart"])
+        m.term(row, charge_previous_day, -1, previous_day, later)
+        m.term(row, v[bound], -1)
+
+        row = m.constraint(
+            f"{limit}_EndDaylyTimeBracketLastInstanceOfDayTypeLastWeek_constraint",
+            storage,
+            sense,
+        )
+        m.term(row, v["StorageLevelDayTypeFinish"])
+        m.term(row, charge_within_day, -1, later)
+        m.term(row, v[bound], -1)
+
+        row = m.constraint(
+            f"{limit}_1TimeBracket1InstanceOfDayTypeLastweek_constraint",
+            storage,
+            sense,
+            where=not_first_day,
+        )
+        m.term(
+            row, v["StorageLevelDayTypeFinish"].relabel("r s ls ldd y"), previous_day
+        )
+        m.term(row, charge_within_day, earlier)
+        m.term(row, v[bound], -1)
+
+    if not m.scalar("UseVariableBounds"):
+        for name, rate, limit in (
+            (
+                "MaxChargeConstraint_constraint",
+                "RateOfStorageCharge",
+                "StorageMaxChargeRate",
+            ),
+            (
+                "MaxDischargeConstraint_constraint",
+                "RateOfStorageDischarge",
+                "StorageMaxDischargeRate",
+            ),
+        ):
+            row = m.constraint(name, storage, "L", m.param(limit))
+            m.term(row, v[rate])
+
+    #########			Storage investments		(10)	#############
+
+    residual = m.param("ResidualStorageCapacity")
+    row = m.constraint("StorageUpperLimit_constraint", "r s y", "E", -residual)
+    m.term(row, v["AccumulatedNewStorageCapacity"])
+    m.term(row, v["StorageUpperLimit"], -1)
+
+    row = m.constraint("StorageLowerLimit_constraint", "r s y", "E")
+    m.term(row, v["StorageUpperLimit"], m.param("MinStorageCharge"))
+    m.term(row, v["StorageLowerLimit"], -1)
+
+    life = m.param("OperationalLifeStorage").dense()[0]
+    row = m.constraint("TotalNewStorage_constraint", "r s y", "E")
+    m.term(
+        row, v["NewStorageCapacity"].relabel("r s yy"), _vintages(m, life, "r s y yy")
+    )
+    m.term(row, v["AccumulatedNewStorageCapacity"], -1)
+
+    row = m.constraint("UndiscountedCapitalInvestmentStorage_constraint", "r s y", "E")
+    m.term(row, v["NewStorageCapacity"], m.param("CapitalCostStorage"))
+    m.term(row, v["CapitalInvestmentStorage"], -1)
+
+    factor, _, salvage = _discount_factors(m)
+    row = m.constraint("DiscountingCapitalInvestmentStorage_constraint", "r s y", "E")
+    m.term(row, v["CapitalInvestmentStorage"], (1 / factor[0], factor[1]))
+    m.term(row, v["DiscountedCapitalInvestmentStorage"], -1)
+
+    row = m.constraint("SalvageValueStorageAtEndOfPeriod_constraint", "r s y", "E")
+    m.term(row, v["SalvageValueStorage"])
+    m.term(
+        row,
+        v["CapitalInvestmentStorage"],
+        -1,
+        m.param("SalvageValueFractionStorage"),
+    )
+
+    row = m.constraint("SalvageValueDiscountedToStartYear_constraint", "r s y", "E")
+    m.term(row, v["SalvageValueStorage"], (1 / salvage[0], salvage[1]))
+    m.term(row, v["DiscountedSalvageValueStorage"], -1)
+
+    row = m.constraint("TotalDiscountedCostByStorage_constraint", "r s y", "E")
+    m.term(row, v["DiscountedCapitalInvestmentStorage"])
+    m.term(row, v["DiscountedSalvageValueStorage"], -1)
+    m.term(row, v["TotalDiscountedStorageCost"], -1)
+
+
+def _costs(m):
+    v = m.vars
+    factor, mid, salvage = _discount_factors(m)
+
+    #########       	Capital Costs 		     	#############
+
+    row = m.constraint("UndiscountedCapitalInvestment", "r t y", "E")
+    m.term(row, v["NewCapacity"], m.param("CapitalCost"))
+    m.term(row, v["CapitalInvestment"], -1)
+
+    row = m.constraint("DiscountedCapitalInvestment_constraint", "r t y", "E")
+    m.term(row, v["CapitalInvestment"], (1 / factor[0], factor[1]))
+    m.term(row, v["DiscountedCapitalInvestment"], -1)
+
+    #########        	Operating Costs 		 	#############
+
+    row = m.constraint("OperatingCostsVariable", "r t y", "E")
+    m.term(row, v["TotalAnnualTechnologyActivityByMode"], m.param("VariableCost"))
+    m.term(row, v["AnnualVariableOperatingCost"], -1)
+
+    row = m.constraint("OperatingCostsFixedAnnual", "r t y", "E")
+    m.term(row, v["TotalCapacityAnnual"], m.param("FixedCost"))
+    m.term(row, v["AnnualFixedOperatingCost"], -1)
+
+    row = m.constraint("OperatingCostsTotalAnnual", "r t y", "E")
+    m.term(row, v["AnnualFixedOperatingCost"])
+    m.term(row, v["AnnualVariableOperatingCost"])
+    m.term(row, v["OperatingCost"], -1)
+
+    row = m.constraint("DiscountedOperatingCostsTotalAnnual", "r t y", "E")
+    m.term(row, v["OperatingCost"], (1 / mid[0], mid[1]))
+    m.term(row, v["DiscountedOperatingCost"], -1)
+
+    #########       	Total Discounted Costs	 	#############
+
+    row = m.constraint("TotalDiscountedCostByTechnology_constraint", "r t y", "E")
+    m.term(row, v["DiscountedOperatingCost"])
+    m.term(row, v["DiscountedCapitalInvestment"])
+    m.term(row, v["DiscountedTechnologyEmissionsPenalty"])
+    m.term(row, v["DiscountedSalvageValue"], -1)
+    m.term(row, v["TotalDiscountedCostByTechnology"], -1)
+
+    row = m.constraint("TotalDiscountedCost_constraint", "r y", "E")
+    m.term(row, v["TotalDiscountedCostByTechnology"])
+    m.term(row, v["TotalDiscountedStorageCost"])
+    m.term(row, v["TotalDiscountedCost"], -1)
+
+    #########           Salvage Value            	#############
+
+    row = m.constraint("SalvageValueAtEndOfPeriod1", "r t y", "E")
+    m.term(row, v["SalvageValue"])
+    m.term(
+        row,
+        v["NewCapacity"],
+        -1,
+        m.param("CapitalCost"),
+        m.param("SalvageValueFraction"),
+    )
+
+    row = m.constraint("SalvageValueDiscountedToStartYear", "r t y", "E")
+    m.term(row, v["DiscountedSalvageValue"])
+    m.term(row, v["SalvageValue"], -1, (1 / salvage[0], salvage[1]))
+
+
+def _limit_rows(m, *families):
+    """Add "var <= limit" (sense L) or "var >= limit" (sense G) rows, skipping
+    upper limits left at 99999 and lower limits left at 0."""
+    for name, var, limit, sense in families:
+        limit = m.param(limit).dense()
+        active = limit[0] != 99999 if sense == "L" else limit[0] > 0
+        row = m.constraint(name, limit[1], sense, limit, where=(active, limit[1]))
+        m.term(row, m.vars[var])
+
+
+def _limits(m):
+    v = m.vars
+    bounds = m.scalar("UseVariableBounds")
+
+    #########      		Total Capacity Constraints 	##############
+    #########    		New Capacity Constraints  	##############
+
+    if not bounds:
+        _limit_rows(
+            m,
+            (
+                "TotalAnnualMaxCapacityConstraint",
+                "TotalCapacityAnnual",
+                "TotalAnnualMaxCapacity",
+                "L",
+            ),
+            (
+                "TotalAnnualMinCapacityConstraint",
+                "TotalCapacityAnnual",
+                "TotalAnnualMinCapacity",
+                "G",
+            ),
+            (
+                "TotalAnnualMaxNewCapacityConstraint",
+                "NewCapacity",
+                "TotalAnnualMaxCapacityInvestment",
+                "L",
+            ),
+            (
+                "TotalAnnualMinNewCapacityConstraint",
+                "NewCapacity",
+                "TotalAnnualMinCapacityInvestment",
+                "G",
+            ),
+        )
+
+    #########   		Annual Activity Constraints	##############
+
+    row = m.constraint("TotalAnnualTechnologyActivity", "r t y", "E")
+    m.term(row, v["RateOfTotalActivity"], m.param("YearSplit"))
+    m.term(row, v["TotalTechnologyAnnualActivity"], -1)
+
+    _limit_rows(
+        m,
+        (
+            "TotalAnnualTechnologyActivityUpperlimit",
+            "TotalTechnologyAnnualActivity",
+            "TotalTechnologyAnnualActivityUpperLimit",
+            "L",
+        ),
+        (
+            "TotalAnnualTechnologyActivityLowerlimit",
+            "TotalTechnologyAnnualActivity",
+            "TotalTechnologyAnnualActivityLowerLimit",
+            "G",
+        ),
+    )
+
+    #########    		Total Activity Constraints 	##############
+
+    row = m.constraint("TotalModelHorizonTechnologyActivity", "r t", "E")
+    m.term(row, v["TotalTechnologyAnnualActivity"])
+    m.term(row, v["TotalTechnologyModelPeriodActivity"], -1)
+
+    _limit_rows(
+        m,
+        (
+            "TotalModelHorizonTechnologyActivityUpperLimit",
+            "TotalTechnologyModelPeriodActivity",
+            "TotalTechnologyModelPeriodActivityUpperLimit",
+            "L",
+        ),
+        (
+            "TotalModelHorizonTechnologyActivityLowerLimit",
+            "TotalTechnologyModelPeriodActivity",
+            "TotalTechnologyModelPeriodActivityLowerLimit",
+            "G",
+        ),
+    )
+
+
+def _emissions(m):
+    v = m.vars
+    _, mid, _ = _discount_factors(m)
+
+    #########   		Emissions Accounting		##############
+
+    # EMISSION_ACTIVITY and EMITTING_TECHNOLOGY; the emission variables
+    # outside them are never referenced and are dropped by finish.
+    ratio = m.param("EmissionActivityRatio")
+    activity = ratio.ones()
+    emitting = activity.sum("r t e y").ones()
+
+    row = m.constraint(
+        "AnnualEmissionProductionByMode", "r t e m y", "E", where=activity
+    )
+    m.term(row, v["TotalAnnualTechnologyActivityByMode"], ratio)
+    m.term(row, v["AnnualTechnologyEmissionByMode"], -1)
+
+    row = m.constraint("AnnualEmissionProduction", "r t e y", "E", where=emitting)
+    m.term(row, v["AnnualTechnologyEmissionByMode"], activity)
+    m.term(row, v["AnnualTechnologyEmission"], -1)
+
+    row = m.constraint(
+        "EmissionPenaltyByTechAndEmission", "r t e y", "E", where=emitting
+    )
+    m.term(row, v["AnnualTechnologyEmission"], m.param("EmissionsPenalty"))
+    m.term(row, v["AnnualTechnologyEmissionPenaltyByEmission"], -1)
+
+    row = m.constraint("EmissionsPenaltyByTechnology", "r t y", "E")
+    m.term(row, v["AnnualTechnologyEmissionPenaltyByEmission"], emitting)
+    m.term(row, v["AnnualTechnologyEmissionsPenalty"], -1)
+
+    row = m.constraint("DiscountedEmissionsPenaltyByTechnology", "r t y", "E")
+    m.term(row, v["AnnualTechnologyEmissionsPenalty"], (1 / mid[0], mid[1]))
+    m.term(row, v["DiscountedTechnologyEmissionsPenalty"], -1)
+
+    row = m.constraint("EmissionsAccounting1", "r e y", "E")
+    m.term(row, v["AnnualTechnologyEmission"], emitting)
+    m.term(row, v["AnnualEmissions"], -1)
+
+    exogenous = m.param("ModelPeriodExogenousEmission")
+    row = m.constraint("EmissionsAccounting2", "r e", "E", -exogenous)
+    m.term(row, v["AnnualEmissions"])
+    m.term(row, v["ModelPeriodEmissions"], -1)
+
+    limit = m.param("AnnualEmissionLimit").dense()
+    row = m.constraint(
+        "AnnualEmissionsLimit",
+        "r e y",
+        "L",
+        (limit[0] - m.param("AnnualExogenousEmission").dense()[0], limit[1]),
+        where=(limit[0] != 99999, limit[1]),
+    )
+    m.term(row, v["AnnualEmissions"])
+
+    limit = m.param("ModelPeriodEmissionLimit").dense()
+    row = m.constraint(
+        "ModelPeriodEmissionsLimit",
+        "r e",
+        "L",
+        limit,
+        where=(limit[0] != 99999, limit[1]),
+    )
+    m.term(row, v["ModelPeriodEmissions"])
+
+
+def _reserve_margin(m):
+    v = m.vars
+
+    #########   		Reserve Margin Constraint	##############
+
+    row = m.constraint("ReserveMargin_TechnologiesIncluded", "r y", "E")
+    m.term(
+        row,
+        v["TotalCapacityAnnual"],
+        m.param("ReserveMarginTagTechnology"),
+        m.param("CapacityToActivityUnit"),
+    )
+    m.term(row, v["TotalCapacityInReserveMargin"], -1)
+
+    row = m.constraint("ReserveMargin_FuelsIncluded", "r l y", "E")
+    m.term(row, v["RateOfProduction"], m.param("ReserveMarginTagFuel"))
+    m.term(row, v["DemandNeedingReserveMargin"], -1)
+
+    row = m.constraint("ReserveMarginConstraint", "r l y", "L")
+    m.term(row, v["DemandNeedingReserveMargin"], m.param("ReserveMargin"))
+    m.term(row, v["TotalCapacityInReserveMargin"], -1)
+
+
+def build(instance):
+    """Assemble the LinearProgram of osemosys.py for the data in instance."""
+    m = Builder(instance)
+    _variables(m)
+    _capacity(m)
+    _energy_balance(m)
+    _storage(m)
+    _costs(m)
+    _limits(m)
+    _emissions(m)
+    _reserve_margin(m)
+    return m.finish(m.vars["ModelPeriodCostByRegion"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("--write", metavar="MPSFILE")
+    parser.add_argument("--solve", action="store_true")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    instance = load_data(args.datafile)
+    loaded = time.perf_counter()
+    lp = build(instance)
+    built = time.perf_counter()
+    print(
+        f"{lp.shape[0]} rows, {lp.shape[1]} columns, {lp.A.nnz} nonzeros "
+        f"(data {loaded - start:.2f}s, build {built - loaded:.2f}s)"
+    )
+    if args.write:
+        lp.write_mps(args.write)
+    if args.solve:
+        result = lp.solve()
+        print(result.message)
+        if result.x is None:
+            return 1
+        print(f"objective {result.fun:.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Myopic (rolling-horizon) solution of the OSeMOSYS model.
+
+Solves the model over overlapping windows of YEAR instead of the whole
+horizon at once. After each window the decisions of its first years are
+committed and carried into the data of the next one:
+- the new capacity built (NewCapacity, NewStorageCapacity) is added to
+  ResidualCapacity and ResidualStorageCapacity for as long as it lives;
+- the storage level at the end of the committed years becomes
+  StorageLevelStart;
+- the activity and emissions of the committed years are taken off the
+  model-period limits.
+
+The remaining years of a window are solved again in the next one. Only the
+instance of the current window is held in memory, next to the data of the
+years not committed yet, so the memory needed depends on the window length
+rather than on the horizon:
+
+  python osemosys_myopic.py datafile.dat results/ --window=10 --step=5
+
+writes the results of the committed years of every window to the results
+directory and prints the cost of the committed years of each window,
+discounted to the first year of the horizon. Capacity is credited with its
+salvage value at the end of the horizon, not at the end of the window that
+committed it, so the total is comparable to the full-horizon objective and
+never below it.
+"""
+
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+
+from pyomo.environ import *
+
+import osemosys
+import osemosys_data
+import osemosys_results
+
+# Parameters the model skips at these values
+NO_LIMIT = 99999
+
+
+def windows(years, length, step):
+    """Yield (window years, committed years) over the sorted years."""
+    if not 1 <= step <= length:
+        raise ValueError(f"the step must be between 1 and {length}, got {step}")
+    start = 0
+    while start + length < len(years):
+        yield years[start : start + length], years[start : start + step]
+        start += step
+    yield years[start:], years[start:]
+
+
+def window_data(data, years, config=osemosys_data.CONFIG):
+    """Return the data namespace of a DataPortal (as from data.data()) with
+    YEAR and every parameter indexed by it restricted to years."""
+    entries = osemosys_data.load_config(config, ("param",))
+    kept = set(years)
+    window = dict(data)
+    window["YEAR"] = {None: list(years)}
+    for name, entry in entries.items():
+        positions = [i for i, index in enumerate(entry["indices"]) if index == "YEAR"]
+        if name not in window or not positions:
+            continue
+        window[name] = {
+            key: v
+            for key, v in window[name].items()
+            if all(
+                (key if isinstance(key, tuple) else (key,))[i] in kept
+                for i in positions
+            )
+        }
+    return window
+
+
+def committed_cost(instance, years, first, last):
+    """Return the cost of years in the solved window instance, discounted to
+    first: the discounted costs without the salvage values at the end of the
+    window, less the salvage values at last, the end of the horizon."""
+    cost = 0
+    for r in instance.REGION:
+        rate = value(instance.DiscountRate[r])
+        # The window discounts to its own first year.
+        window = (1 + rate) ** (value(instance.FirstYear) - first)
+        horizon = (1 + rate) ** (last - first + 1)
+        for y in years:
+            investments = [
+                (instance.CapitalInvestment[r, t, y], instance.OperationalLife[r, t])
+                for t in instance.TECHNOLOGY
+            ] + [
+                (
+                    instance.CapitalInvestmentStorage[r, s, y],
+                    instance.OperationalLifeStorage[r, s],
+                )
+                for s in instance.STORAGE
+            ]
+            salvage = sum(
+                value(investment)
+                * osemosys.salvage_fraction(
+                    instance, r, value(life), y, last, (1 + rate) ** (last - y + 1)
+                )
+                for investment, life in investments
+            )
+            window_salvage = sum(
+                value(instance.DiscountedSalvageValue[r, t, y])
+                for t in instance.TECHNOLOGY
+            ) + sum(
+                value(instance.DiscountedSalvageValueStorage[r, s, y])
+                for s in instance.STORAGE
+            )
+            cost += (
+                value(instance.TotalDiscountedCost[r, y]) + window_salvage
+            ) / window - salvage / horizon
+    return cost
+
+
+class Commitments:
+    """Decisions of the committed years, carried into later windows."""
+
+    def __init__(self):
+        self.capacity = {}
+        self.storage_capacity = {}
+        self.storage_level = {}
+        self.activity = defaultdict(float)
+        self.emissions = defaultdict(float)
+
+    def commit(self, instance, years):
+        """Record the solution of instance for years."""
+        for (r, t, y), var in instance.NewCapacity.items():
+            if y in years and var.value:
+                self.capacity[r, t, y] = var.value
+        for (r, s, y), var in instance.NewStorageCapacity.items():
+            if y in years and var.value:
+                self.storage_capacity[r, s, y] = var.value
+        for (r, t, y), var in instance.TotalTechnologyAnnualActivity.items():
+            if y in years:
+                self.activity[r, t] += var.value or 0
+        for (r, e, y), var in instance.AnnualEmissions.items():
+            if y in years:
+                self.emissions[r, e] += var.value or 0
+        last = years[-1]
+        for r in instance.REGION:
+            for s in instance.STORAGE:
+                level = instance.StorageLevelYearFinish[r, s, last].value
+                self.storage_level[r, s] = level or 0
+
+    def apply(self, window, model):
+        """Carry the commitments into the window data namespace, falling back
+        to the defaults of model for the values it does not give."""
+        years = window["YEAR"][None]
+
+        def residual(name, built, life_name):
+            life = window.get(life_name, {})
+            default = model.component(life_name).default()
+            values = defaultdict(float, window.get(name, {}))
+            for (r, t, built_in), capacity in built.items():
+                for y in years:
+                    if 0 <= y - built_in < life.get((r, t), default):
+                        values[r, t, y] += capacity
+            window[name] = dict(values)
+
+        residual("ResidualCapacity", self.capacity, "OperationalLife")
+        residual(
+            "ResidualStorageCapacity", self.storage_capacity, "OperationalLifeStorage"
+        )
+        if self.storage_level:
+            window["StorageLevelStart"] = dict(self.storage_level)
+
+        def remaining(name, used, lower=False):
+            limits = dict(window.get(name, {}))
+            for key, limit in limits.items():
+                if lower or limit != NO_LIMIT:
+                    limits[key] = max(limit - used.get(key, 0), 0)
+            window[name] = limits
+
+        remaining("TotalTechnologyModelPeriodActivityUpperLimit", self.activity)
+        remaining(
+            "TotalTechnologyModelPeriodActivityLowerLimit", self.activity, lower=True
+        )
+        remaining("ModelPeriodEmissionLimit", self.emissions)
+
+
+def solve_windows(
+    source,
+    length,
+    step=None,
+    directory=None,
+    solver="glpk",
+    file_format="parquet",
+    options=None,
+    model=None,
+    config=osemosys_data.CONFIG,
+):
+    """Solve source window by window, writing the results of the committed
+    years to directory if given. Yields one dict of statistics per window."""
+    model = model or osemosys.model
+    if directory and os.path.isdir(directory) and os.listdir(directory):
+        raise ValueError(f"the results directory {directory} is not empty")
+    # Only the data namespace is kept, not the DataPortal nor an instance of
+    # the whole horizon, and it loses the committed years as they pass.
+    data = osemosys_data.read_data(model, source, options, config).data()
+    years = sorted(data["YEAR"][None])
+    commitments = Commitments()
+    for part, (window, committed) in enumerate(windows(years, length, step or length)):
+        start = time.perf_counter()
+        namespace = window_data(data, window, config)
+        commitments.apply(namespace, model)
+        instance = model.create_instance(
+            DataPortal(model=model, data_dict={None: namespace})
+        )
+        built = time.perf_counter()
+        results = SolverFactory(solver).solve(instance)
+        condition = results.solver.termination_condition
+        if condition != TerminationCondition.optimal:
+            raise RuntimeError(
+                f"window {window[0]}-{window[-1]}: solver finished with "
+                f"termination condition {condition}"
+            )
+        solved = time.perf_counter()
+
+        commitments.commit(instance, committed)
+        data = window_data(data, [y for y in years if y > committed[-1]], config)
+        if directory:
+            osemosys_results.write_results(
+                instance,
+                directory,
+                file_format,
+                config=config,
+                years=committed,
+                part=part,
+            )
+        cost = committed_cost(instance, committed, years[0], years[-1])
+        stats = {
+            "window": (window[0], window[-1]),
+            "committed": (committed[0], committed[-1]),
+            "rows": instance.nconstraints(),
+            "objective": value(instance.OBJ),
+            "cost": cost,
+            "build_seconds": built - start,
+            "solve_seconds": solved - built,
+            # ru_maxrss is in KiB on Linux
+            "peak_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+        # Pyomo components hold reference cycles; collect them before the
+        # next window is built.
+        del instance, results
+        gc.collect()
+        yield stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("directory", nargs="?", help="directory for the results")
+    parser.add_argument("--window", type=int, required=True, help="years per window")
+    parser.add_argument("--step", type=int, help="years committed per window")
+    parser.add_argument("--solver", default="glpk")
+    parser.add_argument(
+        "--format", choices=list(osemosys_results.EXTENSIONS), default="parquet"
+    )
+    args = parser.parse_args(argv)
+
+    total = 0
+    print(
+        f"{'window':<11} {'committed':<11} {'rows':>9} {'build s':>8} "
+        f"{'solve s':>8} {'peak MiB':>9} {'cost':>14}"
+    )
+    for stats in solve_windows(
+        args.datafile,
+        args.window,
+        args.step,
+        args.directory,
+        args.solver,
+        args.format,
+    ):
+        total += stats["cost"]
+        print(
+            f"{'%d-%d' % stats['window']:<11} {'%d-%d' % stats['committed']:<11} "
+            f"{stats['rows']:>9} {stats['build_seconds']:>8.2f} "
+            f"{stats['solve_seconds']:>8.2f} {stats['peak_mib']:>9.1f} "
+            f"{stats['cost']:>14.6f}"
+        )
+    print(f"total discounted cost {total:.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
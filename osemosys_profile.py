@@ -0,0 +1,169 @@
+"""
+Build profile of the OSeMOSYS model.
+
+Creates an instance the usual way, timing the construction of every set,
+parameter, variable, constraint and objective, and reports per component the
+entries it holds, the indices its rule skipped, the nonzeros of its rows and
+the peak and retained memory allocated while it was built:
+
+  python osemosys_profile.py datafile.dat --json profile.json
+  python osemosys_profile.py datafile.dat --model osemosys_compact --top 20
+
+Memory is traced with tracemalloc, which slows construction down; pass
+--no-memory for undistorted times.
+"""
+
+import argparse
+import importlib
+import io
+import json
+import re
+import sys
+import time
+import tracemalloc
+
+from pyomo.common.timing import report_timing
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.environ import *
+
+import osemosys_data
+
+KINDS = {
+    Set: "Set",
+    Param: "Param",
+    Var: "Var",
+    Constraint: "Constraint",
+    Objective: "Objective",
+}
+
+SORT_KEYS = ("seconds", "peak_bytes", "entries", "skipped", "nonzeros")
+
+
+def _count(component):
+    """Return (entries, skipped indices, nonzeros) of a constructed component."""
+    kind = KINDS.get(component.ctype)
+    if kind == "Param":
+        return sum(1 for _ in component.sparse_keys()), 0, 0
+    if kind == "Set":
+        return (len(component) if not component.is_indexed() else 0), 0, 0
+    entries = len(component)
+    skipped = 0
+    if component.is_indexed():
+        skipped = len(component.index_set()) - entries
+    nonzeros = 0
+    if kind in ("Constraint", "Objective"):
+        nonzeros = sum(
+            sum(1 for _ in identify_variables(data.expr, include_fixed=False))
+            for data in component.values()
+        )
+    return entries, skipped, nonzeros
+
+
+class _Recorder(io.TextIOBase):
+    """Stream for report_timing, which writes a line as each component of the
+    instance is constructed. Records for every component in names the time
+    and the memory allocated since the one before; those of the components
+    Pyomo constructs implicitly (index sets) go to the next one in names."""
+
+    PATTERN = re.compile(r"seconds to construct \w+ ([^;\s]+)")
+
+    def __init__(self, names, memory):
+        self.names = names
+        self.memory = memory
+        self.stats = []
+        self._before = tracemalloc.get_traced_memory()[0] if memory else 0
+        self._start = time.perf_counter()
+
+    def write(self, text):
+        match = self.PATTERN.search(text)
+        if match and match.group(1) in self.names:
+            entry = {
+                "name": match.group(1),
+                "seconds": time.perf_counter() - self._start,
+            }
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                entry["peak_bytes"] = peak - self._before
+                entry["net_bytes"] = current - self._before
+                tracemalloc.reset_peak()
+                self._before = current
+            self.stats.append(entry)
+            self._start = time.perf_counter()
+        return len(text)
+
+
+def profile_instance(model, data, memory=True):
+    """Create an instance of model from data and return it together with one
+    dict of build statistics per component, in construction order."""
+    # The steps of create_instance, with the model cloned before the
+    # components are constructed (and timed) one by one by load.
+    instance = model.clone()
+    names = {c.local_name for c in instance.component_objects(descend_into=False)}
+    if memory:
+        tracemalloc.start()
+    try:
+        recorder = _Recorder(names, memory)
+        with report_timing(stream=recorder):
+            instance.load(data)
+    finally:
+        if memory:
+            tracemalloc.stop()
+    instance.construct()
+
+    stats = recorder.stats
+    for entry in stats:
+        component = instance.component(entry["name"])
+        entry["kind"] = KINDS.get(component.ctype, component.ctype.__name__)
+        entry["entries"], entry["skipped"], entry["nonzeros"] = _count(component)
+    return instance, stats
+
+
+def report(stats, sort="seconds", top=None):
+    """Return the statistics as a text table, largest first."""
+    rows = sorted(stats, key=lambda entry: entry.get(sort, 0), reverse=True)
+    total = sum(entry["seconds"] for entry in stats)
+    lines = [
+        f"{'component':<48} {'kind':<10} {'seconds':>8} {'share':>6} "
+        f"{'entries':>9} {'skipped':>9} {'nonzeros':>10} {'peak MiB':>9} "
+        f"{'net MiB':>8}"
+    ]
+    for entry in rows[:top]:
+        memory = ""
+        if "peak_bytes" in entry:
+            memory = (
+                f" {entry['peak_bytes'] / 1024**2:>9.1f}"
+                f" {entry['net_bytes'] / 1024**2:>8.1f}"
+            )
+        lines.append(
+            f"{entry['name']:<48} {entry['kind']:<10} {entry['seconds']:>8.3f} "
+            f"{entry['seconds'] / total if total else 0:>6.1%} "
+            f"{entry['entries']:>9} {entry['skipped']:>9} {entry['nonzeros']:>10}"
+            + memory
+        )
+    lines.append(f"{'total':<48} {'':<10} {total:>8.3f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("--model", default="osemosys", help="module defining model")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="seconds")
+    parser.add_argument("--top", type=int)
+    parser.add_argument("--json", metavar="FILE")
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    args = parser.parse_args(argv)
+
+    model = importlib.import_module(args.model).model
+    data = osemosys_data.read_data(model, args.datafile)
+    _, stats = profile_instance(model, data, args.memory)
+    print(report(stats, args.sort, args.top))
+    if args.json:
+        rows = sorted(stats, key=lambda entry: entry.get(args.sort, 0), reverse=True)
+        with open(args.json, "w") as json_file:
+            json.dump(rows, json_file, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
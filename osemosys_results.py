@@ -0,0 +1,164 @@
+"""
+Columnar result output for the OSeMOSYS model.
+
+Writes one file per `type: result` entry of config.yaml, with a column per
+entry of its `indices` plus a VALUE column, in the same layout osemosys_data
+reads inputs from. Each variable is walked once and only the values above a
+tolerance are kept; rows are passed to the file in chunks of a fixed size, so
+the memory used for writing does not grow with the size of the model:
+
+  python osemosys_results.py datafile.dat results/ --solver=glpk [--format csv]
+
+Writing Parquet files needs pyarrow.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from pyomo.environ import *
+
+import osemosys
+import osemosys_data
+
+CHUNK_ROWS = 100000
+
+EXTENSIONS = {"parquet": ".parquet", "csv": ".csv"}
+
+
+def _chunks(var, tolerance, size, cast, keep=None):
+    """Yield lists of up to size (*index, value) rows of var above tolerance,
+    and of the indices keep accepts if given."""
+    chunk = []
+    for index, data in var.items():
+        v = data.value
+        if v is None or abs(v) <= tolerance:
+            continue
+        index = index if isinstance(index, tuple) else (index,)
+        if keep is not None and not keep(index):
+            continue
+        chunk.append(tuple(c(i) for c, i in zip(cast, index)) + (v,))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_variable(
+    var,
+    path,
+    indices,
+    dtypes,
+    file_format="parquet",
+    tolerance=1e-9,
+    chunk_rows=CHUNK_ROWS,
+    keep=None,
+    append=False,
+):
+    """Stream the values of var above tolerance (and, if given, of the
+    indices keep accepts) to path, under the column names indices (of config
+    dtypes) and VALUE. A CSV file can be appended to. Returns the rows
+    written."""
+    cast = [str if dtype == "str" else int for dtype in dtypes]
+    chunks = _chunks(var, tolerance, chunk_rows, cast, keep)
+    rows = 0
+    if file_format == "csv":
+        header = not (append and os.path.exists(path))
+        with open(path, "a" if append else "w", newline="") as result_file:
+            writer = csv.writer(result_file)
+            if header:
+                writer.writerow(list(indices) + ["VALUE"])
+            for chunk in chunks:
+                writer.writerows(chunk)
+                rows += len(chunk)
+        return rows
+
+    pyarrow = osemosys_data.import_pyarrow()
+    types = {"str": pyarrow.string(), "int": pyarrow.int64()}
+    schema = pyarrow.schema(
+        [(index, types[dtype]) for index, dtype in zip(indices, dtypes)]
+        + [("VALUE", pyarrow.float64())]
+    )
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            columns = [list(column) for column in zip(*chunk)]
+            writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def write_results(
+    instance,
+    directory,
+    file_format="parquet",
+    tolerance=1e-9,
+    config=osemosys_data.CONFIG,
+    years=None,
+    part=None,
+):
+    """Write every result variable of instance to directory; returns
+    {variable: rows written}.
+
+    years keeps only the rows of those years, leaving out the results
+    without a YEAR index. part writes the results as one piece of a larger
+    set: appended to the CSV file of each result, or as the Parquet file part
+    inside a directory per result, which pandas and pyarrow read as a whole.
+    """
+    entries = osemosys_data.load_config(config, ("set", "result"))
+    os.makedirs(directory, exist_ok=True)
+    written = {}
+    for name, entry in entries.items():
+        var = instance.component(name)
+        if entry["type"] != "result" or not isinstance(var, Var):
+            continue
+        dtypes = [
+            entries[osemosys_data.set_of(index, entries)]["dtype"]
+            for index in entry["indices"]
+        ]
+        keep = None
+        if years is not None:
+            if "YEAR" not in entry["indices"]:
+                continue
+            position = entry["indices"].index("YEAR")
+            keep = lambda index: index[position] in years
+        path = os.path.join(directory, name + EXTENSIONS[file_format])
+        if part is not None and file_format != "csv":
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, f"{part}{EXTENSIONS[file_format]}")
+        written[name] = write_variable(
+            var,
+            path,
+            entry["indices"],
+            dtypes,
+            file_format,
+            tolerance,
+            keep=keep,
+            append=part is not None,
+        )
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("directory")
+    parser.add_argument("--solver", default="glpk")
+    parser.add_argument("--format", choices=list(EXTENSIONS), default="parquet")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args(argv)
+
+    instance = osemosys_data.create_instance(osemosys.model, args.datafile)
+    results = SolverFactory(args.solver).solve(instance)
+    condition = results.solver.termination_condition
+    if condition != TerminationCondition.optimal:
+        print(f"solver finished with termination condition {condition}")
+        return 1
+    written = write_results(instance, args.directory, args.format, args.tolerance)
+    print(f"{sum(written.values())} rows in {len(written)} files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
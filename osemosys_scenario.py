@@ -0,0 +1,186 @@
+"""
+Scenario sweeps on a single persistent OSeMOSYS instance.
+
+Builds the instance once with the swept parameters declared mutable, then
+for each scenario only changes the values that differ from the base data and
+re-solves through the persistent HiGHS interface of pyomo.contrib.appsi. The
+LP held by HiGHS is updated in place, so every solve after the first starts
+from the previous optimal basis instead of from scratch:
+
+  python osemosys_scenario.py datafile.dat scenarios.yaml
+
+The scenario file maps each scenario name to the parameters it changes. A
+parameter is given either a single value, applied to all of its indices, or
+a list of rows holding the index followed by the value:
+
+  carbon_50:
+    EmissionsPenalty: 50
+  cap_2030:
+    AnnualEmissionLimit:
+      - [UTOPIA, CO2, 2030, 10.0]
+
+Each scenario is applied to the base data, not on top of the previous one.
+"""
+
+import argparse
+import sys
+import time
+
+import yaml
+from pyomo.contrib import appsi
+from pyomo.environ import *
+
+import osemosys
+import osemosys_data
+
+# Parameters that can be changed between solves without rebuilding. They
+# only appear as coefficients or right-hand sides; the emission limits keep
+# their rows while mutable.
+SWEEP_PARAMS = (
+    "CapitalCost",
+    "VariableCost",
+    "FixedCost",
+    "CapitalCostStorage",
+    "EmissionsPenalty",
+    "AnnualEmissionLimit",
+    "ModelPeriodEmissionLimit",
+    "SpecifiedAnnualDemand",
+    "AccumulatedAnnualDemand",
+    "DiscountRate",
+)
+
+# Parameter -> derived parameters computed from it, with their rules.
+DERIVED = {
+    "DiscountRate": {
+        "DiscountFactor": osemosys.DiscountFactor_init,
+        "DiscountFactorMid": osemosys.DiscountFactorMid_init,
+        "DiscountFactorSalvage": osemosys.DiscountFactorSalvage_init,
+        "SalvageValueFraction": osemosys.SalvageValueFraction_init,
+        "SalvageValueFractionStorage": osemosys.SalvageValueFractionStorage_init,
+    },
+}
+
+
+def sweep_model(params=SWEEP_PARAMS, model=None):
+    """Return a copy of model (osemosys.model by default) in which params and
+    the parameters derived from them are declared mutable."""
+    source = (model or osemosys.model).clone()
+    arguments = {}
+    for name in params:
+        arguments[name] = {}
+        arguments.update(
+            (derived, {"initialize": rule})
+            for derived, rule in DERIVED.get(name, {}).items()
+        )
+    copy = AbstractModel(name=source.name)
+    # Components are constructed in declaration order, so every component is
+    # moved to the copy in turn, with a mutable declaration of each of the
+    # swept parameters put in the place of the original.
+    for component in list(source.component_objects(descend_into=False)):
+        name = component.local_name
+        source.del_component(component)
+        if name in arguments:
+            component = Param(
+                *component.index_set().subsets(),
+                default=component.default(),
+                within=component.domain,
+                mutable=True,
+                **arguments[name],
+            )
+        copy.add_component(name, component)
+    return copy
+
+
+def load_scenarios(path):
+    with open(path) as scenario_file:
+        return yaml.safe_load(scenario_file)
+
+
+def scenario_rows(rows, indices):
+    """Expand the value or [[*index, value], ...] rows a scenario gives for a
+    parameter into (index, value) pairs; a single value covers indices."""
+    if not isinstance(rows, list):
+        return [(index, rows) for index in indices]
+    return [(tuple(row[:-1]) if len(row) > 2 else row[0], row[-1]) for row in rows]
+
+
+class ScenarioRunner:
+    """Solve scenarios that differ from one data set only in params."""
+
+    def __init__(self, source, params=SWEEP_PARAMS, model=None, options=None):
+        self.params = tuple(params)
+        self.instance = osemosys_data.create_instance(
+            sweep_model(self.params, model), source, options
+        )
+        self.solver = appsi.solvers.Highs()
+        self.solver.config.load_solution = False
+        # Only parameter values change between solves, so the structural
+        # scans appsi does before every re-solve can be skipped.
+        update = self.solver.update_config
+        update.check_for_new_or_removed_constraints = False
+        update.check_for_new_or_removed_vars = False
+        update.check_for_new_or_removed_params = False
+        update.check_for_new_objective = False
+        update.update_constraints = False
+        update.update_vars = False
+        update.update_named_expressions = False
+        # (param, index) -> base value of every entry a scenario has changed
+        self._base = {}
+
+    def apply(self, scenario):
+        """Reset the parameters to the base data, then set the values given in
+        scenario, {param: value or [[*index, value], ...]}."""
+        unknown = set(scenario) - set(self.params)
+        if unknown:
+            raise ValueError(f"parameters not declared mutable: {sorted(unknown)}")
+        changes = dict(self._base)
+        for name, rows in scenario.items():
+            indices = self.instance.component(name).index_set()
+            for index, new in scenario_rows(rows, indices):
+                changes[name, index] = new
+
+        for (name, index), new in changes.items():
+            if (name, index) not in self._base:
+                base = value(self.instance.component(name)[index])
+                self._base[name, index] = base
+            self.instance.component(name)[index] = new
+
+        for name in self.params:
+            for derived, rule in DERIVED.get(name, {}).items():
+                param = self.instance.component(derived)
+                for index in param:
+                    args = index if isinstance(index, tuple) else (index,)
+                    param[index] = value(rule(self.instance, *args))
+
+    def solve(self, scenario=None):
+        """Apply scenario and re-solve; returns the objective value."""
+        self.apply(scenario or {})
+        results = self.solver.solve(self.instance)
+        condition = results.termination_condition
+        if condition != appsi.base.TerminationCondition.optimal:
+            raise RuntimeError(
+                f"solver finished with termination condition {condition}"
+            )
+        results.solution_loader.load_vars()
+        return results.best_feasible_objective
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("scenarios")
+    args = parser.parse_args(argv)
+
+    scenarios = load_scenarios(args.scenarios)
+    start = time.perf_counter()
+    runner = ScenarioRunner(args.datafile)
+    print(f"{'build':<20} {'':>20} {time.perf_counter() - start:>9.2f}s")
+    for name in scenarios:
+        start = time.perf_counter()
+        objective = runner.solve(scenarios[name])
+        print(f"{name:<20} {objective:>20.6f} {time.perf_counter() - start:>9.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Synthetic data sets for the OSeMOSYS model.
+
+Generates a feasible data set of any size for osemosys.py, for benchmarking
+and for testing at scale. The energy system is built as follows:
+- Every fuel has an import technology that supplies it at a high variable
+  cost, so the demands can always be met.
+- The remaining technologies convert fuels. Each of them produces one fuel
+  in every mode and, for every other fuel, takes it as an input and gives it
+  as an extra output with probabilities set by the sparsity options.
+- Each storage is charged from and discharged to one fuel by a pair of
+  technologies.
+- The last fuels carry annual demand, spread evenly over the timeslices.
+
+Timeslices are the product of seasons, day types and daily time brackets.
+
+  python osemosys_synthetic.py out.dat --regions=3 --technologies=40 --years=20
+  python osemosys_synthetic.py data/ --fuels=12 --input-density=0.2
+
+writes a .dat file, or a columnar data directory if the target has no .dat
+extension.
+"""
+
+import argparse
+import os
+import random
+import sys
+
+import osemosys_data
+
+# Size option -> default
+SIZES = {
+    "regions": 2,
+    "technologies": 10,
+    "fuels": 5,
+    "emissions": 1,
+    "seasons": 2,
+    "daytypes": 2,
+    "brackets": 2,
+    "years": 10,
+    "modes": 2,
+    "storages": 1,
+    "demands": 2,
+}
+
+FIRST_YEAR = 2020
+
+
+def generate(
+    seed=0,
+    input_density=0.3,
+    output_density=0.1,
+    trade=True,
+    **sizes,
+):
+    """Return a Pyomo data dictionary ({None: {name: values}}) for
+    osemosys.py. sizes overrides the entries of SIZES; input_density and
+    output_density are the probabilities that a conversion technology takes
+    another fuel as an input or as an extra output in a mode."""
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        raise ValueError(f"unknown sizes: {sorted(unknown)}")
+    n = {**SIZES, **sizes}
+    if n["demands"] > n["fuels"]:
+        raise ValueError("there cannot be more demand fuels than fuels")
+    rng = random.Random(seed)
+
+    regions = [f"R{i + 1}" for i in range(n["regions"])]
+    fuels = [f"F{i + 1}" for i in range(n["fuels"])]
+    emissions = [f"E{i + 1}" for i in range(n["emissions"])]
+    modes = list(range(1, n["modes"] + 1))
+    years = list(range(FIRST_YEAR, FIRST_YEAR + n["years"]))
+    seasons = list(range(1, n["seasons"] + 1))
+    daytypes = list(range(1, n["daytypes"] + 1))
+    brackets = list(range(1, n["brackets"] + 1))
+    timeslices = [(ls, ld, lh) for ls in seasons for ld in daytypes for lh in brackets]
+    names = {l: f"S{l[0]}D{l[1]}H{l[2]}" for l in timeslices}
+    storages = [f"STO{i + 1}" for i in range(n["storages"])]
+    imports = [f"IMP_{f}" for f in fuels]
+    converters = [f"T{i + 1}" for i in range(n["technologies"])]
+    chargers = [f"CHG_{s}" for s in storages]
+    dischargers = [f"DIS_{s}" for s in storages]
+    technologies = imports + converters + chargers + dischargers
+    demands = fuels[-n["demands"] :]
+
+    data = {
+        "REGION": regions,
+        "TECHNOLOGY": technologies,
+        "FUEL": fuels,
+        "EMISSION": emissions,
+        "MODE_OF_OPERATION": modes,
+        "YEAR": years,
+        "TIMESLICE": list(names.values()),
+        "SEASON": seasons,
+        "DAYTYPE": daytypes,
+        "DAILYTIMEBRACKET": brackets,
+        "STORAGE": storages,
+        "FLEXIBLEDEMANDTYPE": [],
+    }
+    data = {name: {None: members} for name, members in data.items()}
+
+    def param(name, values):
+        data[name] = dict(values)
+
+    split = 1 / len(timeslices)
+    param("YearSplit", {(names[l], y): split for l in timeslices for y in years})
+    param("Conversionls", {(names[l], l[0]): 1 for l in timeslices})
+    param("Conversionld", {(names[l], l[1]): 1 for l in timeslices})
+    param("Conversionlh", {(names[l], l[2]): 1 for l in timeslices})
+    week = [7 // len(daytypes) + (i < 7 % len(daytypes)) for i in range(len(daytypes))]
+    param(
+        "DaysInDayType",
+        {(ls, ld, y): week[ld - 1] for ls in seasons for ld in daytypes for y in years},
+    )
+    param(
+        "DaySplit",
+        {(lh, y): 1 / (len(brackets) * 365) for lh in brackets for y in years},
+    )
+    param("DiscountRate", {r: round(rng.uniform(0.03, 0.1), 3) for r in regions})
+    if trade:
+        param(
+            "TradeRoute",
+            {
+                (a, b, f, y): 1
+                for a, b in zip(regions, regions[1:])
+                for f in demands
+                for y in years
+            },
+        )
+
+    demand = {}
+    for r in regions:
+        for f in demands:
+            level = rng.uniform(50, 150)
+            for i, y in enumerate(years):
+                demand[r, f, y] = round(level * (1 + 0.02 * i), 3)
+    param("SpecifiedAnnualDemand", demand)
+    param(
+        "SpecifiedDemandProfile",
+        {(r, f, names[l], y): split for r, f, y in demand for l in timeslices},
+    )
+
+    iar, oar, ear, variable_cost = {}, {}, {}, {}
+    capital_cost, fixed_cost, life, activity_unit, capacity_factor = {}, {}, {}, {}, {}
+    for r in regions:
+        for t, f in zip(imports, fuels):
+            for y in years:
+                oar[r, t, f, 1, y] = 1
+                variable_cost[r, t, 1, y] = 100
+        for t in converters:
+            main = rng.choice(fuels)
+            life[r, t] = rng.randint(5, 40)
+            activity_unit[r, t] = 31.536
+            cost = rng.uniform(300, 3000)
+            for m in modes:
+                efficiency = round(rng.uniform(0.3, 0.95), 3)
+                inputs = [
+                    f for f in fuels if f != main and rng.random() < input_density
+                ]
+                outputs = [
+                    f for f in fuels if f != main and rng.random() < output_density
+                ]
+                for y in years:
+                    oar[r, t, main, m, y] = 1
+                    for f in inputs:
+                        iar[r, t, f, m, y] = round(1 / efficiency / len(inputs), 4)
+                    for f in outputs:
+                        oar[r, t, f, m, y] = round(rng.uniform(0.1, 0.5), 3)
+                    for e in emissions:
+                        if inputs:
+                            ear[r, t, e, m, y] = round(rng.uniform(0, 0.1), 4)
+                    variable_cost[r, t, m, y] = round(rng.uniform(0.1, 5), 3)
+            if not rng.randrange(3):
+                profile = [round(rng.uniform(0.1, 0.9), 3) for _ in timeslices]
+                for y in years:
+                    for l, factor in zip(timeslices, profile):
+                        capacity_factor[r, t, names[l], y] = factor
+            for y in years:
+                capital_cost[r, t, y] = round(cost, 2)
+                fixed_cost[r, t, y] = round(cost * 0.02, 2)
+        for charger, discharger, s in zip(chargers, dischargers, storages):
+            f = rng.choice(demands)
+            for t in (charger, discharger):
+                life[r, t] = 10
+                activity_unit[r, t] = 31.536
+                for y in years:
+                    capital_cost[r, t, y] = 200
+            for y in years:
+                iar[r, charger, f, 1, y] = 1
+                oar[r, discharger, f, 1, y] = 0.9
+    param("InputActivityRatio", iar)
+    param("OutputActivityRatio", oar)
+    param("EmissionActivityRatio", ear)
+    param("VariableCost", variable_cost)
+    param("CapitalCost", capital_cost)
+    param("FixedCost", fixed_cost)
+    param("OperationalLife", life)
+    param("CapacityToActivityUnit", activity_unit)
+    param("CapacityFactor", capacity_factor)
+    param(
+        "EmissionsPenalty",
+        {
+            (r, e, y): 10 + i
+            for r in regions
+            for e in emissions
+            for i, y in enumerate(years)
+        },
+    )
+
+    param(
+        "TechnologyToStorage",
+        {(r, t, s, 1): 1 for r in regions for t, s in zip(chargers, storages)},
+    )
+    param(
+        "TechnologyFromStorage",
+        {(r, t, s, 1): 1 for r in regions for t, s in zip(dischargers, storages)},
+    )
+    param("OperationalLifeStorage", {(r, s): 15 for r in regions for s in storages})
+    param(
+        "CapitalCostStorage",
+        {(r, s, y): 20 for r in regions for s in storages for y in years},
+    )
+    param("StorageLevelStart", {(r, s): 0 for r in regions for s in storages})
+
+    param(
+        "ReserveMarginTagTechnology",
+        {(r, t, y): 1 for r in regions for t in converters for y in years},
+    )
+    param(
+        "ReserveMarginTagFuel",
+        {(r, f, y): 1 for r in regions for f in demands for y in years},
+    )
+    return {None: data}
+
+
+def write_dat(data, path):
+    """Write a Pyomo data dictionary as a GMPL/Pyomo .dat file."""
+    with open(path, "w") as dat:
+        for name, values in data[None].items():
+            if None in values and not isinstance(values[None], list):
+                dat.write(f"param {name} := {values[None]!r};\n")
+                continue
+            if None in values:
+                members = " ".join(str(m) for m in values[None])
+                dat.write(f"set {name} := {members};\n")
+                continue
+            if not values:
+                continue
+            dat.write(f"param {name} :=\n")
+            for index, value in values.items():
+                index = index if isinstance(index, tuple) else (index,)
+                dat.write(f"{' '.join(str(i) for i in index)} {value!r}\n")
+            dat.write(";\n")
+        dat.write("end;\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("target", help=".dat file or data directory to write")
+    for size, default in SIZES.items():
+        parser.add_argument(f"--{size}", type=int, default=default)
+    parser.add_argument("--input-density", type=float, default=0.3)
+    parser.add_argument("--output-density", type=float, default=0.1)
+    parser.add_argument("--no-trade", dest="trade", action="store_false")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    data = generate(
+        args.seed,
+        args.input_density,
+        args.output_density,
+        args.trade,
+        **{size: getattr(args, size) for size in SIZES},
+    )
+    if os.path.splitext(args.target)[1] == ".dat":
+        write_dat(data, args.target)
+    else:
+        instance = osemosys_data.data_model().create_instance(data=data)
+        osemosys_data.write_directory(instance, args.target)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
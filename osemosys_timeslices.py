@@ -0,0 +1,441 @@
+"""
+Timeslice aggregation for the OSeMOSYS model.
+
+Clusters the timeslices of a data set into k representative ones, by k-means
+or k-medoids on the demand profiles (SpecifiedDemandProfile as a rate over
+YearSplit) and capacity factors of each timeslice, weighted by its length.
+Each cluster becomes one timeslice of the reduced data:
+- YearSplit is the sum of the lengths of its members.
+- SpecifiedDemandProfile is the sum over the members (k-means), or the rate
+  of the medoid over the whole cluster rescaled to the annual demand
+  (k-medoids).
+- CapacityFactor is the length-weighted mean over the members (k-means), or
+  the value of the medoid (k-medoids).
+- Conversionls, Conversionld and Conversionlh are dropped: without storage
+  the seasons, day types and daily time brackets group nothing else.
+
+Data in which a technology charges or discharges storage is rejected: the
+storage balance follows the chronology of the seasons, day types and daily
+time brackets, and depends on DaySplit and DaysInDayType, none of which have
+a counterpart for clusters.
+
+  python osemosys_timeslices.py reduce datafile.dat reduced/ --k 12
+  python osemosys_timeslices.py expand results/ timeslices.csv expanded/
+  python osemosys_timeslices.py evaluate datafile.dat --k 4,8,16,32
+
+reduce writes the reduced data (a .dat file or a columnar directory) and a
+mapping of the original timeslices to the clusters. expand maps results of
+the reduced model back to the original timeslices: rates are repeated over
+the members of a cluster and energy amounts are shared out by length.
+evaluate solves the full and the reduced models and reports, for each k, the
+error of the aggregated profiles and of the results against the full run.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import *
+
+import osemosys
+import osemosys_compare
+import osemosys_data
+import osemosys_results
+import osemosys_synthetic
+
+METHODS = ("kmeans", "kmedoids")
+
+# Results over TIMESLICE that are not rates but energy per timeslice
+AMOUNTS = (
+    "Demand",
+    "ProductionByTechnology",
+    "Production",
+    "UseByTechnology",
+    "Use",
+    "Trade",
+)
+
+# Results compared by evaluate, besides the objective
+EVALUATED = ("TotalCapacityAnnual", "ProductionByTechnology", "AnnualEmissions")
+
+
+def features(reference):
+    """Return (timeslices, weights, features) of a data-only instance: the
+    average length of each timeslice and one row per timeslice holding its
+    demand rates and capacity factors, each column scaled to a maximum of
+    one."""
+    timeslices = list(reference.TIMESLICE)
+    years = list(reference.YEAR)
+    position = {l: i for i, l in enumerate(timeslices)}
+    length = np.array(
+        [[value(reference.YearSplit[l, y]) for y in years] for l in timeslices]
+    )
+    column = {y: j for j, y in enumerate(years)}
+
+    columns = defaultdict(lambda: np.zeros(len(timeslices)))
+    for (r, f, l, y), v in reference.SpecifiedDemandProfile.sparse_items():
+        columns["demand", r, f, y][position[l]] = v / length[position[l], column[y]]
+    for r, t, y in {(r, t, y) for r, t, _, y in reference.CapacityFactor.sparse_keys()}:
+        columns["factor", r, t, y][:] = [
+            value(reference.CapacityFactor[r, t, l, y]) for l in timeslices
+        ]
+    matrix = (
+        np.column_stack(list(columns.values()))
+        if columns
+        else np.zeros((len(timeslices), 1))
+    )
+    scale = np.abs(matrix).max(axis=0)
+    matrix = matrix[:, scale > 0] / scale[scale > 0]
+    # Profiles are often repeated from year to year.
+    matrix = np.unique(matrix, axis=1)
+    return timeslices, length.mean(axis=1), matrix
+
+
+def _distances(points, centers):
+    """Squared Euclidean distances between every point and every center."""
+    return np.maximum(
+        (points**2).sum(axis=1)[:, None]
+        - 2 * points @ centers.T
+        + (centers**2).sum(axis=1)[None, :],
+        0,
+    )
+
+
+def _seeds(points, weights, k, rng):
+    """Pick k distinct points by weighted k-means++."""
+    chosen = [rng.choice(len(points), p=weights / weights.sum())]
+    nearest = _distances(points, points[chosen])[:, 0]
+    for _ in range(1, k):
+        p = weights * nearest
+        if p.sum() == 0:
+            p = weights * ~np.isin(np.arange(len(points)), chosen)
+        chosen.append(rng.choice(len(points), p=p / p.sum()))
+        nearest = np.minimum(nearest, _distances(points, points[chosen[-1:]])[:, 0])
+    return chosen
+
+
+def cluster(points, weights, k, method="kmeans", seed=0, iterations=100):
+    """Cluster the rows of points into at most k groups. Returns the label of
+    every row, numbered from zero, and the row index of each group's medoid
+    (None for k-means)."""
+    if not 1 <= k <= len(points):
+        raise ValueError(f"k must be between 1 and {len(points)}, got {k}")
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    rng = np.random.default_rng(seed)
+    seeds = _seeds(points, weights, k, rng)
+
+    if method == "kmeans":
+        centers = points[seeds]
+        for _ in range(iterations):
+            labels = _distances(points, centers).argmin(axis=1)
+            moved = centers.copy()
+            for c in range(k):
+                members = labels == c
+                if members.any():
+                    moved[c] = np.average(
+                        points[members], axis=0, weights=weights[members]
+                    )
+            if np.allclose(moved, centers):
+                break
+            centers = moved
+        medoids = None
+    else:
+        medoids = np.array(seeds)
+        for _ in range(iterations):
+            labels = _distances(points, points[medoids]).argmin(axis=1)
+            moved = medoids.copy()
+            for c in range(k):
+                members = np.flatnonzero(labels == c)
+                if len(members):
+                    inner = np.sqrt(_distances(points[members], points[members]))
+                    moved[c] = members[(inner * weights[members]).sum(axis=1).argmin()]
+            if (moved == medoids).all():
+                break
+            medoids = moved
+
+    # Groups left empty are dropped and the rest numbered in order of their
+    # mean position, so that the reduced timeslices roughly follow the year.
+    used, labels = np.unique(labels, return_inverse=True)
+    order = np.argsort([np.flatnonzero(labels == c).mean() for c in range(len(used))])
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[labels], (None if medoids is None else medoids[used][order])
+
+
+def aggregate(data, reference, labels, medoids=None):
+    """Return the data namespace of a DataPortal (as from data.data()) with
+    its timeslices replaced by the clusters in labels, and {timeslice:
+    cluster}."""
+    for name in ("TechnologyToStorage", "TechnologyFromStorage"):
+        if any(reference.component(name).sparse_values()):
+            raise ValueError(
+                f"{name} links technologies to storage; the within-day storage "
+                "balance depends on DaySplit and DaysInDayType, which are not "
+                "aggregated, so data with storage cannot be reduced"
+            )
+    timeslices = list(reference.TIMESLICE)
+    years = list(reference.YEAR)
+    names = [f"C{c + 1}" for c in range(labels.max() + 1)]
+    cluster_of = {l: names[c] for l, c in zip(timeslices, labels)}
+    members = defaultdict(list)
+    for l in timeslices:
+        members[cluster_of[l]].append(l)
+
+    year_split = defaultdict(float)
+    for l in timeslices:
+        for y in years:
+            year_split[cluster_of[l], y] += value(reference.YearSplit[l, y])
+
+    profile = reference.SpecifiedDemandProfile
+    demand = defaultdict(float)
+    keys = {(r, f, y) for r, f, _, y in profile.sparse_keys()}
+    if medoids is None:
+        for (r, f, l, y), v in profile.sparse_items():
+            demand[r, f, cluster_of[l], y] += v
+    else:
+        for r, f, y in keys:
+            for c, m in zip(names, medoids):
+                medoid = timeslices[m]
+                rate = value(profile[r, f, medoid, y]) / value(
+                    reference.YearSplit[medoid, y]
+                )
+                demand[r, f, c, y] = rate * year_split[c, y]
+            # Rescale so that the annual demand is still met in full.
+            total = sum(demand[r, f, c, y] for c in names)
+            original = sum(value(profile[r, f, l, y]) for l in timeslices)
+            for c in names:
+                demand[r, f, c, y] *= original / total if total else 0
+
+    factor = reference.CapacityFactor
+    capacity_factor = {}
+    for r, t, y in {(r, t, y) for r, t, _, y in factor.sparse_keys()}:
+        for i, c in enumerate(names):
+            if medoids is None:
+                capacity_factor[r, t, c, y] = (
+                    sum(
+                        value(factor[r, t, l, y]) * value(reference.YearSplit[l, y])
+                        for l in members[c]
+                    )
+                    / year_split[c, y]
+                )
+            else:
+                capacity_factor[r, t, c, y] = value(
+                    factor[r, t, timeslices[medoids[i]], y]
+                )
+
+    reduced = dict(data)
+    reduced["TIMESLICE"] = {None: names}
+    reduced["YearSplit"] = dict(year_split)
+    reduced["SpecifiedDemandProfile"] = {key: v for key, v in demand.items() if v}
+    reduced["CapacityFactor"] = capacity_factor
+    # Without storage the seasons, day types and daily time brackets only
+    # group timeslices for the storage equations, so the clusters are left
+    # out of them.
+    for name in ("Conversionls", "Conversionld", "Conversionlh"):
+        reduced[name] = {}
+    return reduced, cluster_of
+
+
+def mapping_frame(reference, reduced_reference, cluster_of):
+    """Return the mapping as a frame of TIMESLICE, CLUSTER, YEAR and SHARE,
+    the share of the cluster's length that falls in the timeslice."""
+    rows = [
+        (
+            l,
+            c,
+            y,
+            value(reference.YearSplit[l, y]) / value(reduced_reference.YearSplit[c, y]),
+        )
+        for l, c in cluster_of.items()
+        for y in reference.YEAR
+    ]
+    return pd.DataFrame(rows, columns=["TIMESLICE", "CLUSTER", "YEAR", "SHARE"])
+
+
+def reduce_data(source, k, method="kmeans", seed=0, model=None):
+    """Read source and aggregate its timeslices into k clusters. Returns
+    (reduced DataPortal, mapping frame, profile errors)."""
+    model = model or osemosys.model
+    data = osemosys_data.read_data(model, source)
+    reference = osemosys_data.data_model(model).create_instance(data)
+    _, weights, points = features(reference)
+    labels, medoids = cluster(points, weights, k, method, seed)
+    reduced, cluster_of = aggregate(data.data(), reference, labels, medoids)
+    reduced = DataPortal(model=model, data_dict={None: reduced})
+    reduced_reference = osemosys_data.data_model(model).create_instance(reduced)
+    mapping = mapping_frame(reference, reduced_reference, cluster_of)
+    errors = profile_errors(reference, reduced_reference, cluster_of)
+    return reduced, mapping, errors
+
+
+def profile_errors(reference, reduced_reference, cluster_of):
+    """Return the length-weighted errors of the aggregated profiles against
+    the original ones: the RMS error of the demand rates relative to their
+    mean, and the RMS error of the capacity factors."""
+    errors = {}
+    profile = reference.SpecifiedDemandProfile
+    reduced_profile = reduced_reference.SpecifiedDemandProfile
+    squares = total = rates = 0.0
+    for r, f, y in {(r, f, y) for r, f, _, y in profile.sparse_keys()}:
+        for l, c in cluster_of.items():
+            length = value(reference.YearSplit[l, y])
+            rate = value(profile[r, f, l, y]) / length
+            reduced = value(reduced_profile[r, f, c, y]) / value(
+                reduced_reference.YearSplit[c, y]
+            )
+            squares += length * (rate - reduced) ** 2
+            rates += length * rate
+            total += length
+    errors["demand"] = (
+        float(np.sqrt(squares / total) / (rates / total)) if rates else 0.0
+    )
+
+    factor = reference.CapacityFactor
+    squares = total = 0.0
+    for r, t, y in {(r, t, y) for r, t, _, y in factor.sparse_keys()}:
+        for l, c in cluster_of.items():
+            length = value(reference.YearSplit[l, y])
+            difference = value(factor[r, t, l, y]) - value(
+                reduced_reference.CapacityFactor[r, t, c, y]
+            )
+            squares += length * difference**2
+            total += length
+    errors["capacity_factor"] = float(np.sqrt(squares / total)) if total else 0.0
+    return errors
+
+
+def expand(frames, mapping):
+    """Map {result: frame} of the reduced model back to the original
+    timeslices with a mapping frame; results without a TIMESLICE column are
+    returned unchanged."""
+    expanded = {}
+    for name, frame in frames.items():
+        if "TIMESLICE" not in frame.columns:
+            expanded[name] = frame
+            continue
+        merged = frame.rename(columns={"TIMESLICE": "CLUSTER"}).merge(
+            mapping, on=["CLUSTER", "YEAR"]
+        )
+        if name in AMOUNTS:
+            merged["VALUE"] = merged["VALUE"] * merged["SHARE"]
+        expanded[name] = merged[list(frame.columns)]
+    return expanded
+
+
+def _solve(instance, solver):
+    """Solve instance and return {result: frame} of its results."""
+    results = SolverFactory(solver).solve(instance)
+    condition = results.solver.termination_condition
+    if condition != TerminationCondition.optimal:
+        raise RuntimeError(f"solver finished with termination condition {condition}")
+    with tempfile.TemporaryDirectory() as directory:
+        osemosys_results.write_results(instance, directory, "csv")
+        return osemosys_compare.read_directory(directory)
+
+
+def _relative(frame):
+    """Total absolute difference relative to the total magnitude."""
+    scale = np.maximum(np.abs(frame["LEFT"]), np.abs(frame["RIGHT"])).sum()
+    return frame["ABS"].sum() / scale if scale else 0.0
+
+
+def evaluate(source, ks, method="kmeans", seed=0, solver="glpk", model=None):
+    """Solve source in full and reduced to each k, and return one row per k
+    with the solve time, objective and errors against the full run."""
+    model = model or osemosys.model
+    start = time.perf_counter()
+    instance = osemosys_data.create_instance(model, source)
+    full = _solve(instance, solver)
+    rows = [
+        {
+            "k": len(instance.TIMESLICE),
+            "seconds": time.perf_counter() - start,
+            "objective": value(instance.OBJ),
+        }
+    ]
+    for k in ks:
+        start = time.perf_counter()
+        data, mapping, errors = reduce_data(source, k, method, seed, model)
+        reduced = model.create_instance(data)
+        aligned = osemosys_compare.compare(
+            full, expand(_solve(reduced, solver), mapping)
+        )
+        row = {
+            "k": k,
+            "seconds": time.perf_counter() - start,
+            "objective": value(reduced.OBJ),
+            "objective_error": abs(value(reduced.OBJ) / rows[0]["objective"] - 1),
+            **{f"{name}_error": errors[name] for name in errors},
+        }
+        for name in EVALUATED:
+            if name in aligned:
+                row[name] = _relative(aligned[name])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _write(data, target, model):
+    if os.path.splitext(target)[1] == ".dat":
+        osemosys_synthetic.write_dat({None: data.data()}, target)
+    else:
+        instance = osemosys_data.data_model(model).create_instance(data)
+        osemosys_data.write_directory(instance, target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    reduce_command = commands.add_parser("reduce", help="write the reduced data")
+    reduce_command.add_argument("datafile")
+    reduce_command.add_argument("target", help=".dat file or data directory to write")
+    reduce_command.add_argument("--k", type=int, required=True)
+    reduce_command.add_argument("--mapping", default="timeslices.csv")
+    expand_command = commands.add_parser("expand", help="map results back")
+    expand_command.add_argument("results")
+    expand_command.add_argument("mapping")
+    expand_command.add_argument("directory")
+    evaluate_command = commands.add_parser("evaluate", help="report errors against k")
+    evaluate_command.add_argument("datafile")
+    evaluate_command.add_argument("--k", required=True, help="comma-separated values")
+    evaluate_command.add_argument("--solver", default="glpk")
+    for command in (reduce_command, evaluate_command):
+        command.add_argument("--method", choices=METHODS, default="kmeans")
+        command.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "reduce":
+        data, mapping, errors = reduce_data(
+            args.datafile, args.k, args.method, args.seed
+        )
+        _write(data, args.target, osemosys.model)
+        mapping.to_csv(args.mapping, index=False)
+        print(
+            f"demand profile error {errors['demand']:.2%}, "
+            f"capacity factor error {errors['capacity_factor']:.4f}"
+        )
+    elif args.command == "expand":
+        mapping = pd.read_csv(
+            args.mapping, dtype={"TIMESLICE": "str", "CLUSTER": "str"}
+        )
+        frames = expand(osemosys_compare.read_directory(args.results), mapping)
+        os.makedirs(args.directory, exist_ok=True)
+        for name, frame in frames.items():
+            frame.to_csv(os.path.join(args.directory, name + ".csv"), index=False)
+    else:
+        ks = [int(k) for k in args.k.split(",")]
+        table = evaluate(args.datafile, ks, args.method, args.seed, args.solver)
+        with pd.option_context(
+            "display.width", 200, "display.float_format", "{:.4g}".format
+        ):
+            print(table.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Input data checks of the OSeMOSYS model.
+
+Runs the check statements of osemosys.txt on the data tables before any
+instance is built, so inconsistent bounds are reported at once instead of as
+an infeasible solve. Every parameter is laid out as a dense array over its
+sets (missing entries at the model default) and each check is a single array
+expression, so all the violating indices are found in one pass:
+
+  python osemosys_validate.py datafile.dat
+  python osemosys_validate.py data/ --limit 20
+
+prints the violations of every check and exits with a non-zero status if
+there are any.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from pyomo.environ import Param
+
+import osemosys
+import osemosys_data
+
+# Parameters the model skips at this value
+NO_LIMIT = 99999
+
+
+class Tables:
+    """Dense arrays of the parameters of a data namespace (as from
+    DataPortal.data()), with missing entries at the model defaults."""
+
+    def __init__(self, data, model=None):
+        self.data = data
+        self.model = model or osemosys.model
+
+    def members(self, name):
+        return list(self.data.get(name, {None: []})[None])
+
+    def entries(self, name, sets):
+        """Return the positions in sets of the entries of name given in the
+        data, as one array per set, and their values."""
+        values = self.data.get(name) or {}
+        keys = [key if isinstance(key, tuple) else (key,) for key in values]
+        index = np.empty((len(sets), len(keys)), int)
+        for i, s in enumerate(sets):
+            position = {m: j for j, m in enumerate(self.members(s))}
+            index[i] = [position.get(key[i], -1) for key in keys]
+        # Entries outside the sets are reported by the model, not here.
+        known = (index >= 0).all(axis=0)
+        return tuple(index[:, known]), np.fromiter(values.values(), float)[known]
+
+    def __call__(self, name, *sets):
+        default = self.model.component(name).default()
+        if default is Param.NoValue:
+            default = 0
+        array = np.full([len(self.members(s)) for s in sets], float(default))
+        index, values = self.entries(name, sets)
+        array[index] = values
+        return array
+
+
+def _annual_capacity_factor(tables):
+    """sum{l} CapacityFactor[r,t,l,y] * YearSplit[l,y] over (r, t, y), without
+    laying out CapacityFactor over the timeslices: the default of one gives
+    the sum of YearSplit, to which the other entries add their difference."""
+    split = tables("YearSplit", "TIMESLICE", "YEAR")
+    shape = (
+        len(tables.members("REGION")),
+        len(tables.members("TECHNOLOGY")),
+        len(tables.members("YEAR")),
+    )
+    default = tables.model.CapacityFactor.default()
+    total = np.broadcast_to(default * split.sum(axis=0), shape).copy()
+    (r, t, l, y), values = tables.entries(
+        "CapacityFactor", ("REGION", "TECHNOLOGY", "TIMESLICE", "YEAR")
+    )
+    np.add.at(total, (r, t, y), (values - default) * split[l, y])
+    return total
+
+
+def validate(data, model=None):
+    """Return (check, [(index, message)]) for every check of osemosys.txt on
+    a data namespace, listing the indices that violate it."""
+    tables = Tables(data, model)
+    rty = ("REGION", "TECHNOLOGY", "YEAR")
+    max_investment = tables("TotalAnnualMaxCapacityInvestment", *rty)
+    min_investment = tables("TotalAnnualMinCapacityInvestment", *rty)
+    upper = tables("TotalTechnologyAnnualActivityUpperLimit", *rty)
+    lower = tables("TotalTechnologyAnnualActivityLowerLimit", *rty)
+    max_capacity = tables("TotalAnnualMaxCapacity", *rty)
+    residual = tables("ResidualCapacity", *rty)
+    availability = tables("AvailabilityFactor", *rty)
+    unit = tables("CapacityToActivityUnit", "REGION", "TECHNOLOGY")[:, :, None]
+    split = tables("YearSplit", "TIMESLICE", "YEAR").sum(axis=0)
+    period_lower = tables(
+        "TotalTechnologyModelPeriodActivityLowerLimit", "REGION", "TECHNOLOGY"
+    )
+    producible = _annual_capacity_factor(tables) * max_capacity * availability * unit
+
+    checks = [
+        (
+            "Max and Min capacity-investment bounds",
+            rty,
+            (max_investment != NO_LIMIT) & (min_investment != 0),
+            max_investment >= min_investment,
+            "TotalAnnualMaxCapacityInvestment {} < "
+            "TotalAnnualMinCapacityInvestment {}",
+            (max_investment, min_investment),
+        ),
+        (
+            "Annual activity limits",
+            rty,
+            (upper != NO_LIMIT) & (upper != 0) & (lower != 0),
+            upper >= lower,
+            "TotalTechnologyAnnualActivityUpperLimit {} < "
+            "TotalTechnologyAnnualActivityLowerLimit {}",
+            (upper, lower),
+        ),
+        (
+            "Residual and TotalAnnualMax capacity",
+            rty,
+            (max_capacity != NO_LIMIT) & (residual != 0),
+            max_capacity >= residual,
+            "TotalAnnualMaxCapacity {} < ResidualCapacity {}",
+            (max_capacity, residual),
+        ),
+        (
+            "Residual, TotalAnnualMax capacity and min capacity investment",
+            rty,
+            (max_capacity != NO_LIMIT) & (residual != 0),
+            max_capacity >= residual + min_investment,
+            "TotalAnnualMaxCapacity {} < ResidualCapacity + "
+            "TotalAnnualMinCapacityInvestment {}",
+            (max_capacity, residual + min_investment),
+        ),
+        (
+            "Annual production by technology bounds",
+            rty,
+            (max_capacity != 0)
+            & (max_capacity != NO_LIMIT)
+            & (lower != 0)
+            & (availability != 0)
+            & (unit != 0),
+            producible >= lower,
+            "activity at TotalAnnualMaxCapacity {} < "
+            "TotalTechnologyAnnualActivityLowerLimit {}",
+            (producible, lower),
+        ),
+        (
+            "TimeSlices/YearSplits",
+            ("YEAR",),
+            np.ones(split.shape, bool),
+            (split >= 0.9999) & (split <= 1.0001),
+            "sum of YearSplit {} is not 1",
+            (split,),
+        ),
+        (
+            "Model period activity bounds",
+            ("REGION", "TECHNOLOGY"),
+            period_lower != 0,
+            period_lower >= lower.sum(axis=2),
+            "TotalTechnologyModelPeriodActivityLowerLimit {} < sum of "
+            "TotalTechnologyAnnualActivityLowerLimit {}",
+            (period_lower, lower.sum(axis=2)),
+        ),
+    ]
+
+    report = []
+    for name, sets, applies, holds, message, values in checks:
+        violated = np.nonzero(applies & ~holds)
+        members = [tables.members(s) for s in sets]
+        violations = [
+            (
+                tuple(m[i] for m, i in zip(members, position)),
+                message.format(*(float(v[position]) for v in values)),
+            )
+            for position in zip(*violated)
+        ]
+        report.append((name, violations))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("datafile")
+    parser.add_argument("--limit", type=int, help="violations shown per check")
+    args = parser.parse_args(argv)
+
+    data = osemosys_data.read_data(osemosys.model, args.datafile)
+    start = time.perf_counter()
+    report = validate(data.data())
+    elapsed = time.perf_counter() - start
+    total = 0
+    for name, violations in report:
+        total += len(violations)
+        print(f"Checking {name}: {len(violations)} violations")
+        for index, message in violations[: args.limit]:
+            print(f"  {','.join(str(i) for i in index)}: {message}")
+    print(f"{total} violations in {elapsed * 1000:.1f} ms")
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Structural audit of the model on the small data set in tests/data, against
+the counts saved with:
+
+  python osemosys_audit.py tests/data/small.dat --save tests/data/audit.json
+"""
+
+import json
+import os
+
+import pytest
+from pyomo.environ import *
+
+import osemosys
+import osemosys_audit
+import osemosys_data
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+@pytest.fixture(scope="module")
+def instance():
+    return osemosys_data.create_instance(
+        osemosys.model, os.path.join(DATA, "small.dat")
+    )
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(os.path.join(DATA, "audit.json")) as json_file:
+        return json.load(json_file)
+
+
+def test_no_regressions(instance, baseline):
+    findings = osemosys_audit.audit(instance)
+    assert osemosys_audit.regressions(findings, baseline) == []
+
+
+def test_duplicate_row_is_a_regression(instance, baseline):
+    instance = instance.clone()
+    instance.Repeated = Constraint(
+        expr=instance.Demand["R1", "S1D1H1", "ELC", 2020] >= 0
+    )
+    instance.Again = Constraint(expr=instance.Demand["R1", "S1D1H1", "ELC", 2020] >= 0)
+    found = osemosys_audit.regressions(osemosys_audit.audit(instance), baseline)
+    assert ("Again", "duplicate rows", 1, 0) in found
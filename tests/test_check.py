@@ -0,0 +1,23 @@
+"""
+Objective parity of the formulation variants with the full model, on the
+small two-region data set in tests/data (storage, trade and emissions).
+"""
+
+import os
+
+import pytest
+
+import osemosys_check
+
+pytest.importorskip("highspy")
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "small.dat")
+
+
+@pytest.mark.parametrize("variant", ["bounds", "compact", "matrix"])
+def test_objective_matches_full_model(variant):
+    comparison = osemosys_check.compare_objectives(
+        DATA, [variant], solver="appsi_highs"
+    )
+    objective, difference = comparison[variant]
+    assert difference <= 1e-6, f"{variant} objective {objective}"
@@ -0,0 +1,37 @@
+"""
+Costs reported by the myopic solve on the small data set in tests/data,
+against the full-horizon optimum.
+"""
+
+import os
+
+import pytest
+
+import osemosys_check
+import osemosys_myopic
+
+pytest.importorskip("highspy")
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "small.dat")
+
+
+@pytest.fixture(scope="module")
+def optimum():
+    return osemosys_check.full_objective(DATA, solver="appsi_highs")
+
+
+def total_cost(length, step):
+    return sum(
+        stats["cost"]
+        for stats in osemosys_myopic.solve_windows(
+            DATA, length, step, solver="appsi_highs"
+        )
+    )
+
+
+def test_single_window_matches_full_horizon(optimum):
+    assert total_cost(100, 100) == pytest.approx(optimum, rel=1e-9)
+
+
+def test_rolling_windows_cost_no_less_than_full_horizon(optimum):
+    assert total_cost(3, 1) >= optimum * (1 - 1e-9)
@@ -0,0 +1,74 @@
+"""
+Per-technology production and use of the full model and the matrix builder,
+on the small data set in tests/data: outside FUEL_PRODUCED_BY (FUEL_USED_BY)
+they are zero, and inside they add up to the fuel totals.
+"""
+
+import itertools
+import os
+
+import pytest
+from pyomo.environ import *
+
+import osemosys
+import osemosys_data
+import osemosys_matrix
+
+pytest.importorskip("highspy")
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "small.dat")
+
+# Per-technology variable -> (fuel set it belongs to, total it adds up to)
+BY_TECHNOLOGY = {
+    "RateOfProductionByTechnology": ("FUEL_PRODUCED_BY", "RateOfProduction"),
+    "ProductionByTechnology": ("FUEL_PRODUCED_BY", "Production"),
+    "RateOfUseByTechnology": ("FUEL_USED_BY", "RateOfUse"),
+    "UseByTechnology": ("FUEL_USED_BY", "Use"),
+}
+
+
+@pytest.fixture(scope="module")
+def instance():
+    instance = osemosys_data.create_instance(osemosys.model, DATA)
+    SolverFactory("appsi_highs").solve(instance)
+    return instance
+
+
+@pytest.fixture(scope="module")
+def solutions(instance):
+    """Return {variant: {variable: {index: value}}} of the solved models, with
+    the indices that are not declared left out."""
+    full = {
+        name: {index: value(var) for index, var in getattr(instance, name).items()}
+        for name in BY_TECHNOLOGY
+    }
+    lp = osemosys_matrix.build(osemosys_matrix.load_data(DATA))
+    x = lp.solve().x
+    matrix = {name: lp.values(x, name) for name in BY_TECHNOLOGY}
+    return {"full": full, "matrix": matrix}
+
+
+@pytest.mark.parametrize("variant", ["full", "matrix"])
+@pytest.mark.parametrize("name", list(BY_TECHNOLOGY))
+def test_zero_outside_fuel_sets(instance, solutions, variant, name):
+    members = getattr(instance, BY_TECHNOLOGY[name][0])
+    values = solutions[variant][name]
+    for r, l, t, f, y in itertools.product(
+        instance.REGION,
+        instance.TIMESLICE,
+        instance.TECHNOLOGY,
+        instance.FUEL,
+        instance.YEAR,
+    ):
+        if (r, t, f, y) not in members:
+            assert values.get((r, l, t, f, y), 0.0) == 0.0, (r, l, t, f, y)
+
+
+@pytest.mark.parametrize("name", list(BY_TECHNOLOGY))
+def test_technologies_add_up_to_total(instance, solutions, name):
+    total = getattr(instance, BY_TECHNOLOGY[name][1])
+    sums = {}
+    for (r, l, t, f, y), v in solutions["full"][name].items():
+        sums[r, l, f, y] = sums.get((r, l, f, y), 0.0) + v
+    for index, v in sums.items():
+        assert v == pytest.approx(value(total[index]), abs=1e-6), index
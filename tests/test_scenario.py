@@ -0,0 +1,58 @@
+"""
+Scenario runner on the small data set in tests/data: a scenario solved on
+the persistent instance gives the objective of a fresh build of the edited
+data.
+"""
+
+import os
+
+import pytest
+from pyomo.environ import *
+
+import osemosys
+import osemosys_data
+import osemosys_scenario
+
+pytest.importorskip("highspy")
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "small.dat")
+
+SCENARIOS = {
+    "base": {},
+    "cost_and_rate": {
+        "CapitalCost": [["R1", "COAL", 2020, 5000]],
+        "DiscountRate": 0.1,
+    },
+    "zero_rate": {"DiscountRate": 0},
+}
+
+
+def fresh_objective(scenario):
+    data = osemosys_data.read_data(osemosys.model, DATA).data()
+    instance = osemosys_data.data_model().create_instance(
+        DataPortal(model=osemosys.model, data_dict={None: data})
+    )
+    for name, rows in scenario.items():
+        param = instance.component(name)
+        values = dict(data.get(name, {}))
+        for index, new in osemosys_scenario.scenario_rows(rows, param.index_set()):
+            values[index] = new
+        data[name] = values
+    instance = osemosys.model.create_instance(
+        DataPortal(model=osemosys.model, data_dict={None: data})
+    )
+    SolverFactory("appsi_highs").solve(instance)
+    return value(instance.OBJ)
+
+
+@pytest.fixture(scope="module")
+def runner():
+    return osemosys_scenario.ScenarioRunner(DATA)
+
+
+# The scenarios run in turn on the same runner, so each one also checks that
+# the previous one was reset.
+@pytest.mark.parametrize("name", list(SCENARIOS))
+def test_scenario_matches_fresh_build(runner, name):
+    objective = runner.solve(SCENARIOS[name])
+    assert objective == pytest.approx(fresh_objective(SCENARIOS[name]), rel=1e-9)